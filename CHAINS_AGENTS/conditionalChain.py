@@ -1,4 +1,33 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+"""
+Answer customer feedback with a response prompt chosen by its sentiment.
+
+``chain`` handles one feedback text. For many of them at once,
+``respond_to_feedback`` is the high-throughput path:
+
+- sentiments are looked up in a cache keyed on the normalized feedback text
+  (casefolded words only, so "Great phone!!" and "great phone" share an
+  entry; text without any word, such as an emoji, is keyed on itself)
+- the local lexicon scorer answers when it is confident
+- the remaining feedback is classified in batches, many items per model
+  request, and anything a batch reply leaves out goes through the usual
+  cascade one by one
+- the feedback is then grouped by sentiment, and each response prompt runs
+  as one batch over its group
+
+    python conditionalChain.py feedback.txt    # one feedback per line, JSON lines out
+
+Configuration (read from the environment / .env file):
+    FEEDBACK_CACHE_SIZE=10000   Sentiments cached (least recently used are evicted)
+    FEEDBACK_BATCH_SIZE=25      Feedback texts classified per model request
+    FEEDBACK_CONCURRENCY=8      Model requests in flight
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from collections import Counter, OrderedDict
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -9,7 +38,19 @@ from typing import Literal
 
 load_dotenv()
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")      
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.cascade import SMALL_MODEL, Candidate, CascadeStage, ModelCascade, model_stage, parse_json_answer
+from agent_common.chain_profiler import print_graph, profile_config
+from agent_common.models import create_chat_model
+from local_sentiment import classify_sentiment_locally
+
+FEEDBACK_CACHE_SIZE = int(os.getenv("FEEDBACK_CACHE_SIZE", "10000"))
+FEEDBACK_BATCH_SIZE = int(os.getenv("FEEDBACK_BATCH_SIZE", "25"))
+FEEDBACK_CONCURRENCY = int(os.getenv("FEEDBACK_CONCURRENCY", "8"))
+
+model = create_chat_model(model="gemini-2.5-flash")      
+small_model = create_chat_model(model=SMALL_MODEL)
 
 parser = StrOutputParser()
 
@@ -25,7 +66,76 @@ prompt1 = PromptTemplate(
     partial_variables={'format_instruction':parser2.get_format_instructions()}
 )
 
-classifier_chain = prompt1 | model | parser2
+def classify_locally(feedback):
+    sentiment, confidence = classify_sentiment_locally(feedback)
+    return Candidate(sentiment, confidence) if sentiment else None
+
+def small_model_prompt(feedback):
+    return ('Classify the sentiment of the following feedback text into positive or negative.\n'
+            'Respond with JSON only: {"sentiment": "positive" or "negative", "confidence": <0 to 1>}\n'
+            f'{feedback}')
+
+def classify_with_model(feedback):
+    return Candidate((prompt1 | model | parser2).invoke({'feedback': feedback}).sentiment)
+
+# Local lexicon first, then the small model, and gemini-2.5-flash only for unclear feedback
+sentiment_cascade = ModelCascade('sentiment', [
+    CascadeStage('local', classify_locally),
+    model_stage(SMALL_MODEL, small_model, small_model_prompt, lambda reply: parse_json_answer(reply, 'sentiment')),
+    CascadeStage('gemini-2.5-flash', classify_with_model),
+], validate=lambda sentiment, feedback: sentiment in ('positive', 'negative'))
+
+def normalize_feedback(feedback):
+    """Cache key of a feedback text: its words casefolded, or the stripped text when it has none."""
+    return ' '.join(re.findall(r"\w+(?:'\w+)?", feedback.casefold())) or feedback.strip()
+
+def _group_key(feedback):
+    # Blank feedback has an empty key; each blank text stays on its own
+    return normalize_feedback(feedback) or feedback
+
+class SentimentCache:
+    """Least recently used sentiments by normalized feedback text."""
+
+    def __init__(self, size=FEEDBACK_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, feedback):
+        key = normalize_feedback(feedback)
+        if not key:
+            return None
+        with self._lock:
+            sentiment = self._entries.get(key)
+            if sentiment is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return sentiment
+
+    def put(self, feedback, sentiment):
+        key = normalize_feedback(feedback)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = sentiment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+sentiment_cache = SentimentCache()
+
+def classify_sentiment(feedback):
+    """Sentiment of one feedback text, from the cache or the cascade."""
+    sentiment = sentiment_cache.get(feedback)
+    if sentiment is None:
+        sentiment = sentiment_cascade(feedback)
+        sentiment_cache.put(feedback, sentiment)
+    return sentiment
+
+classifier_chain = RunnableLambda(lambda x: Feedback(sentiment=classify_sentiment(x['feedback'])))
 
 prompt2 = PromptTemplate(
     template='Write an appropriate response to this positive feedback \n {feedback}',
@@ -45,6 +155,128 @@ branch_chain = RunnableBranch(
 
 chain = classifier_chain | branch_chain
 
-print(chain.invoke({'feedback': 'This is a terrible phone'}))
+response_chains = {'positive': prompt2 | model | parser, 'negative': prompt3 | model | parser}
+
+batch_prompt = PromptTemplate(
+    template='Classify the sentiment of each feedback text below as positive or negative.\n'
+             'Answer with exactly one JSON object per line, one line per feedback, and nothing else:\n'
+             '{{"id": 1, "sentiment": "positive"}}\n\n{items}',
+    input_variables=['items']
+)
+
+# How each feedback text of the last respond_to_feedback calls was classified
+feedback_stats = Counter()
+_stats_lock = threading.Lock()
+
+def _count(source, amount=1):
+    with _stats_lock:
+        feedback_stats[source] += amount
+
+def _parse_batch(reply, count):
+    sentiments = {}
+    for match in re.finditer(r'\{[^{}]*\}', reply):
+        try:
+            item = json.loads(match.group())
+            number, sentiment = int(item['id']), str(item['sentiment']).strip().lower()
+        except (ValueError, KeyError, TypeError):
+            continue
+        if 1 <= number <= count and sentiment in ('positive', 'negative'):
+            sentiments[number - 1] = sentiment
+    return sentiments
+
+def classify_feedback_batch(feedbacks, max_concurrency=None):
+    """
+    Sentiments of many feedback texts, in input order.
+
+    Cached and confidently scored texts need no model request; the rest are
+    classified FEEDBACK_BATCH_SIZE per request, and texts a batch reply leaves
+    out (or a failed request) go through the cascade one by one. A text the
+    cascade fails on gets the exception instead of a sentiment.
+    """
+    by_key = {}
+    for feedback in feedbacks:
+        by_key.setdefault(_group_key(feedback), feedback)
+    sentiments, pending = {}, []
+    for key, feedback in by_key.items():
+        sentiment = sentiment_cache.get(feedback)
+        if sentiment is not None:
+            _count('cache')
+        else:
+            sentiment, confidence = classify_sentiment_locally(feedback)
+            if sentiment is None or confidence < sentiment_cascade.min_confidence:
+                pending.append(key)
+                continue
+            _count('local')
+            sentiment_cache.put(feedback, sentiment)
+        sentiments[key] = sentiment
+
+    chunks = [pending[i:i + FEEDBACK_BATCH_SIZE] for i in range(0, len(pending), FEEDBACK_BATCH_SIZE)]
+    prompts = [{'items': '\n'.join(f'--- Feedback {number} ---\n{by_key[key]}' for number, key in enumerate(chunk, 1))}
+               for chunk in chunks]
+    config = {'max_concurrency': max_concurrency or FEEDBACK_CONCURRENCY}
+    replies = (batch_prompt | model | parser).batch(prompts, config=config, return_exceptions=True)
+    leftovers = []
+    for chunk, reply in zip(chunks, replies):
+        answers = {} if isinstance(reply, Exception) else _parse_batch(reply, len(chunk))
+        for position, key in enumerate(chunk):
+            if position in answers:
+                _count('batched')
+                sentiments[key] = answers[position]
+                sentiment_cache.put(by_key[key], answers[position])
+            else:
+                leftovers.append(key)
+    if leftovers:
+        _count('fallback', len(leftovers))
+        fallback = RunnableLambda(classify_sentiment).batch([by_key[key] for key in leftovers], config=config,
+                                                            return_exceptions=True)
+        sentiments.update(zip(leftovers, fallback))
+    return [sentiments[_group_key(feedback)] for feedback in feedbacks]
+
+def respond_to_feedback(feedbacks, max_concurrency=None):
+    """
+    Classify and answer many feedback texts.
+
+    Each sentiment's response prompt runs as one batch over the feedback of
+    that sentiment (identical texts are answered once). Returns one dict per
+    text, in input order, with ``sentiment`` and ``response``, or ``error``
+    when either step failed for that text (``sentiment`` is then None if the
+    classification failed).
+    """
+    sentiments = classify_feedback_batch(feedbacks, max_concurrency)
+    config = {'max_concurrency': max_concurrency or FEEDBACK_CONCURRENCY}
+    texts = {_group_key(feedback): feedback for feedback in feedbacks}
+    responses = {}
+    for sentiment, response_chain in response_chains.items():
+        group = list(dict.fromkeys(_group_key(feedback) for feedback, label in zip(feedbacks, sentiments)
+                                   if label == sentiment))
+        outputs = response_chain.batch([{'feedback': texts[key]} for key in group], config=config,
+                                       return_exceptions=True)
+        responses.update(zip(group, outputs))
+    results = []
+    for feedback, sentiment in zip(feedbacks, sentiments):
+        if isinstance(sentiment, Exception):
+            response, sentiment = sentiment, None
+        else:
+            response = responses[_group_key(feedback)]
+        result = {'feedback': feedback, 'sentiment': sentiment}
+        if isinstance(response, Exception):
+            result['error'] = f'{type(response).__name__}: {response}'
+        else:
+            result['response'] = response
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            feedbacks = [line.strip() for line in f if line.strip()]
+        for result in respond_to_feedback(feedbacks):
+            print(json.dumps(result, ensure_ascii=False))
+        print(dict(feedback_stats), file=sys.stderr)
+        sys.exit(0)
+
+    print(chain.invoke({'feedback': 'This is a terrible phone'}, config=profile_config(chain)))
+
+    print(sentiment_cascade.stats())
 
-chain.get_graph().print_ascii()
\ No newline at end of file
+    print_graph(chain)
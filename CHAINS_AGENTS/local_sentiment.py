@@ -0,0 +1,70 @@
+"""
+Lexicon-based sentiment for short feedback texts, without a model call.
+
+Words from small positive/negative lexicons are counted (strong words count
+double) and a preceding negation ("not good", "never works") flips the
+polarity. ``classify_sentiment_locally`` returns the label and a confidence in
+[0, 1] so callers can fall back to Gemini for mixed or unclear feedback.
+"""
+
+import re
+
+POSITIVE = set("""
+good great nice love like liked likes excellent amazing awesome fantastic perfect happy pleased glad
+wonderful best better fast smooth easy reliable recommend recommended helpful beautiful brilliant
+superb impressive enjoy enjoyed worth satisfied solid works working friendly quick clean sturdy
+""".split())
+
+NEGATIVE = set("""
+bad poor terrible awful horrible hate hated worst worse slow broken broke buggy crash crashes crashed
+disappointed disappointing useless waste refund return returned problem problems issue issues annoying
+difficult hard expensive overpriced faulty defective cheap flimsy laggy noisy rude late never unhappy
+""".split())
+
+# Words that carry the judgement on their own count twice
+STRONG = {"love", "excellent", "amazing", "awesome", "fantastic", "perfect", "best", "brilliant", "superb",
+          "terrible", "awful", "horrible", "hate", "hated", "worst", "useless", "defective"}
+
+NEGATIONS = {"not", "no", "never", "hardly", "isn't", "wasn't", "don't", "doesn't", "didn't", "can't",
+             "won't", "aren't", "nothing", "without"}
+
+# Negation reaches this many words ahead ("not very good")
+NEGATION_WINDOW = 3
+
+WORD_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def classify_sentiment_locally(text: str):
+    """
+    Classify ``text`` as positive or negative.
+
+    Returns:
+        Tuple of ("positive" / "negative" / None, confidence between 0 and 1)
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    scores = {"positive": 0.0, "negative": 0.0}
+    negated_until = -1
+    for i, word in enumerate(words):
+        if word in NEGATIONS:
+            negated_until = i + NEGATION_WINDOW
+            continue
+        if word in POSITIVE:
+            label = "positive"
+        elif word in NEGATIVE:
+            label = "negative"
+        else:
+            continue
+        if i <= negated_until:
+            label = "negative" if label == "positive" else "positive"
+        scores[label] += 2.0 if word in STRONG else 1.0
+
+    total = scores["positive"] + scores["negative"]
+    if total == 0:
+        return None, 0.0
+    best = max(scores, key=scores.get)
+    # Confidence grows with evidence and with the margin over the other polarity
+    evidence = min(1.0, total / 2)
+    margin = abs(scores["positive"] - scores["negative"]) / total
+    if margin == 0:
+        return None, 0.0
+    return best, round(evidence * margin, 3)
@@ -1,14 +1,43 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+"""
+Notes and a quiz generated in parallel from a text, then merged into one document.
+
+Run without arguments to process the example text. Pass files to process a
+whole course at once: the documents run concurrently through ``abatch``
+(at most PARALLEL_CHAIN_CONCURRENCY at a time), identical documents are
+processed once, results are written as JSON lines as soon as each one
+finishes, and a failed document (including a file that cannot be read) is
+reported without stopping the others.
+
+    python parallelChain.py course/*.md --concurrency 16 --output course.jsonl
+
+Configuration (read from the environment / .env file):
+    PARALLEL_CHAIN_CONCURRENCY=8   Documents processed at the same time
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableParallel
+from langchain_core.runnables import RunnableLambda, RunnableParallel
 
 load_dotenv()
 
-model1 = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.chain_profiler import print_graph, profile_config
+from agent_common.models import create_chat_model
+
+PARALLEL_CHAIN_CONCURRENCY = int(os.getenv("PARALLEL_CHAIN_CONCURRENCY", "8"))
+
+model1 = create_chat_model(model="gemini-2.5-flash")
 
-model2 = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+model2 = create_chat_model(model="gemini-2.5-flash")
 
 prompt1 = PromptTemplate(
     template='Generate short and simple notes from the following text \n {text}',
@@ -36,7 +65,92 @@ merge_chain = prompt3 | model1 | parser
 
 chain = parallel_chain | merge_chain
 
-text = """
+async def astream_documents(texts, max_concurrency=None):
+    """
+    Run the chain over many texts, yielding (index, result) as each one finishes.
+
+    Identical texts are processed once and yielded for every index they appear
+    at. A text whose chain fails yields the exception as its result instead of
+    aborting the batch.
+    """
+    positions = {}
+    for index, text in enumerate(texts):
+        positions.setdefault(text, []).append(index)
+    unique = list(positions)
+    config = {'max_concurrency': max_concurrency or PARALLEL_CHAIN_CONCURRENCY}
+    async for position, result in chain.abatch_as_completed([{'text': text} for text in unique], config=config,
+                                                            return_exceptions=True):
+        for index in positions[unique[position]]:
+            yield index, result
+
+def process_documents(texts, max_concurrency=None):
+    """Results of ``astream_documents`` in input order (an exception for each failed text)."""
+    async def collect():
+        results = [None] * len(texts)
+        async for index, result in astream_documents(texts, max_concurrency):
+            results[index] = result
+        return results
+    return asyncio.run(collect())
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+async def astream_files(paths, max_concurrency=None):
+    """
+    Run the chain over text files, yielding (index, result) as each one finishes.
+
+    Every file is read as part of its own work, so a file that cannot be read
+    (or is not UTF-8) yields its exception like a failed chain. Files with
+    identical content share one chain run.
+    """
+    runs = {}
+
+    async def process(path):
+        text = await asyncio.to_thread(_read_text, path)
+        key = hashlib.sha256(text.encode('utf-8')).digest()
+        if key not in runs:
+            runs[key] = asyncio.ensure_future(chain.ainvoke({'text': text}))
+        return await asyncio.shield(runs[key])
+
+    config = {'max_concurrency': max_concurrency or PARALLEL_CHAIN_CONCURRENCY}
+    async for index, result in RunnableLambda(process).abatch_as_completed(paths, config=config,
+                                                                          return_exceptions=True):
+        yield index, result
+
+async def process_files(paths, output, max_concurrency=None):
+    """Process text files, writing one JSON line per file as it finishes; returns the number of failures."""
+    start, done, failed = time.perf_counter(), 0, 0
+    async for index, result in astream_files(paths, max_concurrency):
+        done += 1
+        record = {'path': paths[index], 'seconds': round(time.perf_counter() - start, 2)}
+        if isinstance(result, Exception):
+            failed += 1
+            record['error'] = f'{type(result).__name__}: {result}'
+        else:
+            record['document'] = result
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        output.flush()
+        print(f"[{done}/{len(paths)}] {paths[index]}: {'failed' if 'error' in record else 'done'}", file=sys.stderr)
+    return failed
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description='Generate merged notes and quizzes from text files.')
+    cli.add_argument('files', nargs='*', help='Text files to process (default: the example text)')
+    cli.add_argument('--concurrency', type=int, help='Documents processed at the same time')
+    cli.add_argument('--output', help='JSON lines output file (default: stdout)')
+    args = cli.parse_args()
+
+    if args.files:
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            failed = asyncio.run(process_files(args.files, output, args.concurrency))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        sys.exit(1 if failed else 0)
+
+    text = """
 Support vector machines (SVMs) are a set of supervised learning methods used for classification, regression and outliers detection.
 
 The advantages of support vector machines are:
@@ -58,8 +172,8 @@ SVMs do not directly provide probability estimates, these are calculated using a
 The support vector machines in scikit-learn support both dense (numpy.ndarray and convertible to that by numpy.asarray) and sparse (any scipy.sparse) sample vectors as input. However, to use an SVM to make predictions for sparse data, it must have been fit on such data. For optimal performance, use C-ordered numpy.ndarray (dense) or scipy.sparse.csr_matrix (sparse) with dtype=float64.
 """
 
-result = chain.invoke({'text':text})
+    result = chain.invoke({'text':text}, config=profile_config(chain))
 
-print(result)
+    print(result)
 
-chain.get_graph().print_ascii()
\ No newline at end of file
+    print_graph(chain)
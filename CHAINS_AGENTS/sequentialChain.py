@@ -1,10 +1,17 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import os
+import sys
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 load_dotenv()
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.chain_fusion import CHAIN_FUSION_ENABLED, fuse_chain
+from agent_common.chain_profiler import print_graph, profile_config
+from agent_common.models import create_chat_model
+
 prompt1 = PromptTemplate(
     template='Generate a detailed report on {topic}',
     input_variables=['topic']
@@ -15,14 +22,18 @@ prompt2 = PromptTemplate(
     input_variables=['text']
 )
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+model = create_chat_model(model="gemini-2.5-flash")
 
 parser = StrOutputParser()
 
 chain = prompt1 | model | parser | prompt2 | model | parser
 
-result = chain.invoke({'topic': 'Unemployment in India'})
+# CHAIN_FUSION=true: report and summary from one model call instead of two
+if CHAIN_FUSION_ENABLED:
+    chain = fuse_chain(chain, name='report_summary')
+
+result = chain.invoke({'topic': 'Unemployment in India'}, config=profile_config(chain))
 
 print(result)
 
-chain.get_graph().print_ascii()
\ No newline at end of file
+print_graph(chain)
\ No newline at end of file
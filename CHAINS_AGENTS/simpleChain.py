@@ -1,23 +1,29 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import os
+import sys
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 load_dotenv()
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.chain_profiler import print_graph, profile_config
+from agent_common.models import create_chat_model
+
 prompt = PromptTemplate(
     template='Generate 5 interesting facts about {topic}',
     input_variables=['topic']
 )
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+model = create_chat_model(model="gemini-2.5-flash")
 
 parser = StrOutputParser()
 
 chain = prompt | model | parser
 
-result = chain.invoke({'topic':'cricket'})
+result = chain.invoke({'topic':'cricket'}, config=profile_config(chain))
 
 print(result)
 
-chain.get_graph().print_ascii()
\ No newline at end of file
+print_graph(chain)
\ No newline at end of file
@@ -1,10 +1,25 @@
-from langchain_community.document_loaders import PyPDFLoader
+import os
+import sys
 
-loader = PyPDFLoader('dl-curriculum.pdf')
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.pdf_pages import PagedPdfLoader
 
-docs = loader.load()
+# Pages arrive one at a time while later ones are still being parsed. Reading
+# every page also writes the per-file cache (PDF_PAGE_CACHE_DIR), so a re-run
+# over the same file reads the cached text instead
+loader = PagedPdfLoader('dl-curriculum.pdf')
 
-print(len(docs))
+if __name__ == "__main__":
+    pages = loader.lazy_load()
 
-print(docs[0].page_content)
-print(docs[1].metadata)
\ No newline at end of file
+    first = next(pages)
+
+    print(first.metadata['total_pages'])
+
+    print(first.page_content)
+
+    second = next(pages)
+    print(second.metadata)
+
+    print(2 + sum(1 for _ in pages))
@@ -1,12 +1,17 @@
+import os
+import sys
 from langchain_community.document_loaders import TextLoader
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 
 load_dotenv()
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.models import create_chat_model
+
+model = create_chat_model(model="gemini-2.5-flash")
 
 prompt = PromptTemplate(
     template='Write a summary for the following poem - \n {poem}',
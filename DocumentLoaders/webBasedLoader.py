@@ -1,12 +1,19 @@
+import os
+import sys
 from langchain_community.document_loaders import WebBaseLoader
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 
 load_dotenv()
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.models import create_chat_model
+from agent_common.page_store import PageStore
+from langchain_core.documents import Document
+
+model = create_chat_model(model="gemini-2.5-flash")
 
 prompt = PromptTemplate(
     template='Answer the following question \n {question} from the following text - \n {text}',
@@ -16,9 +23,16 @@ prompt = PromptTemplate(
 parser = StrOutputParser()
 
 url = 'https://www.flipkart.com/apple-macbook-air-m2-16-gb-256-gb-ssd-macos-sequoia-mc7x4hn-a/p/itmdc5308fa78421'
-loader = WebBaseLoader(url)
 
-docs = loader.load()
+# Reuse the page if it was fetched recently (PAGE_STORE_MAX_AGE) instead of downloading it again
+page_store = PageStore()
+page = page_store.get(url)
+if page is not None:
+    docs = [Document(page_content=page["text"], metadata={"source": url, "title": page["title"]})]
+else:
+    loader = WebBaseLoader(url)
+    docs = loader.load()
+    page_store.put(url, docs[0].metadata.get("title", ""), docs[0].page_content)
 
 
 chain = prompt | model | parser
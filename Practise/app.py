@@ -1,10 +1,15 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import sys
 from dotenv import load_dotenv
 import os
-load_dotenv() 
+load_dotenv()
+
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.models import create_chat_model
+
 google_api_key = os.getenv("GOOGLE_API_KEY")
 
-model = ChatGoogleGenerativeAI(
+model = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0
 )
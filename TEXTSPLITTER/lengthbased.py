@@ -1,9 +1,12 @@
+import os
+import sys
 from langchain_text_splitters import CharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
 
-loader = PyPDFLoader('dl-curriculum.pdf')
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.pdf_pages import PagedPdfLoader
 
-docs = loader.load()
+loader = PagedPdfLoader('dl-curriculum.pdf')
 
 splitter = CharacterTextSplitter(
     chunk_size=200,
@@ -11,6 +14,13 @@ splitter = CharacterTextSplitter(
     separator=''
 )
 
-result = splitter.split_documents(docs)
+if __name__ == "__main__":
+    # Split page by page as the pages are parsed, so the first chunks are ready
+    # without waiting for the whole PDF; reading to the end writes the per-file cache
+    chunks = (chunk for page in loader.lazy_load() for chunk in splitter.split_documents([page]))
 
-print(result[1].page_content)
\ No newline at end of file
+    result = [next(chunks), next(chunks)]
+
+    print(result[1].page_content)
+
+    print(len(result) + sum(1 for _ in chunks))
@@ -2,7 +2,6 @@ import os
 import sys
 import requests
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -16,11 +15,21 @@ from email import encoders
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.prefetch import PREFETCH_ENABLED, extract_places, prefetch_middleware
+from agent_common.tool_concurrency import ToolConcurrencyMiddleware, bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, instrument
+
 # Get API keys from environment
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5/weather")
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").strip().lower() != "false"
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS", "").strip("'\"")  # Remove quotes if present
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "").strip("'\"")  # Remove quotes if present
 
@@ -49,7 +58,7 @@ def get_weather(city_name: str) -> str:
     """
     try:
         # OpenWeather API endpoint
-        base_url = "http://api.openweathermap.org/data/2.5/weather"
+        base_url = OPENWEATHER_BASE_URL
         params = {
             "q": city_name,
             "appid": OPENWEATHER_API_KEY,
@@ -134,7 +143,8 @@ def send_email(email_input: str) -> str:
         
         # Create SMTP session
         server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
+        if SMTP_USE_TLS:
+            server.starttls()
         server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
         
         # Send email
@@ -148,7 +158,7 @@ def send_email(email_input: str) -> str:
         return f"Error sending email: {str(e)}"
 
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
@@ -156,13 +166,34 @@ chat = ChatGoogleGenerativeAI(
 # Define tools - both weather and email
 tools = [get_weather, send_email]
 
+# Start get_weather for the places named in the request while the model plans (enable with AGENT_PREFETCH=true)
+weather_prefetch = prefetch_middleware(
+    {"get_weather": lambda text: [{"city_name": place} for place in extract_places(text)]},
+    tools,
+)
+
 # Create agent graph using the new LangChain 1.x API
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True  # debug=True enables verbose output
+    middleware=weather_prefetch + [
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+        # Protect upstream services when the model asks for several calls at once
+        ToolConcurrencyMiddleware({"get_weather": 4, "send_email": 1}),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "weather_email_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("Weather & Email Agent is ready!")
@@ -202,3 +233,5 @@ if __name__ == "__main__":
     else:
         print(f"\nResult: {result}")
 
+    if PREFETCH_ENABLED:
+        print(f"\nPrefetch: {weather_prefetch[0].stats()}")
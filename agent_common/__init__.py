@@ -0,0 +1,7 @@
+"""
+Shared helpers used by the agents in this repository.
+
+The agents are plain scripts that are run from their own folder
+(``cd weather_agent && python app.py``), so each ``app.py`` adds the
+repository root to ``sys.path`` before importing from this package.
+"""
@@ -0,0 +1,78 @@
+"""
+Okapi BM25 ranking for small, in-memory document sets.
+
+Used to pick the passages of fetched pages (or notes) that best match a query
+without an embedding model. Documents are tokenized into lowercase words;
+common English stop words are dropped so that "what is the" does not decide
+the ranking.
+"""
+
+import math
+import re
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+STOP_WORDS = set("""
+a an and are as at be by for from has have how i in is it its of on or that the this to was were what when
+where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens of ``text`` without stop words."""
+    return [token for token in TOKEN_PATTERN.findall(text.casefold()) if token not in STOP_WORDS]
+
+
+def idf(document_frequency: int, total_documents: int) -> float:
+    """Inverse document frequency of a term (the Lucene variant, never negative)."""
+    return math.log(1 + (total_documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def term_score(tf: int, term_idf: float, length: int, average_length: float, k1: float = 1.5,
+               b: float = 0.75) -> float:
+    """BM25 contribution of one query term to one document."""
+    norm = k1 * (1 - b + b * length / (average_length or 1.0))
+    return term_idf * tf * (k1 + 1) / (tf + norm)
+
+
+class BM25:
+    """
+    BM25 scores of a query against a fixed list of documents.
+
+    Args:
+        documents: Texts to rank
+        k1: Term frequency saturation
+        b: Strength of the document length normalization
+    """
+
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {term: idf(df, total) for term, df in document_frequency.items()}
+
+    def score(self, query_terms: list, index: int) -> float:
+        counts = self.term_counts[index]
+        total = 0.0
+        for term in query_terms:
+            tf = counts.get(term)
+            if tf:
+                total += term_score(tf, self.idf[term], self.lengths[index], self.average_length, self.k1, self.b)
+        return total
+
+    def scores(self, query: str) -> list:
+        """Score of every document, in document order."""
+        terms = tokenize(query)
+        return [self.score(terms, i) for i in range(len(self.term_counts))]
+
+    def top_k(self, query: str, k: int) -> list:
+        """(index, score) of the ``k`` best matching documents with a positive score, best first."""
+        ranked = sorted(enumerate(self.scores(query)), key=lambda item: item[1], reverse=True)
+        return [(index, score) for index, score in ranked[:k] if score > 0]
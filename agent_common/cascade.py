@@ -0,0 +1,204 @@
+"""
+Model cascades: answer with the cheapest stage that is good enough.
+
+Small classification-style calls (language detection, tag suggestions,
+sentiment) do not need ``gemini-2.5-flash`` most of the time. A
+``ModelCascade`` tries its stages in order, typically a local heuristic, then
+``gemini-2.5-flash-lite``, then ``gemini-2.5-flash``, and escalates only when
+a stage declines, fails, produces output the validator rejects, or reports a
+confidence below the threshold. The last stage's answer is used as-is.
+
+Each cascade keeps per-stage counts and latency samples (``stats()``) and
+reports them as metrics, so the escalation rate of every tool is visible.
+
+Configuration (read from the environment / .env file):
+    CASCADE_SMALL_MODEL=gemini-2.5-flash-lite   Cheap model tried before the default model
+    CASCADE_MIN_CONFIDENCE=0.7                  Confidence a non-final stage needs to answer
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from agent_common.tracing import METRICS
+
+SMALL_MODEL = os.getenv("CASCADE_SMALL_MODEL", "gemini-2.5-flash-lite")
+MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+
+METRICS.describe("agent_cascade_total", "Cascade stage attempts, by outcome (accepted, declined, rejected, "
+                                        "low_confidence, error, final)")
+METRICS.describe("agent_cascade_seconds", "Latency of cascaded calls, by the stage that answered")
+
+# Latency samples kept per stage for stats()
+SAMPLE_WINDOW = 1000
+
+
+@dataclass
+class Candidate:
+    """A stage's answer and how sure the stage is about it (0..1)."""
+
+    value: Any
+    confidence: float = 1.0
+
+
+@dataclass
+class CascadeStage:
+    """
+    One step of a cascade.
+
+    ``run`` receives the cascade's arguments and returns a ``Candidate``, or
+    ``None`` to pass the request on to the next stage. ``min_confidence``
+    overrides the cascade's threshold for this stage.
+    """
+
+    name: str
+    run: Callable[..., Optional[Candidate]]
+    min_confidence: Optional[float] = None
+
+
+def model_stage(name: str, model, prompt: Callable[..., str], parse: Callable[[str], Optional[Candidate]]):
+    """
+    Stage that asks ``model`` and parses the reply.
+
+    Args:
+        name: Stage name used in stats and metrics (usually the model name)
+        model: Chat model to call
+        prompt: Builds the prompt from the cascade's arguments
+        parse: Turns the reply text into a Candidate, or None when unusable
+    """
+    def run(*args, **kwargs):
+        response = model.invoke(prompt(*args, **kwargs))
+        text = response.content if hasattr(response, "content") else str(response)
+        return parse(text.strip()) if isinstance(text, str) else None
+    return CascadeStage(name, run)
+
+
+def parse_json_answer(text: str, key: str) -> Optional[Candidate]:
+    """
+    Parse ``{"<key>": ..., "confidence": 0.9}`` from a model reply.
+
+    Code fences and surrounding text are ignored; a missing confidence counts as 0.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match is None:
+        return None
+    try:
+        payload = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or payload.get(key) in (None, ""):
+        return None
+    try:
+        confidence = float(payload.get("confidence", 0.0))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return Candidate(payload[key], max(0.0, min(1.0, confidence)))
+
+
+class ModelCascade:
+    """
+    Run stages in order until one produces a valid, confident answer.
+
+    Args:
+        tool_name: Name used in stats and metrics
+        stages: Stages from cheapest to most capable
+        validate: Called with a candidate value and the cascade's arguments;
+                  returns True when the value is acceptable
+        min_confidence: Confidence a non-final stage needs for its answer to be used
+    """
+
+    def __init__(self, tool_name: str, stages: list, validate: Callable[[Any], bool] = None,
+                 min_confidence: float = MIN_CONFIDENCE):
+        self.tool_name = tool_name
+        self.stages = stages
+        self.validate = validate or (lambda value, *args, **kwargs: True)
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._answered = {stage.name: 0 for stage in stages}
+        self._latencies = {stage.name: deque(maxlen=SAMPLE_WINDOW) for stage in stages}
+        _CASCADES[tool_name] = self
+
+    def __call__(self, *args, **kwargs):
+        """Return the value of the first stage that is accepted (or of the last stage)."""
+        start = time.perf_counter()
+        for index, stage in enumerate(self.stages):
+            final = index == len(self.stages) - 1
+            try:
+                candidate = stage.run(*args, **kwargs)
+            except Exception:
+                self._record(stage, "error")
+                if final:
+                    raise
+                continue
+            outcome = self._judge(stage, candidate, args, kwargs)
+            if final and candidate is not None:
+                outcome = "accepted" if outcome == "accepted" else "final"
+            self._record(stage, outcome)
+            if outcome in ("accepted", "final"):
+                self._answer(stage, time.perf_counter() - start)
+                return candidate.value
+        raise ValueError(f"No stage of the {self.tool_name} cascade produced an answer")
+
+    def _judge(self, stage, candidate, args, kwargs) -> str:
+        if candidate is None:
+            return "declined"
+        try:
+            valid = self.validate(candidate.value, *args, **kwargs)
+        except Exception:
+            valid = False
+        if not valid:
+            return "rejected"
+        threshold = self.min_confidence if stage.min_confidence is None else stage.min_confidence
+        if candidate.confidence < threshold:
+            return "low_confidence"
+        return "accepted"
+
+    def _record(self, stage, outcome):
+        METRICS.inc("agent_cascade_total", tool=self.tool_name, stage=stage.name, outcome=outcome)
+
+    def _answer(self, stage, seconds):
+        with self._lock:
+            self._answered[stage.name] += 1
+            self._latencies[stage.name].append(seconds)
+        METRICS.observe("agent_cascade_seconds", seconds, tool=self.tool_name, stage=stage.name)
+
+    def reset(self):
+        """Clear the counts and latency samples behind ``stats()``."""
+        with self._lock:
+            self._answered = {stage.name: 0 for stage in self.stages}
+            self._latencies = {stage.name: deque(maxlen=SAMPLE_WINDOW) for stage in self.stages}
+
+    def stats(self) -> dict:
+        """Answers per stage, escalation rate and latency percentiles (ms) per answering stage."""
+        with self._lock:
+            answered = dict(self._answered)
+            samples = {name: sorted(values) for name, values in self._latencies.items()}
+        total = sum(answered.values())
+        first = self.stages[0].name
+        latency = {}
+        for name, values in samples.items():
+            if values:
+                latency[name] = {
+                    "count": len(values),
+                    "p50_ms": round(values[len(values) // 2] * 1000, 3),
+                    "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 3),
+                }
+        return {
+            "calls": total,
+            "answered_by": answered,
+            "escalation_rate": round((total - answered[first]) / total, 4) if total else 0.0,
+            "latency": latency,
+        }
+
+
+_CASCADES = {}
+
+
+def cascade_report() -> dict:
+    """``stats()`` of every cascade created in this process, keyed by tool name."""
+    return {name: cascade.stats() for name, cascade in _CASCADES.items()}
@@ -0,0 +1,174 @@
+"""
+Stage fusion: run consecutive prompt → model → parser stages as one model call.
+
+``prompt1 | model | parser | prompt2 | model | parser`` costs two round-trips,
+and the whole output of the first stage is sent back to the model as input
+of the second. ``fuse_chain`` rewrites such runs of stages (same model object,
+``StrOutputParser``, every later prompt taking the previous output as its only
+variable) into a ``FusedStages`` step that asks the model for every stage's
+output in one JSON object, ``{"step_1": "...", "step_2": "..."}``.
+
+The reply is validated: each step must be present and a non-empty string (and
+pass the optional ``validate`` callable). Steps after the first invalid one
+run unfused, with the usual prompts, starting from the last valid output, so
+a bad reply costs at most the unfused requests again. The chain's output is
+the last step's output either way.
+
+Enable in the chains with ``CHAIN_FUSION=true`` in the environment / .env file.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Callable, Optional
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda, RunnableSequence
+
+from agent_common.tracing import METRICS
+
+CHAIN_FUSION_ENABLED = os.getenv("CHAIN_FUSION", "false").strip().lower() in ("1", "true", "yes", "on")
+
+METRICS.describe("agent_chain_fusion_total", "Fused chain calls, by outcome (fused, partial, fallback)")
+
+FUSED_PROMPT = """Complete the following {count} steps in order. Each step after the first works on the result of the step before it.
+
+{steps}
+
+Respond with a JSON object only, with the complete result of every step as a string:
+{{{keys}}}"""
+
+
+class FusedStages:
+    """
+    Consecutive ``(prompt, model, parser)`` stages answered by one model call.
+
+    Args:
+        name: Name used in stats, metrics and the chain graph
+        stages: ``(prompt, model, parser)`` tuples; later prompts have one input variable
+        validate: Called with the list of step outputs; returns True when they are acceptable
+    """
+
+    def __init__(self, name: str, stages: list, validate: Callable[[list], bool] = None):
+        self.name = name
+        self.stages = stages
+        self.model = stages[0][1]
+        self.validate = validate or (lambda outputs: True)
+        self._lock = threading.Lock()
+        self.counts = {"fused": 0, "partial": 0, "fallback": 0}
+        _FUSED[name] = self
+
+    def prompt(self, inputs) -> str:
+        """The single prompt asking for every step's output."""
+        steps = []
+        for index, (prompt, _, _) in enumerate(self.stages, 1):
+            if index == 1:
+                text = prompt.format(**inputs) if isinstance(inputs, dict) else prompt.format(
+                    **{prompt.input_variables[0]: inputs})
+            else:
+                text = prompt.format(**{prompt.input_variables[0]: f"<the result of step {index - 1}>"})
+            steps.append(f"Step {index}:\n{text.strip()}")
+        keys = ", ".join(f'"step_{index}": "..."' for index in range(1, len(self.stages) + 1))
+        return FUSED_PROMPT.format(count=len(self.stages), steps="\n\n".join(steps), keys=keys)
+
+    def parse(self, reply: str) -> list:
+        """Valid step outputs of a fused reply, from the first step up to the first invalid one."""
+        match = re.search(r"\{.*\}", reply, re.DOTALL)
+        if match is None:
+            return []
+        try:
+            payload = json.loads(match.group(0))
+        except ValueError:
+            return []
+        if not isinstance(payload, dict):
+            return []
+        outputs = []
+        for index in range(1, len(self.stages) + 1):
+            value = payload.get(f"step_{index}")
+            if not isinstance(value, str) or not value.strip():
+                break
+            outputs.append(value)
+        if len(outputs) == len(self.stages):
+            try:
+                valid = self.validate(outputs)
+            except Exception:
+                valid = False
+            if not valid:
+                # Only the last step is re-run; earlier outputs are as good as unfused ones
+                outputs.pop()
+        return outputs
+
+    def run(self, inputs, config=None) -> list:
+        """Every step's output: from the fused call where valid, the remaining steps unfused."""
+        try:
+            reply = self.model.invoke(self.prompt(inputs), config)
+            outputs = self.parse(StrOutputParser().invoke(reply))
+        except Exception:
+            outputs = []
+        outcome = ("fused" if len(outputs) == len(self.stages) else "partial" if outputs else "fallback")
+        value = outputs[-1] if outputs else inputs
+        for prompt, model, parser in self.stages[len(outputs):]:
+            value = (prompt | model | parser).invoke(value, config)
+            outputs.append(value)
+        with self._lock:
+            self.counts[outcome] += 1
+        METRICS.inc("agent_chain_fusion_total", chain=self.name, outcome=outcome)
+        return outputs
+
+    def as_runnable(self) -> Runnable:
+        """Chain step returning the last step's output."""
+        return RunnableLambda(lambda inputs, config: self.run(inputs, config)[-1], name=self.name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {**counts, "fallback_rate": round((total - counts["fused"]) / total, 4) if total else 0.0}
+
+
+_FUSED = {}
+
+
+def fusion_report() -> dict:
+    """``stats()`` of every fused segment created in this process, keyed by name."""
+    return {name: fused.stats() for name, fused in _FUSED.items()}
+
+
+def _stage_at(steps: list, index: int) -> Optional[tuple]:
+    if index + 2 >= len(steps):
+        return None
+    prompt, model, parser = steps[index:index + 3]
+    if not isinstance(prompt, BasePromptTemplate) or type(parser) is not StrOutputParser:
+        return None
+    return prompt, model, parser
+
+
+def fuse_chain(chain: Runnable, name: str = "fused", validate: Callable[[list], bool] = None) -> Runnable:
+    """
+    Replace runs of two or more fusable stages in ``chain`` with ``FusedStages``.
+
+    A stage is ``prompt | model | StrOutputParser()``; the stages of one run use
+    the same model object, and every prompt after the first has exactly one
+    input variable. Chains without such a run are returned unchanged.
+    """
+    steps = list(chain.steps) if isinstance(chain, RunnableSequence) else [chain]
+    fused_steps, index, segments = [], 0, 0
+    while index < len(steps):
+        run = []
+        stage = _stage_at(steps, index)
+        while stage is not None and (not run or (stage[1] is run[0][1] and len(stage[0].input_variables) == 1)):
+            run.append(stage)
+            stage = _stage_at(steps, index + 3 * len(run))
+        if len(run) < 2:
+            fused_steps.append(steps[index])
+            index += 1
+            continue
+        segments += 1
+        segment = FusedStages(name if segments == 1 else f"{name}_{segments}", run, validate)
+        fused_steps.append(segment.as_runnable())
+        index += 3 * len(run)
+    if not segments:
+        return chain
+    return fused_steps[0] if len(fused_steps) == 1 else RunnableSequence(*fused_steps)
@@ -0,0 +1,367 @@
+"""
+Profile LCEL chains and draw ``chain.get_graph()`` annotated with the timings.
+
+``chain.get_graph().print_ascii()`` shows a chain's structure but not where
+the time goes. ``ChainProfiler`` is a callback handler that records every run
+inside a chain invocation (prompts, models, parsers, parallel arms, branch
+conditions and branches, nested calls) with its wall time, queueing time and
+token counts. Queueing time is how long a run waited after it could have
+started: after the previous step of its sequence (or condition of its branch)
+finished, or after its parent started, e.g. a parallel arm waiting for a
+worker thread.
+
+Runs are matched to graph nodes through the position tags LangChain gives
+child runs (``seq:step:2``, ``map:key:notes``, ...), so a model used twice
+in a chain still gets two annotated nodes. Runs inside a node that the graph
+does not expand (a ``RunnableBranch``, a ``RunnableLambda`` calling models)
+count towards that node. The critical path of the slowest invocation follows
+the arm of a ``RunnableParallel`` that finished last and the branch that was
+taken; its nodes are marked with ``*``.
+
+``chrome_trace()`` exports every run in the Chrome trace event format, for
+chrome://tracing, https://ui.perfetto.dev or speedscope (flame graph view).
+
+The chain scripts use ``profile_config(chain)`` when invoking and
+``print_graph(chain)`` instead of ``chain.get_graph().print_ascii()``.
+
+Configuration (read from the environment / .env file):
+    CHAIN_PROFILE=false        Profile the chain scripts and print the annotated graph
+    CHAIN_PROFILE_TRACE=path   Also write the Chrome trace JSON of the profiled runs to this file
+"""
+
+import json
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable, RunnableParallel, RunnableSequence
+from langchain_core.runnables.graph_ascii import draw_ascii
+
+from agent_common.tracing import _model_name, _token_usage
+
+CHAIN_PROFILE_ENABLED = os.getenv("CHAIN_PROFILE", "false").strip().lower() in ("1", "true", "yes", "on")
+CHAIN_PROFILE_TRACE = os.getenv("CHAIN_PROFILE_TRACE", "")
+
+# Tags LangChain puts on child runs to say where in the parent they run
+POSITION_TAGS = ("seq:step:", "map:key:", "condition:", "branch:")
+
+
+class ProfiledRun:
+    """One run recorded by the profiler (times from ``time.perf_counter()``)."""
+
+    __slots__ = ("run_id", "parent", "name", "kind", "position", "start", "end", "thread",
+                 "input_tokens", "output_tokens", "error", "children")
+
+    def __init__(self, run_id, parent, name, kind, position):
+        self.run_id = run_id
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.position = position
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread = threading.get_ident()
+        self.input_tokens = self.output_tokens = 0
+        self.error = None
+        self.children = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def path(self) -> tuple:
+        """Position tags from the root run down to this run."""
+        path, run = [], self
+        while run.parent is not None:
+            # Runs a node makes itself (e.g. a model called from a lambda) carry no position tag
+            path.append(run.position or run.name)
+            run = run.parent
+        return tuple(reversed(path))
+
+    @property
+    def ready(self) -> float:
+        """When the run could have started (a first step could start when its parent could)."""
+        parent = self.parent
+        if parent is None:
+            return self.start
+        kind, _, index = (self.position or "").rpartition(":")
+        if kind in ("seq:step", "condition") and index.isdigit() and int(index) > 1:
+            previous = f"{kind}:{int(index) - 1}"
+        elif kind == "branch":
+            conditions = [child for child in parent.children if (child.position or "").startswith("condition:")]
+            previous = conditions[-1].position if conditions else None
+        else:
+            previous = None
+        finished = [child.end for child in parent.children
+                    if previous and child.position == previous and child.end is not None]
+        return max(finished) if finished else parent.ready
+
+    @property
+    def queue(self) -> float:
+        return max(0.0, self.start - self.ready)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _leaves(runnable: Runnable, path: tuple = ()):
+    """(path, runnable) of the runnables ``get_graph()`` draws as nodes, in drawing order."""
+    if isinstance(runnable, RunnableSequence):
+        for index, step in enumerate(runnable.steps, 1):
+            yield from _leaves(step, path + (f"seq:step:{index}",))
+    elif isinstance(runnable, RunnableParallel):
+        for key, step in runnable.steps__.items():
+            yield from _leaves(step, path + (f"map:key:{key}",))
+    else:
+        yield path, runnable
+
+
+def _critical_path(run: ProfiledRun) -> list:
+    """Innermost runs on the longest chain of dependent runs, in order."""
+    finished = [child for child in run.children if child.end is not None]
+    if not finished:
+        return [run]
+    path, cursor = [], run.end
+    while True:
+        # The child that finished last before the cursor held up everything after it
+        candidates = [child for child in finished if child.end <= cursor]
+        if not candidates:
+            return path or [run]
+        child = max(candidates, key=lambda candidate: candidate.end)
+        path = _critical_path(child) + path
+        cursor = child.start
+
+
+def _ms(seconds: float) -> str:
+    milliseconds = seconds * 1000
+    return f"{milliseconds:.1f}ms" if milliseconds < 10 else f"{milliseconds:.0f}ms"
+
+
+class ChainProfiler(BaseCallbackHandler):
+    """
+    Callback handler recording the runs of one chain's invocations.
+
+    Pass it in the invoke config: ``chain.invoke(inputs, config={"callbacks": [profiler]})``.
+    Every top-level run is one invocation; ``reset()`` forgets them.
+    """
+
+    run_inline = True
+
+    def __init__(self, chain: Runnable):
+        self.chain = chain
+        self._lock = threading.Lock()
+        self._runs = {}
+        self.invocations = []
+
+    def reset(self):
+        with self._lock:
+            self._runs.clear()
+            self.invocations = []
+
+    # -- recording ---------------------------------------------------------
+
+    def _start(self, run_id, parent_run_id, name, kind, tags):
+        position = next((tag for tag in tags or () if tag.startswith(POSITION_TAGS)), None)
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+            run = ProfiledRun(run_id, parent, name, kind, position)
+            self._runs[run_id] = run
+            if parent is not None:
+                parent.children.append(run)
+            elif parent_run_id is None:
+                self.invocations.append(run)
+
+    def _end(self, run_id, error=None):
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is not None:
+            run.end = time.perf_counter()
+            if error is not None:
+                run.error = f"{type(error).__name__}: {error}"
+        return run
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        name = kwargs.get("name") or ((serialized or {}).get("id") or ["chain"])[-1]
+        self._start(run_id, parent_run_id, name, "chain", tags)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None,
+                            metadata=None, **kwargs):
+        model = _model_name(serialized, metadata, kwargs.get("invocation_params"))
+        self._start(run_id, parent_run_id, f"llm {model}", "llm", tags)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        model = _model_name(serialized, metadata, kwargs.get("invocation_params"))
+        self._start(run_id, parent_run_id, f"llm {model}", "llm", tags)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._end(run_id)
+        if run is not None:
+            run.input_tokens, run.output_tokens = _token_usage(response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # -- analysis ----------------------------------------------------------
+
+    def _finished(self) -> list:
+        with self._lock:
+            return [run for run in self.invocations if run.end is not None]
+
+    def slowest(self):
+        """The slowest finished invocation, or None."""
+        return max(self._finished(), key=lambda run: run.duration, default=None)
+
+    def critical_path(self) -> list:
+        """Innermost runs on the critical path of the slowest invocation."""
+        slowest = self.slowest()
+        return _critical_path(slowest) if slowest else []
+
+    def node_stats(self, graph=None) -> list:
+        """
+        Per graph node: mean wall and queueing time over its runs, tokens of its
+        runs and the runs inside them, and whether it is on the critical path.
+
+        Node ids are generated by ``get_graph()``; pass the graph the ids should refer to.
+        """
+        graph = graph or self.chain.get_graph()
+        leaves = list(_leaves(self.chain))
+        nodes = [node for node in graph.nodes.values() if isinstance(node.data, Runnable)]
+        by_path = {}
+        for run in self._finished():
+            for inner in run.walk():
+                if inner.end is not None:
+                    by_path.setdefault(inner.path, []).append(inner)
+        critical = set()
+        for run in self.critical_path():
+            while run is not None:
+                critical.add(run.run_id)
+                run = run.parent
+
+        stats, used = [], set()
+        for path, runnable in leaves:
+            node = next((node for node in nodes if node.data is runnable and node.id not in used), None)
+            if node is None:
+                continue
+            used.add(node.id)
+            runs = by_path.get(path, [])
+            inner = [each for run in runs for each in run.walk()]
+            stats.append({
+                "id": node.id,
+                "name": node.name,
+                "path": "/".join(path),
+                "calls": len(runs),
+                "wall_ms": round(sum(run.duration for run in runs) / len(runs) * 1000, 3) if runs else None,
+                "queue_ms": round(sum(run.queue for run in runs) / len(runs) * 1000, 3) if runs else None,
+                "input_tokens": sum(run.input_tokens for run in inner),
+                "output_tokens": sum(run.output_tokens for run in inner),
+                "errors": sum(run.error is not None for run in runs),
+                "critical": any(run.run_id in critical for run in runs),
+            })
+        return stats
+
+    def render(self) -> str:
+        """The chain graph with timings per node, the critical path and a table of the numbers."""
+        graph = self.chain.get_graph()
+        stats = self.node_stats(graph)
+        labels = {node.id: node.name for node in graph.nodes.values()}
+        for node in stats:
+            if not node["calls"]:
+                continue
+            label = f"{'*' if node['critical'] else ''}{node['name']} {_ms(node['wall_ms'] / 1000)}"
+            if node["queue_ms"] >= 1:
+                label += f" q{_ms(node['queue_ms'] / 1000)}"
+            if node["input_tokens"] or node["output_tokens"]:
+                label += f" {node['input_tokens']}/{node['output_tokens']}tok"
+            labels[node["id"]] = label
+        lines = [draw_ascii(labels, graph.edges) if len(labels) > 1 else next(iter(labels.values()))]
+
+        slowest = self.slowest()
+        if slowest is not None:
+            path = self.critical_path()
+            lines.append(f"\nCritical path of the slowest of {len(self._finished())} invocation(s), "
+                         f"{_ms(slowest.duration)}:")
+            lines.append("  " + " -> ".join(f"{run.name} {_ms(run.duration)}" for run in path))
+        lines.append("")
+        lines.append(f"{'node':<40} {'calls':>5} {'wall':>9} {'queue':>9} {'tokens in/out':>14}")
+        for node in stats:
+            name = ("* " if node["critical"] else "  ") + f"{node['path'] or node['name']} {node['name']}"
+            wall = _ms(node["wall_ms"] / 1000) if node["calls"] else "-"
+            queue = _ms(node["queue_ms"] / 1000) if node["calls"] else "-"
+            tokens = f"{node['input_tokens']}/{node['output_tokens']}"
+            lines.append(f"{name[:40]:<40} {node['calls']:>5} {wall:>9} {queue:>9} {tokens:>14}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> dict:
+        """Every recorded run as Chrome trace events (one lane per concurrently running sibling)."""
+        invocations = self._finished()
+        origin = min((run.start for run in invocations), default=0.0)
+        events, lanes, next_lane = [], {}, [0]
+
+        def place(run, lane):
+            # Siblings that overlap in time go to separate lanes so every lane nests properly
+            siblings = [other for other in (run.parent.children if run.parent else invocations)
+                        if other is not run and lanes.get(other.run_id) == lane and other.end is not None
+                        and other.start < run.end and run.start < other.end]
+            if siblings:
+                next_lane[0] += 1
+                lane = next_lane[0]
+            lanes[run.run_id] = lane
+            events.append({
+                "name": run.name,
+                "cat": run.kind,
+                "ph": "X",
+                "ts": round((run.start - origin) * 1e6, 1),
+                "dur": round(run.duration * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": lane,
+                "args": {key: value for key, value in {
+                    "path": "/".join(run.path), "queue_ms": round(run.queue * 1000, 3),
+                    "input_tokens": run.input_tokens, "output_tokens": run.output_tokens,
+                    "thread": run.thread, "error": run.error,
+                }.items() if value not in (None, "", 0)},
+            })
+            for child in sorted(run.children, key=lambda child: child.start):
+                if child.end is not None:
+                    place(child, lane)
+
+        for run in sorted(invocations, key=lambda run: run.start):
+            place(run, 0)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+_PROFILERS = {}
+
+
+def profile_config(chain: Runnable, config: dict = None) -> dict:
+    """Invoke config for ``chain``: with a ``ChainProfiler`` callback when CHAIN_PROFILE is on."""
+    config = dict(config or {})
+    if CHAIN_PROFILE_ENABLED:
+        profiler = _PROFILERS.setdefault(id(chain), ChainProfiler(chain))
+        config["callbacks"] = list(config.get("callbacks") or []) + [profiler]
+    return config
+
+
+def print_graph(chain: Runnable):
+    """Print the chain graph, annotated with the profiled runs when CHAIN_PROFILE is on."""
+    profiler = _PROFILERS.get(id(chain))
+    if profiler is None:
+        chain.get_graph().print_ascii()
+        return
+    print(profiler.render())
+    if CHAIN_PROFILE_TRACE:
+        profiler.save_chrome_trace(CHAIN_PROFILE_TRACE)
+        print(f"\nChrome trace written to {CHAIN_PROFILE_TRACE}")
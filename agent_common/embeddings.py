@@ -0,0 +1,103 @@
+"""
+Text embeddings for vector search.
+
+``HashingEmbeddings`` needs no model and no network: each word (and a short
+prefix of longer words, so "budgets" and "budgeting" share a feature) is
+hashed into one of ``dim`` signed buckets, weighted by 1 + log(tf), and the
+vector is L2-normalized. Texts with overlapping vocabulary end up with a high
+cosine similarity. It is deterministic across processes, so vectors can be
+stored on disk.
+
+``create_embeddings`` picks the hashing embeddings or Google's embedding
+model (the one TEXTSPLITTER/semanticbased.py uses) by name. Both expose
+``name``, ``dim`` and ``embed(texts)``, which returns a float32 matrix with
+one unit-length row per text.
+"""
+
+import math
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from agent_common.bm25 import tokenize
+
+GOOGLE_EMBEDDING_MODEL = "models/embedding-001"
+
+# Words longer than this also contribute their prefix as a feature
+PREFIX_LENGTH = 5
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbeddings:
+    """
+    Feature-hashing embeddings computed locally.
+
+    Args:
+        dim: Vector dimensions (buckets)
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._buckets = {}
+
+    def _bucket(self, feature: str) -> int:
+        """Signed bucket of a feature: +/-(index + 1)."""
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            value = zlib.crc32(feature.encode("utf-8"))
+            bucket = (value % self.dim + 1) * (1 if value & 0x80000000 else -1)
+            if len(self._buckets) < 500000:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def embed(self, texts: list) -> np.ndarray:
+        """Embed a batch of texts into an (n, dim) float32 matrix."""
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            features = Counter()
+            for token in tokenize(text):
+                features[token] += 1
+                if len(token) > PREFIX_LENGTH:
+                    features[token[:PREFIX_LENGTH] + "~"] += 1
+            for feature, count in features.items():
+                bucket = self._bucket(feature)
+                rows.append(row)
+                columns.append(abs(bucket) - 1)
+                values.append(math.copysign(1 + math.log(count), bucket))
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)),
+                  np.array(values, dtype=np.float32))
+        return _normalize(matrix)
+
+
+class GoogleEmbeddings:
+    """Gemini embeddings through langchain-google-genai (needs GOOGLE_API_KEY)."""
+
+    def __init__(self, model: str = GOOGLE_EMBEDDING_MODEL):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self._model = GoogleGenerativeAIEmbeddings(model=model)
+        self.name = f"google-{model.rsplit('/', 1)[-1]}"
+        self.dim = len(self._model.embed_query("dimension probe"))
+
+    def embed(self, texts: list) -> np.ndarray:
+        return _normalize(np.array(self._model.embed_documents(list(texts)), dtype=np.float32))
+
+
+def create_embeddings(name: str = "hashing"):
+    """
+    Embeddings by name: "hashing" (local, default), "hashing-<dim>" or "google".
+    """
+    if name == "google":
+        return GoogleEmbeddings()
+    if name.startswith("hashing"):
+        _, _, dim = name.partition("-")
+        return HashingEmbeddings(int(dim) if dim else 256)
+    raise ValueError(f"Unknown embeddings '{name}' (use 'hashing', 'hashing-<dim>' or 'google')")
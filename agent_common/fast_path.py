@@ -0,0 +1,113 @@
+"""
+Deterministic fast path for simple, single-tool requests.
+
+A query like "What's the weather in Bangalore?" normally costs two model
+round-trips (plan the tool call, then phrase the answer) even though the tool
+output is already readable. ``FastPathMiddleware`` runs before the agent: if
+the latest user message matches a route's pattern exactly, the route calls the
+tool directly and the graph ends with that answer, without calling the model.
+Anything that does not match, or a route that declines (returns ``None``),
+goes through the normal agent loop.
+
+Enable with ``AGENT_FAST_PATH=true`` in the environment / .env file.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, hook_config
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent_common.tracing import METRICS
+
+FAST_PATH_ENABLED = os.getenv("AGENT_FAST_PATH", "false").strip().lower() in ("1", "true", "yes", "on")
+
+METRICS.describe("agent_fast_path_total", "Queries checked by the fast path, by outcome (hit, declined, miss)")
+
+
+@dataclass
+class FastPathRoute:
+    """
+    A pattern plus the handler that answers it.
+
+    The handler receives the regex match and returns the final answer, or
+    ``None`` to hand the query to the model after all (e.g. the tool failed).
+    """
+
+    name: str
+    pattern: str
+    handler: Callable[[re.Match], Optional[str]]
+
+    def __post_init__(self):
+        self.regex = re.compile(self.pattern, re.IGNORECASE | re.DOTALL)
+
+
+class FastPathRouter:
+    """Match queries against routes and keep hit-rate statistics."""
+
+    def __init__(self, agent_name: str, routes: list):
+        self.agent_name = agent_name
+        self.routes = routes
+        self._lock = threading.Lock()
+        self.counts = {"hit": 0, "declined": 0, "miss": 0}
+
+    def route(self, query: str):
+        """Return ``(route_name, answer)`` when a route answers the query, else ``None``."""
+        for route in self.routes:
+            match = route.regex.fullmatch(query.strip())
+            if match is None:
+                continue
+            answer = route.handler(match)
+            self._record("hit" if answer is not None else "declined", route.name)
+            return (route.name, answer) if answer is not None else None
+        self._record("miss", None)
+        return None
+
+    def _record(self, outcome, route_name):
+        with self._lock:
+            self.counts[outcome] += 1
+        METRICS.inc("agent_fast_path_total", agent=self.agent_name, route=route_name or "none", outcome=outcome)
+
+    @property
+    def hit_rate(self) -> float:
+        with self._lock:
+            total = sum(self.counts.values())
+            return self.counts["hit"] / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        return {**counts, "hit_rate": round(self.hit_rate, 4)}
+
+
+class FastPathMiddleware(AgentMiddleware):
+    """Answer matching queries before the first model call."""
+
+    def __init__(self, router: FastPathRouter):
+        super().__init__()
+        self.router = router
+
+    @hook_config(can_jump_to=["end"])
+    def before_agent(self, state, runtime):
+        messages = state["messages"]
+        if not messages or not isinstance(messages[-1], HumanMessage):
+            return None
+        content = messages[-1].content
+        if not isinstance(content, str):
+            return None
+        routed = self.router.route(content)
+        if routed is None:
+            return None
+        route_name, answer = routed
+        return {
+            "messages": [AIMessage(content=answer, response_metadata={"fast_path": route_name})],
+            "jump_to": "end",
+        }
+
+
+def fast_path_middleware(router: FastPathRouter) -> list:
+    """Middleware list for ``create_agent``: the fast path when enabled, else nothing."""
+    return [FastPathMiddleware(router)] if FAST_PATH_ENABLED else []
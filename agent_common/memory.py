@@ -0,0 +1,371 @@
+"""
+Bounded conversation memory for multi-turn agent sessions.
+
+Every tool result is appended to the agent's message list, so a long session
+resends an ever-growing prompt. Two pieces keep that in check:
+
+- ``ConversationMemoryMiddleware`` runs before each model call. It truncates
+  bulky tool outputs (e.g. full note contents from ``read_note_from_file``) and,
+  once the history exceeds the token budget, folds the oldest turns into one
+  rolling summary message. The prompt size per model call stays bounded.
+- ``BoundedSessionSaver`` is an in-memory checkpointer that stores one
+  conversation per ``thread_id``. It keeps only the latest checkpoint of each
+  session, evicts the least recently used sessions beyond a cap and evicts a
+  session that outgrows a byte cap, so memory per session and in total is
+  bounded and reported by ``stats()``.
+
+Configuration (read from the environment / .env file):
+    AGENT_PROMPT_TOKEN_BUDGET=6000       Estimated prompt tokens before old turns are summarized
+    AGENT_MAX_TOOL_OUTPUT_CHARS=8000     Cap for tool outputs of the current turn
+    AGENT_OLD_TOOL_OUTPUT_CHARS=1000     Cap for tool outputs of earlier turns
+    AGENT_SESSION_MEMORY=false           Keep conversations between invocations (per thread_id)
+    AGENT_MAX_SESSIONS=100               Sessions kept before the least recently used is evicted
+    AGENT_MAX_SESSION_BYTES=4000000      Serialized bytes one session may hold before it is evicted (0 = no cap)
+"""
+
+import os
+import sys
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from agent_common.tracing import METRICS
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("AGENT_PROMPT_TOKEN_BUDGET", "6000"))
+MAX_TOOL_OUTPUT_CHARS = int(os.getenv("AGENT_MAX_TOOL_OUTPUT_CHARS", "8000"))
+OLD_TOOL_OUTPUT_CHARS = int(os.getenv("AGENT_OLD_TOOL_OUTPUT_CHARS", "1000"))
+SESSION_MEMORY_ENABLED = os.getenv("AGENT_SESSION_MEMORY", "false").strip().lower() in ("1", "true", "yes", "on")
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "100"))
+MAX_SESSION_BYTES = int(os.getenv("AGENT_MAX_SESSION_BYTES", "4000000"))
+
+DEFAULT_SESSION = "default"
+SUMMARY_ID = "conversation-summary"
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+METRICS.describe("agent_prompt_tokens", "Estimated prompt tokens sent per model call after trimming")
+METRICS.describe("agent_memory_summaries_total", "Times old turns were folded into the rolling summary")
+METRICS.describe("agent_memory_truncated_total", "Tool outputs truncated to fit the prompt budget")
+METRICS.describe("agent_memory_sessions", "Conversation sessions held by the session store")
+METRICS.describe("agent_memory_session_bytes", "Serialized bytes held by the session store")
+METRICS.describe("agent_memory_oversized_sessions_total", "Sessions evicted for exceeding the per-session byte cap")
+
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant.
+Keep facts, names, file names, decisions and open requests; drop tool output details that are no longer needed.
+Answer with the updated summary only, at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+def truncate_text(text: str, limit: int) -> str:
+    """Keep the head and tail of ``text`` so the result is at most ``limit`` characters."""
+    if len(text) <= limit:
+        return text
+    marker = f"\n...[{len(text) - limit} characters truncated]...\n"
+    keep = max(0, limit - len(marker))
+    head = keep * 3 // 4
+    return text[:head] + marker + text[len(text) - (keep - head):] if keep > head else text[:head] + marker
+
+
+def _is_summary(message) -> bool:
+    return message.id == SUMMARY_ID
+
+
+def _render(message) -> str:
+    """One line per message for the summary prompt."""
+    if isinstance(message, HumanMessage):
+        role = "User"
+    elif isinstance(message, ToolMessage):
+        role = f"Tool {message.name or ''}".strip()
+    else:
+        role = "Assistant"
+    text = message.content if isinstance(message.content, str) else str(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        calls = ", ".join(f"{call['name']}({call['args']})" for call in message.tool_calls)
+        text = f"{text} [called {calls}]".strip()
+    return f"{role}: {truncate_text(text, OLD_TOOL_OUTPUT_CHARS)}"
+
+
+class ConversationMemoryMiddleware(AgentMiddleware):
+    """
+    Keep the prompt of every model call under a token budget.
+
+    Args:
+        summary_model: Chat model used to write the rolling summary. Without one
+                       (or when the call fails) the summary is extractive: the
+                       first line of every folded message.
+        token_budget: Estimated prompt tokens that trigger summarization
+        max_tool_chars: Cap for tool outputs of the current turn
+        old_tool_chars: Cap for tool outputs of earlier turns
+        summary_words: Target length of the rolling summary
+    """
+
+    def __init__(self, summary_model=None, token_budget: int = PROMPT_TOKEN_BUDGET,
+                 max_tool_chars: int = MAX_TOOL_OUTPUT_CHARS, old_tool_chars: int = OLD_TOOL_OUTPUT_CHARS,
+                 summary_words: int = 200):
+        super().__init__()
+        self.summary_model = summary_model
+        self.token_budget = token_budget
+        self.max_tool_chars = max_tool_chars
+        self.old_tool_chars = old_tool_chars
+        self.summary_words = summary_words
+
+    def before_model(self, state, runtime):
+        messages = list(state["messages"])
+        for message in messages:
+            if message.id is None:
+                message.id = str(uuid.uuid4())
+
+        truncated = self._truncate_tool_outputs(messages)
+        tokens = count_tokens_approximately(messages)
+        if tokens <= self.token_budget:
+            self._observe(tokens)
+            # Messages keep their ids, so the reducer replaces them in place
+            return {"messages": truncated} if truncated else None
+
+        summary, recent = self._fold(messages, self._split_point(messages))
+        if summary is None:
+            self._observe(tokens)
+            return {"messages": truncated} if truncated else None
+        kept = [summary] + recent
+        self._observe(count_tokens_approximately(kept))
+        METRICS.inc("agent_memory_summaries_total")
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + kept}
+
+    def _truncate_tool_outputs(self, messages) -> list:
+        """Shorten oversized tool outputs in place; returns the replaced messages."""
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        replaced = []
+        for i, message in enumerate(messages):
+            if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+                continue
+            limit = self.old_tool_chars if i < last_human else self.max_tool_chars
+            if len(message.content) <= limit:
+                continue
+            messages[i] = message.model_copy(update={"content": truncate_text(message.content, limit)})
+            replaced.append(messages[i])
+            METRICS.inc("agent_memory_truncated_total", tool=message.name or "unknown")
+        return replaced
+
+    def _split_point(self, messages) -> int:
+        """
+        Index of the first message to keep verbatim.
+
+        Splits only at user messages so a tool call is never separated from its
+        result. Recent turns are kept while they fit in half the budget; the
+        latest turn is always kept.
+        """
+        turn_starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage) and not _is_summary(m)]
+        if not turn_starts:
+            return 0
+        split = turn_starts[-1]
+        for start in reversed(turn_starts[:-1]):
+            if count_tokens_approximately(messages[start:]) > self.token_budget // 2:
+                break
+            split = start
+        return split
+
+    def _fold(self, messages, split):
+        """Summarize everything before ``split`` together with the previous summary."""
+        previous = next((m for m in messages[:split] if _is_summary(m)), None)
+        folded = [m for m in messages[:split] if not _is_summary(m)]
+        if not folded:
+            return None, messages[split:]
+        previous_text = previous.content[len(SUMMARY_PREFIX):] if previous is not None else "(none)"
+        text = self._summarize(previous_text, folded)
+        summary = HumanMessage(content=SUMMARY_PREFIX + text, id=SUMMARY_ID)
+        return summary, messages[split:]
+
+    def _summarize(self, previous_text: str, folded) -> str:
+        rendered = "\n".join(_render(m) for m in folded)
+        if self.summary_model is not None:
+            prompt = SUMMARY_PROMPT.format(max_words=self.summary_words, summary=previous_text, messages=rendered)
+            try:
+                response = self.summary_model.invoke(prompt)
+                if isinstance(response.content, str) and response.content.strip():
+                    return response.content.strip()
+            except Exception:
+                # Fall back to the extractive summary; trimming must not fail the turn
+                pass
+        lines = [] if previous_text == "(none)" else [previous_text]
+        lines += [_render(m).split("\n", 1)[0][:200] for m in folded]
+        return truncate_text("\n".join(lines), self.summary_words * 8)
+
+    def _observe(self, tokens):
+        METRICS.observe("agent_prompt_tokens", tokens, buckets=TOKEN_BUCKETS)
+
+
+class BoundedSessionSaver(InMemorySaver):
+    """
+    In-memory checkpointer holding the latest state of at most ``max_sessions`` conversations.
+
+    Older checkpoints of a session are dropped as soon as a newer one is saved
+    (no time travel, but constant memory per session), and the least recently
+    used session is evicted once the cap is reached. A session whose state
+    grows beyond ``max_session_bytes`` is evicted as well; its next invocation
+    starts a new conversation. Byte counts are kept per session as it is saved,
+    so no save walks the state of the other sessions.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, max_session_bytes: int = MAX_SESSION_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self.max_session_bytes = max_session_bytes
+        self._sessions = OrderedDict()
+        self._bytes = {}
+        self._blob_keys = defaultdict(set)
+        self._write_keys = defaultdict(set)
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.evicted = 0
+        self.oversized = 0
+
+    def get_tuple(self, config):
+        with self._lock:
+            thread_id = config["configurable"].get("thread_id")
+            if thread_id in self._sessions:
+                self._sessions.move_to_end(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            saved = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            self._blob_keys[thread_id].update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+            self._prune(thread_id, checkpoint_ns, checkpoint)
+            self._sessions[thread_id] = True
+            self._sessions.move_to_end(thread_id)
+            self._set_bytes(thread_id, self._measure(thread_id))
+            while len(self._sessions) > self.max_sessions:
+                oldest = next(iter(self._sessions))
+                self._evict(oldest)
+                self.evicted += 1
+            self._enforce_byte_cap(thread_id)
+            self._publish()
+            return saved
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+            before = self._writes_size(key)
+            super().put_writes(config, writes, task_id, task_path)
+            if key in self.writes:
+                self._write_keys[thread_id].add(key)
+                self._sessions.setdefault(thread_id, True)
+            self._set_bytes(thread_id, self._bytes.get(thread_id, 0) + self._writes_size(key) - before)
+            self._enforce_byte_cap(thread_id)
+            self._publish()
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._evict(thread_id)
+            self._publish()
+
+    def _prune(self, thread_id, checkpoint_ns, checkpoint):
+        """Drop every checkpoint, pending write and channel blob the latest checkpoint does not need."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [c for c in checkpoints if c != checkpoint["id"]]:
+            del checkpoints[checkpoint_id]
+        write_keys = self._write_keys[thread_id]
+        for key in [k for k in write_keys if k[1] == checkpoint_ns and k[2] != checkpoint["id"]]:
+            self.writes.pop(key, None)
+            write_keys.discard(key)
+        versions = checkpoint["channel_versions"]
+        blob_keys = self._blob_keys[thread_id]
+        for key in [k for k in blob_keys if k[1] == checkpoint_ns and versions.get(k[2]) != k[3]]:
+            self.blobs.pop(key, None)
+            blob_keys.discard(key)
+
+    def _evict(self, thread_id):
+        """Drop a session and its byte count; only touches that session's own keys."""
+        self.storage.pop(thread_id, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self._sessions.pop(thread_id, None)
+        self._total_bytes -= self._bytes.pop(thread_id, 0)
+
+    def _enforce_byte_cap(self, thread_id):
+        size = self._bytes.get(thread_id, 0)
+        if not self.max_session_bytes or size <= self.max_session_bytes:
+            return
+        self._evict(thread_id)
+        self.oversized += 1
+        METRICS.inc("agent_memory_oversized_sessions_total")
+        print(f"BoundedSessionSaver: session {thread_id!r} holds {size} bytes "
+              f"(cap {self.max_session_bytes}), dropping its saved state", file=sys.stderr)
+
+    def _writes_size(self, key) -> int:
+        return sum(len(write[2][1]) for write in self.writes.get(key, {}).values())
+
+    def _measure(self, thread_id) -> int:
+        """Serialized bytes of one session (checkpoints, pending writes and channel values)."""
+        size = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                size += len(checkpoint[1]) + len(metadata[1])
+        size += sum(len(self.blobs[key][1]) for key in self._blob_keys.get(thread_id, ()) if key in self.blobs)
+        size += sum(self._writes_size(key) for key in self._write_keys.get(thread_id, ()))
+        return size
+
+    def _set_bytes(self, thread_id, size):
+        self._total_bytes += size - self._bytes.get(thread_id, 0)
+        self._bytes[thread_id] = size
+
+    def session_bytes(self, thread_id) -> int:
+        """Serialized size of one session."""
+        with self._lock:
+            return self._bytes.get(thread_id, 0)
+
+    def stats(self) -> dict:
+        """Session count, evictions and serialized bytes per session."""
+        with self._lock:
+            sizes = dict(self._bytes)
+            total = self._total_bytes
+            sessions = len(self._sessions)
+        return {
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "evicted": self.evicted,
+            "oversized": self.oversized,
+            "total_bytes": total,
+            "max_session_bytes": max(sizes.values(), default=0),
+            "session_bytes": sizes,
+        }
+
+    def _publish(self):
+        METRICS.set("agent_memory_sessions", len(self._sessions))
+        METRICS.set("agent_memory_session_bytes", self._total_bytes)
+
+
+def session_config(session_id: str) -> dict:
+    """Config for ``agent_graph.invoke`` that selects the conversation ``session_id``."""
+    return {"configurable": {"thread_id": session_id}}
+
+
+def with_session_memory(agent_graph, checkpointer: BoundedSessionSaver = None):
+    """
+    Attach a bounded session store when ``AGENT_SESSION_MEMORY`` is enabled.
+
+    Invocations without a ``thread_id`` share the ``"default"`` session; pass
+    ``session_config(...)`` to keep separate conversations.
+    """
+    if checkpointer is None and not SESSION_MEMORY_ENABLED:
+        return agent_graph
+    checkpointer = checkpointer or BoundedSessionSaver()
+    agent_graph = agent_graph.copy(update={"checkpointer": checkpointer})
+    return agent_graph.with_config(configurable={"thread_id": DEFAULT_SESSION})
@@ -0,0 +1,42 @@
+"""
+Single place where the repository's Gemini chat models are created.
+
+Every call site uses ``create_chat_model`` instead of instantiating
+``ChatGoogleGenerativeAI`` directly, so all of them share the process-wide
+rate limiter from ``agent_common.rate_limit``.
+"""
+
+import os
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from agent_common.rate_limit import get_rate_limiter
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+def create_chat_model(model: str = DEFAULT_MODEL, temperature: float = None, chat_model_cls=None, **kwargs):
+    """
+    Create a rate-limited Gemini chat model.
+
+    Args:
+        model: Gemini model name (e.g., "gemini-2.5-flash")
+        temperature: Sampling temperature; the model default is used when omitted
+        chat_model_cls: Chat model class to build (defaults to ChatGoogleGenerativeAI)
+        **kwargs: Passed through to the chat model class
+
+    Returns:
+        Chat model instance wired to the shared rate limiter
+    """
+    chat_model_cls = chat_model_cls or ChatGoogleGenerativeAI
+    limiter = get_rate_limiter(model)
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    # Keep client-side retries low: the shared limiter backs off on 429s for everyone
+    kwargs.setdefault("max_retries", int(os.getenv("GEMINI_MAX_RETRIES", "2")))
+    return chat_model_cls(
+        model=model,
+        rate_limiter=limiter,
+        callbacks=[limiter.feedback] + list(kwargs.pop("callbacks", None) or []),
+        **kwargs,
+    )
@@ -0,0 +1,95 @@
+"""
+Local store of fetched web pages, searchable with BM25.
+
+Pages fetched by the web search agent's deep search and by
+``DocumentLoaders/webBasedLoader.py`` are kept in a ``TextIndex`` with the
+time they were fetched. A page younger than ``PAGE_STORE_MAX_AGE`` is served
+from the store instead of the network, and a query whose terms all appear in
+enough stored pages can be answered without searching the web at all.
+
+Configuration (read from the environment / .env file):
+    PAGE_STORE_PATH=<repo>/.cache/pages.sqlite3   Index file (empty disables the store)
+    PAGE_STORE_MAX_AGE=86400                      Seconds before a stored page is stale
+    PAGE_STORE_MIN_HITS=3                         Fresh pages matching every query term
+                                                  needed to answer from the store alone
+"""
+
+import os
+import time
+
+from agent_common.text_index import TextIndex
+from agent_common.tracing import METRICS
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "pages.sqlite3")
+PAGE_STORE_PATH = os.getenv("PAGE_STORE_PATH", DEFAULT_PATH)
+PAGE_STORE_MAX_AGE = float(os.getenv("PAGE_STORE_MAX_AGE", "86400"))
+PAGE_STORE_MIN_HITS = int(os.getenv("PAGE_STORE_MIN_HITS", "3"))
+
+METRICS.describe("agent_page_store_total",
+                 "Page store lookups by URL (hit, stale, miss) and by query (query_hit, query_miss)")
+
+
+class PageStore:
+    """
+    Fetched pages keyed by URL.
+
+    Args:
+        path: Index file; empty or None disables the store (every lookup misses)
+        max_age: Seconds a stored page stays fresh
+        min_hits: Fresh pages matching every query term needed by ``answer``
+    """
+
+    def __init__(self, path: str = PAGE_STORE_PATH, max_age: float = PAGE_STORE_MAX_AGE,
+                 min_hits: int = PAGE_STORE_MIN_HITS):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.index = TextIndex(path) if path else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.index is not None
+
+    def get(self, url: str):
+        """Fresh stored page for ``url`` as a dict (url, title, text, fetched), or None."""
+        if self.index is None:
+            return None
+        document = self.index.get(url)
+        if document is None:
+            METRICS.inc("agent_page_store_total", outcome="miss")
+            return None
+        if document["fetched"] < time.time() - self.max_age:
+            METRICS.inc("agent_page_store_total", outcome="stale")
+            return None
+        METRICS.inc("agent_page_store_total", outcome="hit")
+        return _page(document)
+
+    def put(self, url: str, title: str, text: str):
+        """Store (or refresh) a fetched page."""
+        if self.index is not None:
+            self.index.add(url, text, title=title)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """Fresh stored pages that best match ``query``, with their BM25 score and matched share."""
+        if self.index is None:
+            return []
+        return [{**_page(document), "score": document["score"], "matched": document["matched"]}
+                for document in self.index.search(query, k=k, max_age=self.max_age)]
+
+    def answer(self, query: str, k: int = 10):
+        """
+        Pages to answer ``query`` from without going to the network.
+
+        Returns:
+            At least ``min(min_hits, k)`` fresh pages containing every query
+            term, or None when the store does not know enough about the query
+        """
+        pages = [page for page in self.search(query, k=k) if page["matched"] == 1.0]
+        # Asking for fewer pages than min_hits must not make every lookup a miss
+        outcome = "hit" if pages and len(pages) >= min(self.min_hits, k) else "miss"
+        METRICS.inc("agent_page_store_total", outcome=f"query_{outcome}")
+        return pages if outcome == "hit" else None
+
+
+def _page(document) -> dict:
+    return {"url": document["key"], "title": document["title"], "text": document["text"],
+            "fetched": document["fetched"]}
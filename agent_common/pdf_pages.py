@@ -0,0 +1,231 @@
+"""
+Lazy, page-parallel PDF loading with a cache of the extracted text.
+
+``PyPDFLoader(path).load()`` extracts every page before returning, so nothing
+downstream starts until the whole PDF is parsed, and every page's text is in
+memory at once. ``PagedPdfLoader(path).lazy_load()`` yields the pages as
+``Document``s, in order, as soon as each is extracted:
+
+- Large PDFs are split into page ranges that a process pool extracts in
+  parallel (each worker opens the PDF once). The first range is a single page
+  so the first page arrives quickly, and only a few ranges per worker are in
+  flight, so memory stays bounded however many pages the PDF has. Workers
+  are forked where the platform can fork, so a calling script without an
+  ``if __name__ == "__main__":`` guard is not re-run in them; if the pool
+  breaks anyway, the remaining pages are extracted in-process.
+- The extracted text is written to a cache file named after the hash of the
+  PDF's content, one JSON line per page. A later run over the same file reads
+  the pages from there without parsing the PDF. A cache file is only kept
+  once every page has been extracted.
+
+The documents have the same ``page_content`` and the same ``source``, ``page``,
+``page_label`` and ``total_pages`` metadata as ``PyPDFLoader``'s (the PDF's
+document info, such as its producer and title, is not copied).
+
+Configuration (read from the environment / .env file):
+    PDF_PAGE_CACHE_DIR=<repo>/.cache/pdf_pages   Cache directory (empty disables the cache)
+    PDF_PAGE_WORKERS=<CPU count>                 Extraction processes (1 extracts in-process)
+    PDF_PAGES_PER_TASK=8                         Pages extracted per task
+    PDF_PARALLEL_MIN_PAGES=32                    Smaller PDFs are extracted in-process
+    PDF_PAGE_START_METHOD=fork                   multiprocessing start method of the workers
+                                                 (spawn where fork is not available)
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator
+
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+from agent_common.tracing import METRICS
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "pdf_pages")
+PDF_PAGE_CACHE_DIR = os.getenv("PDF_PAGE_CACHE_DIR", DEFAULT_CACHE_DIR)
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_PAGE_START_METHOD = os.getenv(
+    "PDF_PAGE_START_METHOD", "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+
+# Part of the cache key: bump when the extraction changes so old cache files are not reused
+EXTRACTION_VERSION = 1
+
+# Tasks in flight per worker; bounds the pages held in memory at once
+TASKS_PER_WORKER = 2
+
+METRICS.describe("agent_pdf_pages_total", "PDF pages loaded, by source (cache, parsed)")
+METRICS.describe("agent_pdf_pool_failures_total", "PDF extraction pools that broke (pages then extracted in-process)")
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of the file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _page_labels(reader: PdfReader):
+    """Labels of every page, or None when the PDF defines none (pages are labelled 1, 2, ...)."""
+    # page_labels walks every page on each access, so it is read once, and only when needed
+    try:
+        return reader.page_labels if "/PageLabels" in reader.root_object else None
+    except Exception:
+        return None
+
+
+def _extract(reader: PdfReader, labels, start: int, stop: int) -> list:
+    pages = [(index, reader.pages[index].extract_text(), labels[index] if labels else str(index + 1))
+             for index in range(start, stop)]
+    # The reader keeps every object it has parsed (content streams, fonts); dropping them
+    # after each range keeps memory flat on long PDFs, shared objects are just read again
+    reader.resolved_objects.clear()
+    return pages
+
+
+# Each worker process opens the PDF once and keeps the reader for all its tasks
+_worker_reader = _worker_labels = None
+
+
+def _init_worker(path: str):
+    global _worker_reader, _worker_labels
+    _worker_reader = PdfReader(path)
+    _worker_labels = _page_labels(_worker_reader)
+
+
+def _extract_in_worker(start: int, stop: int) -> list:
+    return _extract(_worker_reader, _worker_labels, start, stop)
+
+
+def _ranges(total: int, per_task: int, first: int = 0):
+    """Page ranges to extract from ``first`` on: page 0 alone, then ``per_task`` pages at a time."""
+    if first == 0 and total:
+        yield 0, 1
+        first = 1
+    for start in range(first, total, per_task):
+        yield start, min(start + per_task, total)
+
+
+class PagedPdfLoader(BaseLoader):
+    """
+    Load a PDF one page at a time, extracting pages in parallel and caching the text.
+
+    Args:
+        path: PDF file
+        workers: Extraction processes (1 extracts in-process)
+        pages_per_task: Pages a worker extracts per task
+        cache_dir: Directory of cached page text; empty or None disables the cache
+        parallel_min_pages: PDFs with fewer pages are extracted in-process
+    """
+
+    def __init__(self, path: str, workers: int = PDF_PAGE_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK,
+                 cache_dir: str = PDF_PAGE_CACHE_DIR, parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES):
+        self.path = path
+        self.workers = max(1, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.cache_dir = cache_dir
+        self.parallel_min_pages = parallel_min_pages
+
+    def cache_path(self) -> str:
+        """Cache file of this PDF's current content (None without a cache directory)."""
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{file_hash(self.path)}.v{EXTRACTION_VERSION}.jsonl")
+
+    def lazy_load(self) -> Iterator[Document]:
+        cache_path = self.cache_path()
+        if cache_path and os.path.exists(cache_path):
+            yield from self._from_cache(cache_path)
+            return
+        if not cache_path:
+            yield from self._parse()
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        partial = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        complete = False
+        try:
+            with open(partial, "w", encoding="utf-8") as f:
+                for document in self._parse():
+                    f.write(json.dumps({"text": document.page_content, "label": document.metadata["page_label"],
+                                        "total": document.metadata["total_pages"]}, ensure_ascii=False) + "\n")
+                    yield document
+            os.replace(partial, cache_path)
+            complete = True
+        finally:
+            # Stopped early (or failed): a partial file must not pass for the whole PDF
+            if not complete and os.path.exists(partial):
+                os.remove(partial)
+
+    def _document(self, index: int, text: str, label: str, total: int) -> Document:
+        return Document(page_content=text, metadata={"source": self.path, "page": index, "page_label": label,
+                                                     "total_pages": total})
+
+    def _from_cache(self, cache_path: str) -> Iterator[Document]:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                page = json.loads(line)
+                METRICS.inc("agent_pdf_pages_total", source="cache")
+                yield self._document(index, page["text"], page["label"], page["total"])
+
+    def _parse(self) -> Iterator[Document]:
+        reader = PdfReader(self.path)
+        total = len(reader.pages)
+        if self.workers == 1 or total < self.parallel_min_pages:
+            yield from self._parse_in_process(reader, total, 0)
+            return
+        del reader
+        next_page = 0
+        for document in self._parse_in_pool(total):
+            next_page = document.metadata["page"] + 1
+            yield document
+        if next_page < total:
+            # The pool broke: carry on from the first page not yielded yet
+            yield from self._parse_in_process(PdfReader(self.path), total, next_page)
+
+    def _parse_in_process(self, reader: PdfReader, total: int, first: int) -> Iterator[Document]:
+        labels = _page_labels(reader)
+        for start, stop in _ranges(total, self.pages_per_task, first):
+            for index, text, label in _extract(reader, labels, start, stop):
+                METRICS.inc("agent_pdf_pages_total", source="parsed")
+                yield self._document(index, text, label, total)
+
+    def _parse_in_pool(self, total: int) -> Iterator[Document]:
+        """Pages extracted by a process pool, in order, until they are all done or the pool breaks."""
+        context = multiprocessing.get_context(PDF_PAGE_START_METHOD)
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(self.path,))
+        try:
+            ranges = _ranges(total, self.pages_per_task)
+            pending = deque()
+            for start, stop in ranges:
+                pending.append(pool.submit(_extract_in_worker, start, stop))
+                if len(pending) >= self.workers * TASKS_PER_WORKER:
+                    break
+            while pending:
+                try:
+                    pages = pending.popleft().result()
+                except BrokenProcessPool as error:
+                    # e.g. spawned workers re-running a script that starts the pool at import
+                    METRICS.inc("agent_pdf_pool_failures_total")
+                    print(f"PagedPdfLoader: extraction pool failed ({error}), extracting {self.path} in-process",
+                          file=sys.stderr)
+                    return
+                # Keep the pool busy while the caller works on these pages
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append(pool.submit(_extract_in_worker, *next_range))
+                for index, text, label in pages:
+                    METRICS.inc("agent_pdf_pages_total", source="parsed")
+                    yield self._document(index, text, label, total)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
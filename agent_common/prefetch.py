@@ -0,0 +1,232 @@
+"""
+Speculative tool prefetch while the planner model is still thinking.
+
+For a request like "Get the weather in Tokyo and email it to ana@example.com"
+the agent normally waits for Gemini to plan the ``get_weather`` call before
+any HTTP request starts. ``SpeculativePrefetchMiddleware`` guesses the likely
+tool arguments from the user message locally (e.g. capitalized place names
+after "in"/"for"), starts those calls on a thread pool in ``before_agent``,
+and serves the finished result when the model asks for the same call.
+
+Guesses the model never asks for are wasted upstream calls. They are counted
+per tool and charged against a per-minute waste budget; once a tool's budget
+is spent, it is not speculated on until the budget refills. A run that
+raises or is interrupted never reaches ``after_agent``; its guesses expire
+after ``AGENT_PREFETCH_RUN_TTL`` and are charged as wasted then.
+
+Enable with ``AGENT_PREFETCH=true`` in the environment / .env file.
+    AGENT_PREFETCH_MAX_CALLS=4           Speculative calls per user message
+    AGENT_PREFETCH_WASTE_PER_MINUTE=20   Wasted calls allowed per tool per minute
+    AGENT_PREFETCH_WORKERS=4             Threads running speculative calls
+    AGENT_PREFETCH_RUN_TTL=300           Seconds before unclaimed guesses of an unfinished run are dropped
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated
+
+from langchain.agents.middleware import AgentMiddleware, AgentState
+from langchain.agents.middleware.types import PrivateStateAttr
+from langchain_core.messages import HumanMessage, ToolMessage
+from typing_extensions import NotRequired
+
+from agent_common.rate_limit import TokenBucket
+from agent_common.tracing import METRICS
+
+PREFETCH_ENABLED = os.getenv("AGENT_PREFETCH", "false").strip().lower() in ("1", "true", "yes", "on")
+MAX_CALLS = int(os.getenv("AGENT_PREFETCH_MAX_CALLS", "4"))
+WASTE_PER_MINUTE = float(os.getenv("AGENT_PREFETCH_WASTE_PER_MINUTE", "20"))
+WORKERS = int(os.getenv("AGENT_PREFETCH_WORKERS", "4"))
+RUN_TTL = float(os.getenv("AGENT_PREFETCH_RUN_TTL", "300"))
+
+METRICS.describe("agent_prefetch_total", "Speculative tool calls, by outcome (used, wasted, skipped, failed)")
+
+# Capitalized words that follow "in"/"for"/"at" without being places
+NOT_PLACES = {"celsius", "fahrenheit", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday",
+              "sunday", "january", "february", "march", "april", "may", "june", "july", "august",
+              "september", "october", "november", "december", "english", "me", "my", "the", "a"}
+
+NAME = r"[A-Z][\w'.-]*(?:\s+[A-Z][\w'.-]*)*"
+PLACE_LIST = re.compile(rf"\b(?:in|for|at)\s+({NAME}(?:\s*(?:,|\band\b|&)\s*{NAME})*)")
+LOWERCASE_PLACE = re.compile(
+    r"\bweather\s+(?:like\s+)?(?:in|for|at)\s+([a-z][a-z .'-]{0,40}?)"
+    r"(?=\s+(?:and|then|to|today|now|tomorrow|please)\b|[,.?!]|$)"
+)
+
+
+def extract_places(text: str) -> list:
+    """Guess place names from a request ("weather in Tokyo, Paris and New York" -> 3 places)."""
+    places = []
+    for segment in PLACE_LIST.findall(text):
+        places += re.split(r"\s*(?:,|\band\b|&)\s*", segment)
+    places += LOWERCASE_PLACE.findall(text)
+    seen, result = set(), []
+    for place in places:
+        place = place.strip(" .'-")
+        key = place.casefold()
+        if place and key not in seen and key not in NOT_PLACES:
+            seen.add(key)
+            result.append(place)
+    return result
+
+
+def _call_key(name: str, args: dict) -> tuple:
+    """Identify a tool call independent of argument case and spacing."""
+    def normalize(value):
+        return " ".join(value.casefold().split()) if isinstance(value, str) else value
+    return name, tuple(sorted((k, normalize(v)) for k, v in args.items()))
+
+
+class PrefetchState(AgentState):
+    prefetch_id: NotRequired[Annotated[str, PrivateStateAttr]]
+
+
+class SpeculativePrefetchMiddleware(AgentMiddleware):
+    """
+    Start likely tool calls before the first model call and reuse their results.
+
+    Args:
+        speculators: Mapping of tool name to a function that turns the user
+                     message into a list of argument dicts for that tool
+        tools: The agent's tools (only those named in ``speculators`` are used)
+        max_calls: Speculative calls started per user message
+        waste_per_minute: Wasted calls allowed per tool per minute
+        run_ttl: Seconds after which the guesses of a run that never reached
+                 ``after_agent`` are dropped and charged as wasted
+    """
+
+    state_schema = PrefetchState
+
+    def __init__(self, speculators: dict, tools: list, max_calls: int = MAX_CALLS,
+                 waste_per_minute: float = WASTE_PER_MINUTE, run_ttl: float = RUN_TTL):
+        super().__init__()
+        self.speculators = dict(speculators)
+        self.targets = {tool.name: tool for tool in tools if tool.name in self.speculators}
+        self.max_calls = max_calls
+        self.run_ttl = run_ttl
+        self.budgets = {name: TokenBucket(f"prefetch:{name}", waste_per_minute) for name in self.targets}
+        self._runs = {}
+        self._lock = threading.Lock()
+        self.counts = {"used": 0, "wasted": 0, "skipped": 0, "failed": 0}
+
+    def before_agent(self, state, runtime):
+        messages = state["messages"]
+        self._expire()
+        if not messages or not isinstance(messages[-1], HumanMessage) or not isinstance(messages[-1].content, str):
+            return None
+        calls = {}
+        for name, speculate in self.speculators.items():
+            if name not in self.targets:
+                continue
+            for args in speculate(messages[-1].content):
+                if len(calls) >= self.max_calls:
+                    break
+                key = _call_key(name, args)
+                if key in calls:
+                    continue
+                # Stop guessing for a tool while its recent guesses keep going unused
+                if self.budgets[name].debt_wait() > 0:
+                    self._record("skipped", name)
+                    continue
+                calls[key] = _executor().submit(self.targets[name].invoke, args)
+        if not calls:
+            return None
+        prefetch_id = str(uuid.uuid4())
+        with self._lock:
+            self._runs[prefetch_id] = (time.monotonic() + self.run_ttl, calls)
+        return {"prefetch_id": prefetch_id}
+
+    def wrap_tool_call(self, request, handler):
+        future = self._claim(request)
+        if future is not None:
+            try:
+                content = future.result()
+            except Exception:
+                self._record("failed", request.tool_call["name"])
+            else:
+                self._record("used", request.tool_call["name"])
+                return ToolMessage(content=content, name=request.tool_call["name"],
+                                   tool_call_id=request.tool_call["id"])
+        return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        future = self._claim(request)
+        if future is not None:
+            try:
+                content = await asyncio.wrap_future(future)
+            except Exception:
+                self._record("failed", request.tool_call["name"])
+            else:
+                self._record("used", request.tool_call["name"])
+                return ToolMessage(content=content, name=request.tool_call["name"],
+                                   tool_call_id=request.tool_call["id"])
+        return await handler(request)
+
+    def after_agent(self, state, runtime):
+        prefetch_id = state.get("prefetch_id")
+        if prefetch_id is None:
+            return None
+        with self._lock:
+            _, leftover = self._runs.pop(prefetch_id, (None, {}))
+        self._waste(leftover)
+        return None
+
+    def _expire(self):
+        """Drop the guesses of runs that raised or were interrupted before ``after_agent``."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [run_id for run_id, (deadline, _) in self._runs.items() if deadline <= now]
+            leftovers = [self._runs.pop(run_id)[1] for run_id in expired]
+        for leftover in leftovers:
+            self._waste(leftover)
+
+    def _waste(self, leftover):
+        for (name, _), future in leftover.items():
+            future.cancel()
+            self.budgets[name].charge(1)
+            self._record("wasted", name)
+
+    def _claim(self, request):
+        """Take the speculative future matching this tool call, if any."""
+        prefetch_id = request.state.get("prefetch_id") if isinstance(request.state, dict) else None
+        if prefetch_id is None:
+            return None
+        key = _call_key(request.tool_call["name"], request.tool_call["args"])
+        with self._lock:
+            run = self._runs.get(prefetch_id)
+            return run[1].pop(key, None) if run is not None else None
+
+    def _record(self, outcome, tool_name):
+        with self._lock:
+            self.counts[outcome] += 1
+        METRICS.inc("agent_prefetch_total", tool=tool_name, outcome=outcome)
+
+    def stats(self) -> dict:
+        """Speculative call outcomes and the share of started calls that were used."""
+        self._expire()
+        with self._lock:
+            counts = dict(self.counts)
+        started = counts["used"] + counts["wasted"] + counts["failed"]
+        return {**counts, "hit_rate": round(counts["used"] / started, 4) if started else 0.0}
+
+
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _executor_instance
+    with _executor_lock:
+        if _executor_instance is None:
+            _executor_instance = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="prefetch")
+        return _executor_instance
+
+
+def prefetch_middleware(speculators: dict, tools: list) -> list:
+    """Middleware list for ``create_agent``: speculative prefetch when enabled, else nothing."""
+    return [SpeculativePrefetchMiddleware(speculators, tools)] if PREFETCH_ENABLED else []
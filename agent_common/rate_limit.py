@@ -0,0 +1,288 @@
+"""
+Process-wide (optionally cross-process) rate limiting for Gemini calls.
+
+Every chat model created through ``agent_common.models.create_chat_model``
+shares one ``GeminiRateLimiter`` per model name. The limiter combines:
+
+- a requests-per-minute token bucket
+- a tokens-per-minute bucket, charged with the real token usage after each call
+- an AIMD concurrency limit: +1/limit on every success, halved on every 429,
+  plus a short cool-down so throttled callers do not retry in lock-step
+
+Configuration (read from the environment / .env file):
+    GEMINI_RPM=60                    Requests per minute per model
+    GEMINI_TPM=1000000               Tokens per minute per model
+    GEMINI_MAX_CONCURRENCY=16        Upper bound for the adaptive concurrency limit
+    GEMINI_429_COOLDOWN=2            Seconds (jittered) to pause new calls after a 429
+    GEMINI_RATE_LIMIT_STATE=path     Share the RPM/TPM buckets between processes via this file
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from agent_common.tracing import METRICS
+
+METRICS.describe("agent_rate_limit_wait_seconds", "Time a model call spent queued in the rate limiter")
+METRICS.describe("agent_rate_limit_throttled_total", "Model calls rejected by the API with a 429")
+METRICS.describe("agent_rate_limit_concurrency_limit", "Current adaptive concurrency limit")
+METRICS.describe("agent_rate_limit_in_flight", "Model calls currently holding a concurrency slot")
+
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute`` tokens per minute.
+
+    ``charge`` may drive the balance negative (used for tokens-per-minute, where
+    the real cost is only known after the call); new work waits until the debt
+    has been refilled. With ``state_path`` the balance lives in a JSON file
+    guarded by ``flock`` so several processes share one budget.
+    """
+
+    def __init__(self, name: str, per_minute: float, capacity: float = None, state_path: str = None):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.time()
+
+    @contextmanager
+    def _state(self):
+        """Yield a mutable ``{"tokens", "updated"}`` dict, refilled to now."""
+        with self._lock:
+            if not self.state_path:
+                state = {"tokens": self._tokens, "updated": self._updated}
+                self._refill(state)
+                yield state
+                self._tokens, self._updated = state["tokens"], state["updated"]
+                return
+            with open(self.state_path, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    shared = json.loads(raw) if raw.strip() else {}
+                    state = shared.get(self.name, {"tokens": self.capacity, "updated": time.time()})
+                    self._refill(state)
+                    yield state
+                    shared[self.name] = state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(shared))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state):
+        now = time.time()
+        state["tokens"] = min(self.capacity, state["tokens"] + (now - state["updated"]) * self.rate)
+        state["updated"] = now
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` tokens. Returns 0 on success, otherwise seconds to wait."""
+        with self._state() as state:
+            if state["tokens"] >= amount:
+                state["tokens"] -= amount
+                return 0.0
+            return (amount - state["tokens"]) / self.rate
+
+    def debt_wait(self) -> float:
+        """Seconds until the balance is back above zero (0 when not in debt)."""
+        with self._state() as state:
+            return max(0.0, -state["tokens"] / self.rate)
+
+    def charge(self, amount: float):
+        """Subtract ``amount`` tokens after the fact, allowing the balance to go negative."""
+        with self._state() as state:
+            state["tokens"] -= amount
+
+
+class AdaptiveConcurrencyLimit:
+    """Additive-increase / multiplicative-decrease limit on in-flight calls."""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16, backoff: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout=timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled: bool = False, success: bool = True):
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            if throttled:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+            elif success:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for HTTP 429 / RESOURCE_EXHAUSTED errors from the Gemini client."""
+    for attr in ("code", "status_code", "status"):
+        if getattr(error, attr, None) in (429, "429", "RESOURCE_EXHAUSTED"):
+            return True
+    text = f"{type(error).__name__} {error}"
+    return "ResourceExhausted" in text or "RESOURCE_EXHAUSTED" in text or "429" in text
+
+
+class GeminiRateLimiter(BaseRateLimiter):
+    """
+    Rate limiter plugged into ``BaseChatModel.rate_limiter``.
+
+    LangChain calls ``acquire()`` right before each request; the paired
+    ``feedback`` callback handler releases the concurrency slot and reports
+    token usage / 429s once the request finishes.
+    """
+
+    def __init__(self, model: str, requests_per_minute: float, tokens_per_minute: float,
+                 initial_concurrency: int = 4, max_concurrency: int = 16,
+                 cooldown: float = 2.0, state_path: str = None):
+        self.model = model
+        self.requests = TokenBucket(f"{model}:rpm", requests_per_minute, state_path=state_path)
+        self.tokens = TokenBucket(f"{model}:tpm", tokens_per_minute, state_path=state_path)
+        self.concurrency = AdaptiveConcurrencyLimit(initial=min(initial_concurrency, max_concurrency),
+                                                    maximum=max_concurrency)
+        self.cooldown = cooldown
+        self._paused_until = 0.0
+        self.feedback = RateLimitFeedback(self)
+        self._publish()
+
+    def _wait_time(self) -> float:
+        """Seconds to wait before the buckets admit one more request (0 = admitted)."""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            return pause
+        debt = self.tokens.debt_wait()
+        if debt > 0:
+            return debt
+        return self.requests.try_acquire(1)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        if not blocking:
+            if not self.concurrency.try_acquire():
+                return False
+            if self._wait_time() > 0:
+                self.concurrency.release(success=False)
+                return False
+            self._record_wait(start)
+            return True
+        self.concurrency.acquire()
+        while True:
+            wait = self._wait_time()
+            if wait <= 0:
+                break
+            time.sleep(min(wait, 1.0))
+        self._record_wait(start)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        while not self.concurrency.try_acquire():
+            if not blocking:
+                return False
+            await asyncio.sleep(0.01)
+        while True:
+            wait = self._wait_time()
+            if wait <= 0:
+                break
+            if not blocking:
+                self.concurrency.release(success=False)
+                return False
+            await asyncio.sleep(min(wait, 1.0))
+        self._record_wait(start)
+        return True
+
+    def release(self, tokens_used: int = 0, throttled: bool = False, success: bool = True):
+        """Return a concurrency slot and feed the outcome back into the limits."""
+        if tokens_used:
+            self.tokens.charge(tokens_used)
+        if throttled:
+            # Jittered cool-down so throttled callers do not all retry at the same instant
+            self._paused_until = max(self._paused_until,
+                                     time.monotonic() + self.cooldown * (0.5 + random.random()))
+            METRICS.inc("agent_rate_limit_throttled_total", model=self.model)
+        self.concurrency.release(throttled=throttled, success=success)
+        self._publish()
+
+    def _record_wait(self, start):
+        METRICS.observe("agent_rate_limit_wait_seconds", time.monotonic() - start, buckets=WAIT_BUCKETS,
+                        model=self.model)
+        self._publish()
+
+    def _publish(self):
+        METRICS.set("agent_rate_limit_concurrency_limit", int(self.concurrency.limit), model=self.model)
+        METRICS.set("agent_rate_limit_in_flight", self.concurrency.in_flight, model=self.model)
+
+
+class RateLimitFeedback(BaseCallbackHandler):
+    """Callback handler that closes the loop for ``GeminiRateLimiter``."""
+
+    # Run in the caller's thread/event loop so slots are released promptly
+    run_inline = True
+
+    def __init__(self, limiter: GeminiRateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response, **kwargs):
+        tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    tokens += usage.get("total_tokens", 0)
+        self.limiter.release(tokens_used=tokens)
+
+    def on_llm_error(self, error, **kwargs):
+        throttled = is_rate_limit_error(error)
+        self.limiter.release(throttled=throttled, success=False)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> GeminiRateLimiter:
+    """Return the process-wide limiter for ``model``, creating it from the environment."""
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = GeminiRateLimiter(
+                model,
+                requests_per_minute=float(os.getenv("GEMINI_RPM", "60")),
+                tokens_per_minute=float(os.getenv("GEMINI_TPM", "1000000")),
+                initial_concurrency=int(os.getenv("GEMINI_INITIAL_CONCURRENCY", "4")),
+                max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+                cooldown=float(os.getenv("GEMINI_429_COOLDOWN", "2")),
+                state_path=os.getenv("GEMINI_RATE_LIMIT_STATE") or None,
+            )
+            _limiters[model] = limiter
+        return limiter
@@ -0,0 +1,240 @@
+"""
+Persistent full-text index with BM25 ranking, stored in one SQLite file.
+
+``TextIndex`` keeps an inverted index (term -> documents with term counts)
+next to the documents themselves, so a search reads only the postings of the
+query terms instead of every document. Postings also carry their document's
+length, so BM25 is summed inside SQLite without touching the documents table.
+
+For a term that occurs in very many documents, only its ``max_postings``
+highest-impact postings (highest term frequency relative to document length)
+are scored. That keeps queries with common words fast on large collections;
+rankings are exact whenever every query term is rarer than that. Documents
+are added, replaced and removed one at a time; the collection statistics BM25
+needs (document count, total length) are updated in the same transaction, so
+the index never has to be rebuilt.
+
+Each document has a caller-chosen key (a URL, a file name), a title, its text,
+the time it was added (``fetched``) and optional JSON metadata.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from agent_common.bm25 import TOKEN_PATTERN, idf, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    impact REAL NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+CREATE INDEX IF NOT EXISTS postings_impact ON postings (term, impact DESC);
+CREATE TABLE IF NOT EXISTS collection (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+INSERT OR IGNORE INTO collection VALUES ('documents', 0), ('length', 0);
+"""
+
+
+class TextIndex:
+    """
+    Inverted index over documents identified by a key.
+
+    Args:
+        path: SQLite file (created if missing); ":memory:" for a throwaway index
+        k1: BM25 term frequency saturation
+        b: BM25 length normalization
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        # Document frequencies of recently queried terms, dropped on every write
+        self._frequencies = {}
+
+    def add(self, key: str, text: str, title: str = "", fetched: float = None, meta: dict = None):
+        """Index a document, replacing any earlier version with the same key."""
+        self.add_many([{"key": key, "text": text, "title": title, "fetched": fetched, "meta": meta}])
+
+    def add_many(self, documents):
+        """Index several documents (dicts with the arguments of ``add``) in one transaction."""
+        with self._lock, self._db:
+            self._frequencies.clear()
+            for document in documents:
+                self._remove(document["key"])
+                terms = Counter(tokenize(document.get("title", "") + " " + document["text"]))
+                length = sum(terms.values())
+                meta = document.get("meta")
+                cursor = self._db.execute(
+                    "INSERT INTO documents (key, title, text, length, fetched, meta) VALUES (?, ?, ?, ?, ?, ?)",
+                    (document["key"], document.get("title", ""), document["text"], length,
+                     document.get("fetched") or time.time(), json.dumps(meta) if meta is not None else None),
+                )
+                self._db.executemany(
+                    "INSERT INTO postings (term, doc, tf, length, impact) VALUES (?, ?, ?, ?, ?)",
+                    [(term, cursor.lastrowid, tf, length, tf / length) for term, tf in terms.items()],
+                )
+                self._adjust(1, length)
+
+    def remove(self, key: str) -> bool:
+        """Drop a document; returns False if the key was not indexed."""
+        with self._lock, self._db:
+            self._frequencies.clear()
+            return self._remove(key)
+
+    def _remove(self, key: str) -> bool:
+        row = self._db.execute("SELECT id, length FROM documents WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        self._db.execute("DELETE FROM postings WHERE doc = ?", (row[0],))
+        self._db.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+        self._adjust(-1, -row[1])
+        return True
+
+    def _adjust(self, documents: int, length: int):
+        self._db.execute("UPDATE collection SET value = value + ? WHERE name = 'documents'", (documents,))
+        self._db.execute("UPDATE collection SET value = value + ? WHERE name = 'length'", (length,))
+
+    def get(self, key: str):
+        """The stored document for ``key`` (key, title, text, fetched, meta), or None."""
+        with self._lock:
+            row = self._db.execute("SELECT key, title, text, fetched, meta FROM documents WHERE key = ?",
+                                   (key,)).fetchone()
+        return self._document(row) if row else None
+
+    def fetched_times(self) -> dict:
+        """Mapping of every indexed key to the time it was added."""
+        with self._lock:
+            return dict(self._db.execute("SELECT key, fetched FROM documents"))
+
+    def __len__(self):
+        with self._lock:
+            return int(self._db.execute("SELECT value FROM collection WHERE name = 'documents'").fetchone()[0])
+
+    def search(self, query: str, k: int = 10, max_age: float = None, with_text: bool = True,
+               max_postings: int = 2000) -> list:
+        """
+        Best matching documents for ``query``.
+
+        Args:
+            query: Free-text query
+            k: Documents returned at most
+            max_age: Ignore documents added more than this many seconds ago
+            with_text: Include each document's text in the result
+            max_postings: Postings scored per query term at most
+
+        Returns:
+            List of dicts with key, title, fetched, meta, score and matched
+            (the share of query terms the document contains), best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            total, length = (row[0] for row in self._db.execute(
+                "SELECT value FROM collection WHERE name IN ('documents', 'length') ORDER BY name"))
+            if not total:
+                return []
+            unknown = [term for term in terms if term not in self._frequencies]
+            if unknown:
+                self._frequencies.update(dict.fromkeys(unknown, 0))
+                self._frequencies.update(self._db.execute(
+                    f"SELECT term, COUNT(*) FROM postings WHERE term IN ({','.join('?' * len(unknown))}) "
+                    f"GROUP BY term", unknown))
+            frequencies = {term: self._frequencies[term] for term in terms if self._frequencies[term]}
+            if not frequencies:
+                return []
+            # Sum the BM25 term scores inside SQLite; only the top k rows come back to Python
+            norm = f"{self.k1} * (1 - {self.b} + {self.b} * length / {length / total})"
+            per_term = " UNION ALL ".join(
+                ["SELECT * FROM (SELECT doc, tf, length, ? AS weight FROM postings "
+                 "WHERE term = ? ORDER BY impact DESC LIMIT ?)"] * len(frequencies))
+            parameters = [value for term, df in frequencies.items() for value in (idf(df, total), term, max_postings)]
+            age_filter = ""
+            if max_age is not None:
+                age_filter = "WHERE doc IN (SELECT id FROM documents WHERE fetched >= ?)"
+                parameters.append(time.time() - max_age)
+            best = self._db.execute(
+                f"SELECT doc, SUM(weight * tf * {self.k1 + 1} / (tf + {norm})) AS score, COUNT(*) "
+                f"FROM ({per_term}) {age_filter} GROUP BY doc ORDER BY score DESC LIMIT ?",
+                parameters + [k],
+            ).fetchall()
+            if not best:
+                return []
+            # Fetched under the same lock, so a document removed meanwhile cannot be missing here
+            columns = "id, key, title, text, fetched, meta" if with_text else "id, key, title, '', fetched, meta"
+            ids = [doc for doc, _, _ in best]
+            rows = {row[0]: row[1:] for row in self._db.execute(
+                f"SELECT {columns} FROM documents WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        results = []
+        for doc, score, matched in best:
+            document = self._document(rows[doc])
+            if not with_text:
+                del document["text"]
+            results.append({**document, "score": round(score, 4), "matched": round(matched / len(terms), 4)})
+        return results
+
+    @staticmethod
+    def _document(row) -> dict:
+        key, title, text, fetched, meta = row
+        return {"key": key, "title": title, "text": text, "fetched": fetched,
+                "meta": json.loads(meta) if meta else None}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def make_snippet(text: str, query: str, width: int = 200) -> str:
+    """
+    The part of ``text`` (about ``width`` characters) with the most query terms.
+
+    Falls back to the start of the text when no query term occurs in it.
+    """
+    terms = set(tokenize(query))
+    hits = [(match.start(), match.group().casefold()) for match in TOKEN_PATTERN.finditer(text)
+            if match.group().casefold() in terms]
+    start, best, end = 0, None, 0
+    lead = width // 4
+    # Windows begin a little before a hit; the one with the most distinct terms (then most hits) wins
+    for i, (position, _) in enumerate(hits):
+        end = max(end, i)
+        while end < len(hits) and hits[end][0] < position + width - lead:
+            end += 1
+        inside = [term for _, term in hits[i:end]]
+        score = (len(set(inside)), len(inside))
+        if best is None or score > best:
+            best, start = score, max(0, position - lead)
+    snippet = re.sub(r"\s+", " ", text[start:start + width]).strip()
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if start + width < len(text) else ""
+    return f"{prefix}{snippet}{suffix}"
@@ -0,0 +1,82 @@
+"""
+Bounded concurrent execution of the tool calls from one model turn.
+
+``create_agent`` dispatches every tool call of a model response as its own
+graph task, and LangGraph runs the tasks of a step together on a thread pool
+(or as asyncio tasks for ``ainvoke``). Results are written back in the order
+the model emitted the calls, so the message history stays deterministic.
+
+This module bounds that fan-out:
+- ``max_concurrency`` on the agent config caps the pool for all tool calls
+  (``AGENT_MAX_TOOL_CONCURRENCY``, default 8)
+- ``ToolConcurrencyMiddleware`` caps individual tools, protecting upstream
+  APIs such as OpenWeather, Serper or the SMTP server
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from langchain.agents.middleware import AgentMiddleware
+
+from agent_common.tracing import METRICS
+
+MAX_TOOL_CONCURRENCY = int(os.getenv("AGENT_MAX_TOOL_CONCURRENCY", "8"))
+
+METRICS.describe("agent_tool_queue_seconds", "Time a tool call waited for its per-tool concurrency slot")
+
+QUEUE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ToolConcurrencyMiddleware(AgentMiddleware):
+    """
+    Limit how many calls of each tool run at the same time.
+
+    Args:
+        limits: Mapping of tool name to the maximum number of concurrent calls.
+                Tools not listed are only bounded by ``max_concurrency``.
+    """
+
+    def __init__(self, limits: dict):
+        super().__init__()
+        self.limits = dict(limits)
+        self._semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in self.limits.items()}
+        self._async_semaphores = {}
+        self._async_lock = threading.Lock()
+
+    def wrap_tool_call(self, request, handler):
+        name = request.tool_call["name"]
+        semaphore = self._semaphores.get(name)
+        if semaphore is None:
+            return handler(request)
+        start = time.monotonic()
+        with semaphore:
+            METRICS.observe("agent_tool_queue_seconds", time.monotonic() - start, buckets=QUEUE_BUCKETS, tool=name)
+            return handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        name = request.tool_call["name"]
+        if name not in self.limits:
+            return await handler(request)
+        semaphore = self._async_semaphore(name)
+        start = time.monotonic()
+        async with semaphore:
+            METRICS.observe("agent_tool_queue_seconds", time.monotonic() - start, buckets=QUEUE_BUCKETS, tool=name)
+            return await handler(request)
+
+    def _async_semaphore(self, name):
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            key = (id(loop), name)
+            semaphore = self._async_semaphores.get(key)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.limits[name])
+                self._async_semaphores[key] = semaphore
+            return semaphore
+
+
+def bounded_tool_concurrency(agent_graph, max_concurrency: int = MAX_TOOL_CONCURRENCY):
+    """Bind ``max_concurrency`` so one model turn cannot start an unbounded number of tool calls."""
+    return agent_graph.with_config(max_concurrency=max_concurrency)
@@ -0,0 +1,441 @@
+"""
+Low-overhead tracing and metrics for the LangChain agents.
+
+Every agent wraps its graph with ``instrument(...)``, which attaches an
+``AgentTracer`` callback handler. The handler records one span per graph
+node, LLM call and tool call, and updates in-process metrics (latency
+histograms, token counters, error counters).
+
+Configuration (all optional, read from the environment / .env file):
+    AGENT_DEBUG=false         Turn off the verbose ``create_agent`` debug output
+    AGENT_METRICS_PORT=9464   Serve Prometheus metrics on http://localhost:<port>/metrics
+    AGENT_TRACE_FILE=path     Append finished traces to a file as OTLP/JSON lines
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Verbose graph printing is useful while developing, but slow and noisy in production
+AGENT_DEBUG = os.getenv("AGENT_DEBUG", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Histogram buckets (seconds) shared by all latency metrics
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms with Prometheus text rendering."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name: str, help_text: str):
+        """Attach a HELP line to a metric name."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """Increase a counter by ``value``."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge to ``value``."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        """Record one observation in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+                self._histograms[key] = histogram
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serialisable copy of every metric."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._gauges.items()
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": h["count"], "sum": h["sum"],
+                 "buckets": dict(zip(h["buckets"], h["counts"]))}
+                for (name, labels), h in self._histograms.items()
+            ]
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def reset(self):
+        """Drop all recorded values (used between benchmark runs)."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        seen = set()
+
+        def header(name, metric_type):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, "counter")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), value in sorted(self._gauges.items()):
+                header(name, "gauge")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                header(name, "histogram")
+                for bound, count in zip(h["buckets"], h["counts"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {h['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {h['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+# Process-wide registry used by every agent
+METRICS = MetricsRegistry()
+METRICS.describe("agent_run_duration_seconds", "End-to-end wall time of each agent invocation")
+METRICS.describe("agent_node_duration_seconds", "Wall time spent in each agent graph node")
+METRICS.describe("agent_llm_duration_seconds", "Latency of each chat model call")
+METRICS.describe("agent_llm_tokens_total", "Prompt and completion tokens reported by the model")
+METRICS.describe("agent_tool_duration_seconds", "Latency of each tool call")
+METRICS.describe("agent_errors_total", "Failed nodes, model calls and tool calls")
+
+
+class OTLPFileExporter:
+    """Append finished traces to a file, one OTLP/JSON ``ExportTraceServiceRequest`` per line."""
+
+    def __init__(self, path: str, service_name: str = "langchain-agents"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: list):
+        if not spans:
+            return
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "agent_common.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+        line = json.dumps(payload, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """A single timed operation inside an agent run."""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind",
+                 "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace_id, parent_span_id, name, kind, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> dict:
+        attributes = {"agent.span_kind": self.kind, **self.attributes}
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+class AgentTracer(BaseCallbackHandler):
+    """
+    Callback handler that turns LangChain callbacks into spans and metrics.
+
+    The agent invocation itself, graph nodes, chat model calls and tool calls
+    become spans; other internal runnables are tracked just enough to keep the
+    parent links intact.
+    """
+
+    def __init__(self, agent_name: str, metrics: MetricsRegistry = METRICS, exporter=None):
+        self.agent_name = agent_name
+        self.metrics = metrics
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        # run_id -> (trace_id, span_id of nearest recorded ancestor or own span)
+        self._context = {}
+        self._spans = {}
+        self._finished = defaultdict(list)
+        self._roots = {}
+
+    # -- bookkeeping -------------------------------------------------------
+
+    def _enter(self, run_id, parent_run_id, name=None, kind=None, attributes=None):
+        with self._lock:
+            parent = self._context.get(parent_run_id) if parent_run_id else None
+            trace_id = parent[0] if parent else uuid.uuid4().hex
+            parent_span_id = parent[1] if parent else None
+            if parent is None:
+                self._roots[run_id] = trace_id
+            if kind is None:
+                self._context[run_id] = (trace_id, parent_span_id)
+                return None
+            span = Span(trace_id, parent_span_id, name, kind, attributes)
+            self._context[run_id] = (trace_id, span.span_id)
+            self._spans[run_id] = span
+            return span
+
+    def _exit(self, run_id, error=None):
+        with self._lock:
+            self._context.pop(run_id, None)
+            span = self._spans.pop(run_id, None)
+            if span is not None:
+                span.end_ns = time.time_ns()
+                if error is not None:
+                    span.error = f"{type(error).__name__}: {error}"
+                self._finished[span.trace_id].append(span)
+            trace_id = self._roots.pop(run_id, None)
+            batch = self._finished.pop(trace_id, None) if trace_id else None
+        if batch and self.exporter is not None:
+            self.exporter.export(batch)
+        return span
+
+    # -- graph nodes -------------------------------------------------------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        name = kwargs.get("name")
+        if parent_run_id is None:
+            self._enter(run_id, None, name=self.agent_name, kind="agent",
+                        attributes={"agent.name": self.agent_name})
+        elif node and name == node:
+            self._enter(run_id, parent_run_id, name=node, kind="node",
+                        attributes={"agent.name": self.agent_name, "langgraph.step": metadata.get("langgraph_step")})
+        else:
+            self._enter(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._record_chain(self._exit(run_id))
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        span = self._exit(run_id, error)
+        self._record_chain(span)
+        if span is not None:
+            self.metrics.inc("agent_errors_total", agent=self.agent_name, kind=span.kind, target=span.name)
+
+    def _record_chain(self, span):
+        if span is None:
+            return
+        if span.kind == "agent":
+            self.metrics.observe("agent_run_duration_seconds", span.duration, agent=self.agent_name)
+        else:
+            self.metrics.observe("agent_node_duration_seconds", span.duration, agent=self.agent_name, node=span.name)
+
+    # -- model calls -------------------------------------------------------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = _model_name(serialized, metadata, kwargs.get("invocation_params"))
+        self._enter(run_id, parent_run_id, name=f"llm {model}", kind="llm",
+                    attributes={"agent.name": self.agent_name, "llm.model": model})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = _model_name(serialized, metadata, kwargs.get("invocation_params"))
+        self._enter(run_id, parent_run_id, name=f"llm {model}", kind="llm",
+                    attributes={"agent.name": self.agent_name, "llm.model": model})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens, completion_tokens = _token_usage(response)
+        span = self._exit(run_id)
+        if span is None:
+            return
+        model = span.attributes.get("llm.model")
+        span.attributes["llm.prompt_tokens"] = prompt_tokens
+        span.attributes["llm.completion_tokens"] = completion_tokens
+        self.metrics.observe("agent_llm_duration_seconds", span.duration, agent=self.agent_name, model=model)
+        self.metrics.inc("agent_llm_tokens_total", prompt_tokens, agent=self.agent_name, model=model, type="prompt")
+        self.metrics.inc("agent_llm_tokens_total", completion_tokens, agent=self.agent_name, model=model, type="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._exit(run_id, error)
+        if span is not None:
+            model = span.attributes.get("llm.model")
+            self.metrics.observe("agent_llm_duration_seconds", span.duration, agent=self.agent_name, model=model)
+            self.metrics.inc("agent_errors_total", agent=self.agent_name, kind="llm", target=model)
+
+    # -- tool calls --------------------------------------------------------
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        tool_name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._enter(run_id, parent_run_id, name=f"tool {tool_name}", kind="tool",
+                    attributes={"agent.name": self.agent_name, "tool.name": tool_name})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        span = self._exit(run_id)
+        if span is not None:
+            tool_name = span.attributes["tool.name"]
+            # Tools in this repo report failures as "Error ..." strings instead of raising
+            content = getattr(output, "content", output)
+            status = "error" if isinstance(content, str) and content.startswith("Error") else "ok"
+            self.metrics.observe("agent_tool_duration_seconds", span.duration,
+                                 agent=self.agent_name, tool=tool_name, status=status)
+            if status == "error":
+                self.metrics.inc("agent_errors_total", agent=self.agent_name, kind="tool", target=tool_name)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        span = self._exit(run_id, error)
+        if span is not None:
+            tool_name = span.attributes["tool.name"]
+            self.metrics.observe("agent_tool_duration_seconds", span.duration,
+                                 agent=self.agent_name, tool=tool_name, status="error")
+            self.metrics.inc("agent_errors_total", agent=self.agent_name, kind="tool", target=tool_name)
+
+
+def _model_name(serialized, metadata, invocation_params) -> str:
+    for source in (metadata or {}, invocation_params or {}, (serialized or {}).get("kwargs", {})):
+        for key in ("ls_model_name", "model", "model_name"):
+            if source.get(key):
+                return str(source[key])
+    return "unknown"
+
+
+def _token_usage(response):
+    """Extract (prompt_tokens, completion_tokens) from an LLMResult."""
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+    if not (prompt_tokens or completion_tokens) and response.llm_output:
+        usage = response.llm_output.get("token_usage") or response.llm_output.get("usage_metadata") or {}
+        prompt_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0))
+        completion_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0))
+    return prompt_tokens, completion_tokens
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the agent's console output
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serve ``/metrics`` from a daemon thread. Safe to call more than once."""
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            thread = threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True)
+            thread.start()
+    return _metrics_server
+
+
+_exporter = None
+
+
+def _default_exporter():
+    global _exporter
+    trace_file = os.getenv("AGENT_TRACE_FILE")
+    if trace_file and _exporter is None:
+        _exporter = OTLPFileExporter(trace_file)
+    return _exporter
+
+
+def instrument(agent_graph, agent_name: str):
+    """
+    Attach tracing to an agent graph.
+
+    Returns the graph bound to an ``AgentTracer``; it is invoked exactly like
+    the original graph. Starts the metrics endpoint when ``AGENT_METRICS_PORT``
+    is set.
+    """
+    metrics_port = os.getenv("AGENT_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+    tracer = AgentTracer(agent_name, exporter=_default_exporter())
+    return agent_graph.with_config(callbacks=[tracer], run_name=agent_name)
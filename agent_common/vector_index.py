@@ -0,0 +1,225 @@
+"""
+Persistent vector index with exact or IVF top-k search.
+
+``VectorIndex`` keeps unit-length float32 vectors in a memory-mapped matrix
+(``vectors.f32``) and the mapping of keys to matrix rows in a small SQLite
+file (``ids.sqlite3``), both inside one directory. Only the rows that are
+touched are paged in, so opening a large index is cheap, and adding or
+removing a vector writes one row instead of the whole matrix. Freed rows are
+reused; the matrix file doubles in size when it is full.
+
+A search is one NumPy matrix-vector product over every row (cosine
+similarity, since vectors are normalized). With ``ivf_min_vectors`` set, an
+index holding at least that many vectors is clustered with spherical k-means
+on first search (about sqrt(n) clusters) and each query only scores the rows
+of the ``nprobe`` clusters closest to it. New vectors join their nearest
+cluster; the clustering is rebuilt once the index has doubled in size.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    slot INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    stamp REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Rows scored per matrix product when assigning vectors to clusters
+CHUNK_ROWS = 65536
+
+
+class VectorIndex:
+    """
+    Vectors identified by a key, searched by cosine similarity.
+
+    Args:
+        path: Directory holding the index files (created if missing)
+        dim: Vector dimensions; an index built with other dimensions is cleared
+        ivf_min_vectors: Cluster the index once it holds this many vectors (None = always exact)
+        nprobe: Clusters scored per query when clustered
+    """
+
+    def __init__(self, path: str, dim: int, ivf_min_vectors: int = None, nprobe: int = 8):
+        self.path = path
+        self.dim = dim
+        self.ivf_min_vectors = ivf_min_vectors
+        self.nprobe = nprobe
+        os.makedirs(path, exist_ok=True)
+        self._file = os.path.join(path, "vectors.f32")
+        self._db = sqlite3.connect(os.path.join(path, "ids.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        row = self._db.execute("SELECT value FROM settings WHERE name = 'dim'").fetchone()
+        if row is None or int(row[0]) != dim:
+            with self._db:
+                self._db.execute("DELETE FROM slots")
+                self._db.execute("INSERT OR REPLACE INTO settings VALUES ('dim', ?)", (str(dim),))
+            if os.path.exists(self._file):
+                os.remove(self._file)
+        self._lock = threading.Lock()
+
+        self._slots = {}
+        self._keys = {}
+        self._stamps = {}
+        for slot, key, stamp in self._db.execute("SELECT slot, key, stamp FROM slots"):
+            self._slots[key] = slot
+            self._keys[slot] = key
+            self._stamps[key] = stamp
+        size = os.path.getsize(self._file) if os.path.exists(self._file) else 0
+        self._open(max(size // (4 * dim), max(self._slots.values(), default=-1) + 1))
+        self._live = np.zeros(len(self._vectors), dtype=bool)
+        self._live[list(self._slots.values())] = True
+        self._high = max(self._slots.values(), default=-1) + 1
+        self._free = sorted(set(range(self._high)) - set(self._slots.values()), reverse=True)
+        # IVF state: unit-length centroids and the cluster of every row (-1 = none)
+        self._centroids = None
+        self._clusters = None
+        self._clustered_size = 0
+
+    def _open(self, capacity: int):
+        """Map ``capacity`` rows of the vectors file, growing the file if needed."""
+        capacity = max(capacity, 1024)
+        with open(self._file, "ab") as f:
+            if f.tell() < capacity * 4 * self.dim:
+                f.truncate(capacity * 4 * self.dim)
+        self._vectors = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self):
+        capacity = 2 * len(self._vectors)
+        self._vectors.flush()
+        self._open(capacity)
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+        if self._clusters is not None:
+            self._clusters = np.concatenate([self._clusters, np.full(capacity - len(self._clusters), -1,
+                                                                     dtype=np.int32)])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._slots)
+
+    def stamps(self) -> dict:
+        """Mapping of every key to the stamp stored with its vector."""
+        with self._lock:
+            return dict(self._stamps)
+
+    def stamp(self, key: str):
+        """The stamp stored with the vector of ``key``, or None."""
+        with self._lock:
+            return self._stamps.get(key)
+
+    def add_many(self, keys: list, vectors: np.ndarray, stamps: list):
+        """Store (or replace) the vectors of ``keys``; ``vectors`` has one row per key."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), self.dim)
+        with self._lock:
+            rows = []
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        if self._high == len(self._vectors):
+                            self._grow()
+                        slot = self._high
+                        self._high += 1
+                    self._slots[key] = slot
+                    self._keys[slot] = key
+                rows.append(slot)
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            self._live[rows] = True
+            if self._clusters is not None:
+                self._clusters[rows] = np.argmax(vectors @ self._centroids.T, axis=1)
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO slots (slot, key, stamp) VALUES (?, ?, ?)",
+                                     [(slot, key, stamp) for slot, key, stamp in zip(rows, keys, stamps)])
+            self._stamps.update(zip(keys, stamps))
+
+    def add(self, key: str, vector: np.ndarray, stamp: float = 0.0):
+        self.add_many([key], vector, [stamp])
+
+    def remove(self, key: str) -> bool:
+        """Drop the vector of ``key``; returns False if it was not stored."""
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return False
+            del self._stamps[key], self._keys[slot]
+            self._live[slot] = False
+            self._vectors[slot] = 0.0
+            self._free.append(slot)
+            with self._db:
+                self._db.execute("DELETE FROM slots WHERE slot = ?", (slot,))
+            return True
+
+    def _cluster(self):
+        """Spherical k-means over the stored vectors (caller holds the lock)."""
+        live = np.flatnonzero(self._live[:self._high])
+        count = int(math.sqrt(len(live)))
+        rng = np.random.default_rng(0)
+        sample = self._vectors[np.sort(rng.choice(live, min(len(live), 64 * count), replace=False))]
+        centroids = sample[rng.choice(len(sample), count, replace=False)]
+        for _ in range(10):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+        clusters = np.full(len(self._vectors), -1, dtype=np.int32)
+        for start in range(0, len(live), CHUNK_ROWS):
+            rows = live[start:start + CHUNK_ROWS]
+            clusters[rows] = np.argmax(self._vectors[rows] @ centroids.T, axis=1)
+        self._centroids = centroids.astype(np.float32)
+        self._clusters = clusters
+        self._clustered_size = len(live)
+
+    def search(self, vector: np.ndarray, k: int = 10, exact: bool = False) -> list:
+        """
+        The ``k`` stored vectors most similar to ``vector``.
+
+        Args:
+            vector: Unit-length query vector
+            k: Results returned at most
+            exact: Score every row even when the index is clustered
+
+        Returns:
+            List of (key, similarity) tuples, most similar first
+        """
+        query = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if not self._slots:
+                return []
+            if (not exact and self.ivf_min_vectors is not None and len(self._slots) >= self.ivf_min_vectors
+                    and (self._clusters is None or len(self._slots) > 2 * self._clustered_size)):
+                self._cluster()
+            if exact or self._clusters is None:
+                rows = np.flatnonzero(self._live[:self._high])
+                scores = self._vectors[:self._high] @ query
+                scores = scores[rows]
+            else:
+                probe = np.argsort(self._centroids @ query)[-self.nprobe:]
+                rows = np.flatnonzero(np.isin(self._clusters[:self._high], probe) & self._live[:self._high])
+                scores = self._vectors[rows] @ query
+            if len(rows) > k:
+                best = np.argpartition(-scores, k)[:k]
+            else:
+                best = np.arange(len(rows))
+            best = best[np.argsort(-scores[best])]
+            return [(self._keys[int(rows[i])], round(float(scores[i]), 4)) for i in best]
+
+    def close(self):
+        with self._lock:
+            self._vectors.flush()
+            self._db.close()
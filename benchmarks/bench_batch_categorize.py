@@ -0,0 +1,109 @@
+"""
+Bulk categorization of a notes directory: one request per note vs batch_categorize.py.
+
+``--notes`` generated notes are categorized by a scripted model that takes
+``--llm-latency`` seconds per request and answers batch prompts with one JSON
+line per note (leaving out ``--drop-rate`` of them, to exercise the retry).
+The report lists notes per minute and requests for:
+
+- ``per_note``: ``categorize_note`` called once per note, the only option
+  before, on the first ``--baseline-notes`` notes
+- ``batched_c<N>``: batch_categorize.run with N requests in flight
+- ``resume``: a run stopped after half of its batches, then resumed; the
+  second run only categorizes the notes the first one did not finish
+
+Usage:
+    cd benchmarks
+    python bench_batch_categorize.py --notes 2000 --llm-latency 0.5 --output batch_categorize.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage
+
+from bench_note_search import note_text, vocabulary
+from harness import CallCounter, load_agent, run_metadata, write_report
+
+CATEGORY_WORDS = {"budget": "Finance", "invoice": "Finance", "meeting": "Meeting", "recipe": "Recipe",
+                  "travel": "Travel", "doctor": "Health", "python": "Code", "research": "Research"}
+
+
+def make_script(drop_rate, seed):
+    rng = random.Random(seed)
+
+    def script(messages, tools_bound):
+        prompt = messages[-1].content
+        notes = re.findall(r"--- Note (\d+) \(.*?\) ---\n(.*?)(?=\n--- Note |\Z)", prompt, re.DOTALL)
+        if not notes:
+            return AIMessage(content="Primary Category: Work\nSecondary Categories: None\nTags: [notes, work, todo]")
+        lines = []
+        for number, text in notes:
+            if rng.random() < drop_rate:
+                continue
+            words = text.lower().split()
+            primary = next((CATEGORY_WORDS[w] for w in words if w in CATEGORY_WORDS), "Other")
+            lines.append(json.dumps({"id": int(number), "primary": primary, "secondary": [],
+                                     "tags": sorted(set(words))[:4]}))
+        return AIMessage(content="\n".join(lines))
+
+    return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--baseline-notes", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--drop-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    counter = CallCounter()
+    script = make_script(args.drop_rate, args.seed)
+    app = load_agent("note_categorization_agent/app.py", script, llm_latency=args.llm_latency, counter=counter)
+    batch = load_agent("note_categorization_agent/batch_categorize.py", script, llm_latency=args.llm_latency,
+                       counter=counter)
+
+    with tempfile.TemporaryDirectory(prefix="bench_batch_categorize_") as tmp:
+        notes_dir = os.path.join(tmp, "notes")
+        os.makedirs(notes_dir)
+        for i in range(args.notes):
+            with open(os.path.join(notes_dir, f"note_{i:06d}.txt"), "w", encoding="utf-8") as f:
+                f.write(note_text(rng, vocab, i))
+
+        names = sorted(os.listdir(notes_dir))[:args.baseline_notes]
+        counter.reset()
+        start = time.perf_counter()
+        for name in names:
+            with open(os.path.join(notes_dir, name), encoding="utf-8") as f:
+                app.categorize_note.invoke({"note_content": f.read()})
+        seconds = time.perf_counter() - start
+        results["per_note"] = {"notes": len(names), "requests": counter.completion, "seconds": round(seconds, 2),
+                               "notes_per_minute": round(len(names) / seconds * 60, 1)}
+
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            output = os.path.join(tmp, f"c{concurrency}.jsonl")
+            results[f"batched_c{concurrency}"] = batch.run(notes_dir, output, concurrency=concurrency)
+
+        output = os.path.join(tmp, "resume.jsonl")
+        first = batch.run(notes_dir, output, concurrency=4, max_batches=args.notes // 25 // 2)
+        second = batch.run(notes_dir, output, concurrency=4)
+        results["resume"] = {"first_run": first, "second_run": second,
+                             "recorded_notes": len(batch.load_results(output))}
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
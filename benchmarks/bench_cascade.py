@@ -0,0 +1,142 @@
+"""
+Escalation rate, accuracy and latency of the model cascades.
+
+``detect_language`` (translation agent), ``suggest_tags`` (note
+categorization agent) and the sentiment classifier of
+``CHAINS_AGENTS/conditionalChain.py`` each run over a small labelled set. The
+stub small model answers confidently for clear inputs and hesitates (or
+rambles) for ambiguous ones, so those escalate to the default model. Every
+input is also sent straight to the final stage as the "always
+gemini-2.5-flash" baseline.
+
+Usage:
+    cd benchmarks
+    python bench_cascade.py --small-latency 0.05 --large-latency 0.2 --output cascade.json
+"""
+
+import argparse
+import json
+import threading
+import time
+
+from harness import latency_stats, load_agent, run_metadata, write_report
+from langchain_core.messages import AIMessage
+
+from agent_common.cascade import SMALL_MODEL
+
+# (text, true label, clear for the small model)
+LANGUAGE_SET = [
+    ("Bonjour, je suis très content de vous voir dans la ville", "French", True),
+    ("Der Zug nach Berlin ist heute leider wieder zu spät", "German", True),
+    ("¿Dónde está la estación de tren más cercana?", "Spanish", True),
+    ("Я хочу выпить чашку чая", "Russian", True),
+    ("今日はとても良い天気ですね", "Japanese", True),
+    ("मुझे हिंदी में बात करना पसंद है", "Hindi", True),
+    ("The meeting has been moved to Thursday afternoon", "English", True),
+    ("Ciao", "Italian", False),
+    ("Obrigado pela ajuda", "Portuguese", True),
+    ("Hej då", "Swedish", False),
+    ("Tak", "Danish", False),
+    ("Dit is een korte zin in het Nederlands met wat woorden", "Dutch", True),
+]
+
+SENTIMENT_SET = [
+    ("This is a terrible phone", "negative", True),
+    ("Absolutely love the camera, battery life is excellent", "positive", True),
+    ("The screen broke after two days, what a waste of money", "negative", True),
+    ("Fast delivery and the product works perfectly", "positive", True),
+    ("It is not good at all", "negative", True),
+    ("Honestly I expected more for the price", "negative", False),
+    ("Does what it says on the box", "positive", False),
+    ("Worst customer service I have ever dealt with", "negative", True),
+    ("Setup was easy and the app is helpful", "positive", True),
+    ("Meh.", "negative", False),
+]
+
+TAG_SET = [
+    ("Sprint planning: finish the LangChain integration and the API docs", "langchain, api, sprint, planning", True),
+    ("Grocery list: eggs, milk, spinach, coffee beans", "shopping, groceries, food", True),
+    ("Thoughts after reading Deep Work by Cal Newport", "books, productivity, focus", False),
+    ("Doctor appointment on Monday at 9am, bring blood test results", "health, appointment", True),
+    ("Trip budget for Lisbon: flights, hostel, food", "travel, lisbon, budget", False),
+]
+
+
+class StubAnswers:
+    """Completions for the stub models: the small model hesitates on unclear inputs."""
+
+    def __init__(self):
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        for text, truth, clear in LANGUAGE_SET + SENTIMENT_SET:
+            if text in prompt:
+                key = "language" if "language" in prompt else "sentiment"
+                if "JSON" in prompt:
+                    return json.dumps({key: truth, "confidence": 0.9 if clear else 0.4})
+                return truth
+        for text, tags, clear in TAG_SET:
+            if text in prompt:
+                # Small and default model share the tag prompt: the first answer comes from the small model
+                with self._lock:
+                    calls = self._seen[text] = self._seen.get(text, 0) + 1
+                if calls % 2 == 1 and not clear:
+                    return "Here are some tags you could use for this note about several topics: " + tags
+                return tags
+        return "Stub completion."
+
+
+def run(cascade, dataset, arguments, check):
+    """Run every item through the cascade and through its final stage alone."""
+    cascade.reset()
+    cascaded, baseline, correct = [], [], 0
+    for item in dataset:
+        start = time.perf_counter()
+        value = cascade(*arguments(item))
+        cascaded.append(time.perf_counter() - start)
+        correct += check(value, item)
+        start = time.perf_counter()
+        cascade.stages[-1].run(*arguments(item))
+        baseline.append(time.perf_counter() - start)
+    stats = cascade.stats()
+    return {
+        "escalation_rate": stats["escalation_rate"],
+        "answered_by": stats["answered_by"],
+        "accuracy": round(correct / len(dataset), 3),
+        "cascade": latency_stats(cascaded),
+        "always_default_model": latency_stats(baseline),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--small-latency", type=float, default=0.05, help=f"Simulated seconds per {SMALL_MODEL} call")
+    parser.add_argument("--large-latency", type=float, default=0.2, help="Simulated seconds per gemini-2.5-flash call")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    answers = StubAnswers()
+    script = lambda messages, tools_bound: AIMessage(content=answers(str(messages[-1].content)))
+    latency = {SMALL_MODEL: args.small_latency, "gemini-2.5-flash": args.large_latency}
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    translation = load_agent("translation_agent/app.py", script, model_latency=latency)
+    report["results"]["detect_language"] = run(
+        translation.language_cascade, LANGUAGE_SET, lambda item: (item[0],),
+        lambda value, item: value.strip().lower() == item[1].lower())
+
+    categorization = load_agent("note_categorization_agent/app.py", script, model_latency=latency)
+    report["results"]["suggest_tags"] = run(
+        categorization.tag_cascade, TAG_SET, lambda item: (item[0], 5),
+        lambda value, item: ", ".join(value) == item[1])
+
+    chain = load_agent("CHAINS_AGENTS/conditionalChain.py", script, model_latency=latency)
+    report["results"]["sentiment"] = run(
+        chain.sentiment_cascade, SENTIMENT_SET, lambda item: (item[0],),
+        lambda value, item: value == item[1])
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Local category model (note_categorization_agent/category_model.py) vs asking Gemini for every note.
+
+Generated notes get one topic each: filler text (as in bench_note_search.py)
+plus a few words from the topic's word list, and some notes mention a second
+topic. The scripted model labels a note with the topic whose words it
+mentions most, the way gemini-2.5-flash would pick a category. The report
+lists:
+
+- ``train``: train_category_model.py on ``--train-notes`` labelled notes
+  (notes/s), then again on ``--increment`` more, learning only the new
+  results, with the agreement on them before they were learned
+- ``predict``: latency of one local prediction and notes/s of batched
+  predictions
+- ``thresholds``: on unseen notes, the share the model would answer itself
+  and its agreement with the labels there, per confidence threshold
+- ``categorize_note``: ``--tool-notes`` unseen notes through the tool with
+  ``--llm-latency`` per model request, always asking Gemini vs the trained
+  model answering at ``--min-confidence`` (requests, latency, agreement)
+- ``save_load``: saving and loading a model version, and its size on disk
+
+Usage:
+    cd benchmarks
+    python bench_category_model.py --train-notes 5000 --llm-latency 0.5 --output category_model.json
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage
+
+from bench_note_search import note_text, timed, vocabulary
+from harness import CallCounter, latency_stats, load_agent, run_metadata, write_report
+
+TOPICS = ["Work", "Meeting", "Finance", "Travel", "Health", "Recipe", "Code", "Research", "Shopping", "Journal"]
+WORDS_PER_TOPIC = 40
+THRESHOLDS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def topic_words(vocab):
+    # Generated words from the rarer end of the vocabulary, so filler text rarely contains them
+    words = vocab[0][1000:1000 + WORDS_PER_TOPIC * len(TOPICS)]
+    return {topic: words[i * WORDS_PER_TOPIC:(i + 1) * WORDS_PER_TOPIC] for i, topic in enumerate(TOPICS)}
+
+
+def make_note(rng, vocab, topics, i):
+    topic = rng.choice(TOPICS)
+    words = rng.sample(topics[topic], rng.randint(2, 8))
+    if rng.random() < 0.2:
+        other = rng.choice(TOPICS)
+        words += rng.sample(topics[other], rng.randint(1, 4))
+    text = note_text(rng, vocab, i)
+    return f"{text} {' '.join(words).capitalize()}."
+
+
+def label(text, topics):
+    words = re.findall(r"\w+", text.lower())
+    counts = {topic: sum(words.count(word) for word in topic_words) for topic, topic_words in topics.items()}
+    return max(TOPICS, key=lambda topic: counts[topic])
+
+
+def make_script(topics):
+    def script(messages, tools_bound):
+        note = messages[-1].content.split("Note content:", 1)[-1]
+        primary = label(note, topics)
+        tags = sorted(set(re.findall(r"\w+", note.lower())) & set(topics[primary]))[:3]
+        return AIMessage(content=f"Primary Category: {primary}\nSecondary Categories: None\n"
+                                 f"Tags: {', '.join(tags + ['notes'])}")
+    return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train-notes", type=int, default=5000)
+    parser.add_argument("--increment", type=int, default=1000)
+    parser.add_argument("--test-notes", type=int, default=2000)
+    parser.add_argument("--tool-notes", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--min-confidence", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    topics = topic_words(vocab)
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    counter = CallCounter()
+    script = make_script(topics)
+    app = load_agent("note_categorization_agent/app.py", script, llm_latency=args.llm_latency, counter=counter)
+    trainer = load_agent("note_categorization_agent/train_category_model.py", script)
+    import category_model
+
+    with tempfile.TemporaryDirectory(prefix="bench_category_model_") as tmp:
+        notes_dir = os.path.join(tmp, "notes")
+        os.makedirs(notes_dir)
+        sidecar = os.path.join(tmp, "notes.categories.jsonl")
+        model_dir = os.path.join(tmp, "model")
+
+        def add_notes(start, count):
+            with open(sidecar, "a", encoding="utf-8") as f:
+                for i in range(start, start + count):
+                    name = f"note_{i:06d}.txt"
+                    text = make_note(rng, vocab, topics, i)
+                    with open(os.path.join(notes_dir, name), "w", encoding="utf-8") as note:
+                        note.write(text)
+                    f.write(json.dumps({"name": name, "primary": label(text, topics), "secondary": [],
+                                        "tags": rng.sample(topics[label(text, topics)], 3)}) + "\n")
+
+        add_notes(0, args.train_notes)
+        model = category_model.CategoryModel(model_dir, min_confidence=args.min_confidence)
+        first = trainer.train(notes_dir, sidecar, model=model)
+        add_notes(args.train_notes, args.increment)
+        second = trainer.train(notes_dir, sidecar, model=model)
+        results["train"] = {
+            "initial": {**first, "notes_per_second": round(first["learned"] / max(first["seconds"], 1e-6))},
+            "increment": {**second, "notes_per_second": round(second["learned"] / max(second["seconds"], 1e-6))},
+        }
+
+        test = [make_note(rng, vocab, topics, 10 ** 6 + i) for i in range(args.test_notes)]
+        labels = [label(text, topics) for text in test]
+        single = iter(test * (args.iterations // len(test) + 1))
+        start = time.perf_counter()
+        model.predict_many(test)
+        batched = time.perf_counter() - start
+        results["predict"] = {
+            "single": timed(lambda: model.predict(next(single)), args.iterations),
+            "batched_notes_per_second": round(len(test) / batched),
+        }
+        results["thresholds"] = {
+            str(threshold): model.evaluate(zip(test, labels), min_confidence=threshold) for threshold in THRESHOLDS
+        }
+
+        tool = {}
+        tool_notes = list(zip(test, labels))[:args.tool_notes]
+        for mode in ("llm_only", "local_first"):
+            app.category_model = category_model.CategoryModel.load(
+                model_dir, min_confidence=1.1 if mode == "llm_only" else args.min_confidence)
+            counter.reset()
+            durations, agreed = [], 0
+            for text, expected in tool_notes:
+                start = time.perf_counter()
+                reply = app.categorize_note.invoke({"note_content": text})
+                durations.append(time.perf_counter() - start)
+                agreed += category_model.parse_categorization(reply)[0] == expected
+            tool[mode] = {"requests": counter.completion, "latency": latency_stats(durations),
+                          "agreement": round(agreed / len(tool_notes), 4),
+                          "model": app.category_model.stats()}
+        results["categorize_note"] = tool
+
+        save_dir = os.path.join(tmp, "save")
+        results["save_load"] = {
+            "save": timed(lambda: model.save(save_dir), 5),
+            "load": timed(lambda: category_model.CategoryModel.load(save_dir), 5),
+            "bytes": os.path.getsize(os.path.join(save_dir, f"v{category_model.versions(save_dir)[-1]:05d}.npz")),
+            "versions_kept": category_model.versions(save_dir),
+        }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
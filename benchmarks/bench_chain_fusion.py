@@ -0,0 +1,134 @@
+"""
+CHAINS_AGENTS/sequentialChain.py unfused vs with agent_common/chain_fusion.py.
+
+Every topic goes through the report → 5-point summary chain. The scripted
+model writes a ``--report-words`` report and a summary of it (the same text
+fused or not), and each request takes ``--llm-latency`` seconds plus the time
+to generate its output at ``--tokens-per-second``. Tokens are counted as the
+stub model does (characters / 4). The report lists, per mode, latency per
+topic, model requests, input and output tokens per topic, whether the final
+summary matches the unfused one, and the fusion outcomes:
+
+- ``unfused``: the chain as written, two model calls
+- ``fused``: ``fuse_chain`` of the same chain, valid fused replies
+- ``fused_invalid``: ``fuse_chain`` with ``--invalid-rate`` of the fused replies
+  broken (half unparseable, half missing the summary), so those fall back
+
+Usage:
+    cd benchmarks
+    python bench_chain_fusion.py --topics 20 --llm-latency 0.3 --output chain_fusion.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+from langchain_core.messages import AIMessage
+
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+WORDS = ("labour market participation wages growth informal sector rural urban policy youth skills education "
+         "manufacturing services agriculture migration survey rate percent decline increase employment").split()
+
+
+def report_for(topic, words):
+    rng = random.Random(topic)
+    sentences = []
+    while sum(len(sentence.split()) for sentence in sentences) < words:
+        sentences.append(f"{topic}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))) + ".")
+    return "\n".join(sentences)
+
+
+def summary_for(report):
+    return "\n".join(f"{i}. {line[:80]}" for i, line in enumerate(report.splitlines()[:5], 1))
+
+
+def make_script(args):
+    rng = random.Random(args.seed)
+    lock = threading.Lock()
+    usage = Counter()
+    state = {"invalid_rate": 0.0}
+
+    def script(messages, tools_bound):
+        prompt = messages[-1].content
+        if prompt.startswith("Complete the following"):
+            topic = prompt.split("Generate a detailed report on ", 1)[1].split("\n", 1)[0].strip()
+            report = report_for(topic, args.report_words)
+            with lock:
+                broken = rng.random() < state["invalid_rate"]
+                unparseable = rng.random() < 0.5
+            if broken and unparseable:
+                content = json.dumps({"step_1": report, "step_2": summary_for(report)})[:-40]
+            elif broken:
+                content = json.dumps({"step_1": report})
+            else:
+                content = json.dumps({"step_1": report, "step_2": summary_for(report)})
+        elif prompt.startswith("Generate a detailed report on "):
+            content = report_for(prompt[len("Generate a detailed report on "):].strip(), args.report_words)
+        else:
+            content = summary_for(prompt.split("\n", 1)[1].strip())
+        output_tokens = len(content) // 4
+        time.sleep(output_tokens / args.tokens_per_second)
+        with lock:
+            usage["requests"] += 1
+            usage["input_tokens"] += len(prompt) // 4
+            usage["output_tokens"] += output_tokens
+        return AIMessage(content=content)
+
+    return script, usage, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--report-words", type=int, default=600)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    parser.add_argument("--invalid-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    script, usage, state = make_script(args)
+    # sequentialChain.py runs its example on import
+    with contextlib.redirect_stdout(io.StringIO()):
+        sequential = load_agent("CHAINS_AGENTS/sequentialChain.py", script, llm_latency=args.llm_latency)
+    from agent_common.chain_fusion import fuse_chain, fusion_report
+
+    topics = [f"Unemployment in region {i}" for i in range(args.topics)]
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    expected = {}
+    modes = [("unfused", sequential.chain, 0.0),
+             ("fused", fuse_chain(sequential.chain, name="bench_fused"), 0.0),
+             ("fused_invalid", fuse_chain(sequential.chain, name="bench_fused_invalid"), args.invalid_rate)]
+    for label, chain, invalid_rate in modes:
+        state["invalid_rate"] = invalid_rate
+        usage.clear()
+        durations, same = [], 0
+        for topic in topics:
+            start = time.perf_counter()
+            summary = chain.invoke({"topic": topic})
+            durations.append(time.perf_counter() - start)
+            expected.setdefault(topic, summary)
+            same += summary == expected[topic]
+        results[label] = {
+            "latency": latency_stats(durations),
+            "requests": usage["requests"],
+            "input_tokens_per_topic": round(usage["input_tokens"] / len(topics)),
+            "output_tokens_per_topic": round(usage["output_tokens"] / len(topics)),
+            "same_summary": round(same / len(topics), 4),
+        }
+        if label != "unfused":
+            # The whole chain is one fused segment, named after it
+            results[label]["fusion"] = fusion_report()[chain.name]
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
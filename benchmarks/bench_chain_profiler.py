@@ -0,0 +1,105 @@
+"""
+Overhead and output of agent_common/chain_profiler.py on the CHAINS_AGENTS chains.
+
+Each chain script is loaded with the stub model and invoked ``--iterations``
+times without and with a ``ChainProfiler`` callback, with no model latency,
+so the difference is the profiler's own cost per invocation. The report lists,
+per chain:
+
+- ``plain`` / ``profiled``: latency per invocation, and the overhead in
+  microseconds and in recorded runs per invocation
+- ``nodes``: the profiler's per-node numbers for one invocation with
+  ``--llm-latency`` per model request, where the quiz arm of parallelChain.py
+  takes ``--slow-arm-latency`` longer (so it is the critical path)
+- ``critical_path``: the runs on the critical path of that invocation
+- ``serial_arms``: parallelChain.py with ``max_concurrency=1``, where the
+  second arm has to wait for the first (queueing time of its first node)
+
+Usage:
+    cd benchmarks
+    python bench_chain_profiler.py --iterations 200 --output chain_profiler.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+
+from langchain_core.messages import AIMessage
+
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+CHAINS = {
+    "simpleChain": ("CHAINS_AGENTS/simpleChain.py", {"topic": "cricket"}),
+    "sequentialChain": ("CHAINS_AGENTS/sequentialChain.py", {"topic": "Unemployment in India"}),
+    "parallelChain": ("CHAINS_AGENTS/parallelChain.py", {"text": "Support vector machines are ..."}),
+    "conditionalChain": ("CHAINS_AGENTS/conditionalChain.py", {"feedback": "The phone arrived on Tuesday"}),
+}
+
+
+def make_script(state):
+    def script(messages, tools_bound):
+        prompt = messages[-1].content
+        if "question answers" in prompt:
+            time.sleep(state["slow_arm_latency"])
+        if "format_instruction" in prompt or '"sentiment"' in prompt:
+            return AIMessage(content=json.dumps({"sentiment": "positive", "confidence": 0.9}))
+        return AIMessage(content="A short answer from the stub model. " * 10)
+    return script
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--slow-arm-latency", type=float, default=0.2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    state = {"slow_arm_latency": 0.0}
+    script = make_script(state)
+    from agent_common.chain_profiler import ChainProfiler
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    for label, (path, inputs) in CHAINS.items():
+        # The scripts run their example on import
+        with contextlib.redirect_stdout(io.StringIO()):
+            fast = load_agent(path, script)
+            slow = load_agent(path, script, llm_latency=args.llm_latency)
+        state["slow_arm_latency"] = 0.0
+        profiler = ChainProfiler(fast.chain)
+        results = {}
+        for mode, config in (("plain", {}), ("profiled", {"callbacks": [profiler]})):
+            durations = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                fast.chain.invoke(inputs, config=config)
+                durations.append(time.perf_counter() - start)
+            results[mode] = latency_stats(durations)
+        results["overhead_us"] = round((results["profiled"]["mean_ms"] - results["plain"]["mean_ms"]) * 1000, 1)
+        results["runs_per_invocation"] = sum(1 for run in profiler.invocations for _ in run.walk()) // args.iterations
+        start = time.perf_counter()
+        trace = profiler.chrome_trace()
+        results["chrome_trace"] = {"events": len(trace["traceEvents"]), "bytes": len(json.dumps(trace)),
+                                   "export_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+        state["slow_arm_latency"] = args.slow_arm_latency
+        profiler = ChainProfiler(slow.chain)
+        slow.chain.invoke(inputs, config={"callbacks": [profiler]})
+        results["nodes"] = [{key: node[key] for key in ("path", "name", "wall_ms", "queue_ms", "input_tokens",
+                                                         "output_tokens", "critical")}
+                            for node in profiler.node_stats()]
+        results["critical_path"] = [f"{run.name} {run.duration * 1000:.0f}ms" for run in profiler.critical_path()]
+        if label == "parallelChain":
+            profiler = ChainProfiler(slow.chain)
+            slow.chain.invoke(inputs, config={"callbacks": [profiler], "max_concurrency": 1})
+            results["serial_arms"] = {
+                node["path"]: node["queue_ms"] for node in profiler.node_stats() if node["path"].endswith("step:1")
+            }
+        report["results"][label] = results
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Latency and prompt size of deep search.
+
+``deep_search_web`` reads the top result pages from the stub services and
+returns the best BM25 passages. The report compares:
+
+- fetch time of the pages one after another vs concurrently over the pooled
+  session
+- estimated tokens of the ``search_web`` snippets, of the deep search
+  passages and of the full extracted page text that would otherwise be handed
+  to the model
+- a query with an empty page store, the same query again and a related query,
+  with the upstream requests each one made
+
+Usage:
+    cd benchmarks
+    python bench_deep_search.py --pages 5 --service-latency 0.2 --output deep_search.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from harness import StubServices, latency_stats, load_agent, run_metadata, write_report
+
+QUERIES = ["topic number 17 tools", "language models answer questions topic 3", "LangChain agents topic 25"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--service-latency", type=float, default=0.2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    with StubServices(latency=args.service_latency) as services:
+        module = load_agent("web_search_agent/app.py", lambda messages, tools_bound: None, services=services)
+        # Importable once load_agent has put web_search_agent/ on sys.path
+        import deep_search as deep
+        tokens = lambda text: len(text) // deep.CHARS_PER_TOKEN
+        urls = [result["url"] for result in module._search("deep search benchmark", args.pages)[1]]
+
+        sequential, concurrent = [], []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            pages = [deep.fetch_page(url) for url in urls]
+            sequential.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            deep.deep_search(QUERIES[0], urls)
+            concurrent.append(time.perf_counter() - start)
+        report["results"]["fetch"] = {
+            "pages": len(urls),
+            "sequential": latency_stats(sequential),
+            "concurrent_pooled": latency_stats(concurrent),
+        }
+
+        full_text = sum(tokens(text) for _, text in pages)
+        for query in QUERIES:
+            report["results"][query] = {
+                "snippet_tokens": tokens(module.search_web.invoke({"query": query, "num_results": args.pages})),
+                "deep_search_tokens": tokens(module.deep_search_web.invoke({"query": query, "num_pages": args.pages})),
+                "full_page_tokens": full_text,
+            }
+
+        with tempfile.TemporaryDirectory(prefix="bench_pages_") as tmp:
+            module.page_store = module.PageStore(path=os.path.join(tmp, "pages.sqlite3"))
+            store_runs = {}
+            for label, query in (("cold", QUERIES[0]), ("repeat", QUERIES[0]), ("related", "tools topic 17")):
+                services.reset_counts()
+                start = time.perf_counter()
+                module.deep_search_web.invoke({"query": query, "num_pages": args.pages})
+                store_runs[label] = {"ms": round((time.perf_counter() - start) * 1000, 3),
+                                     "upstream_requests": sum(services.counts.values())}
+            module.page_store.index.close()
+        report["results"]["page_store"] = store_runs
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
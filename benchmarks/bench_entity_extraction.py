@@ -0,0 +1,185 @@
+"""
+extract_key_entities: the model for every note vs the local extractor (hybrid and local-only).
+
+Generated notes are built from sentence templates with known entities:
+people (listed after "Participants:", after "with", or at the start of a
+sentence), places and organizations (some in the built-in gazetteer, some
+company-style names, some unknown), dates and times in several formats, and
+topics (on a "Key topics:" line or only in the prose). The scripted model
+answers with the entities of the types it is asked for, missing
+``--llm-miss-rate`` of them.
+
+For each mode (``llm``, ``hybrid``, ``local``) the report lists per-type
+precision, recall and F1 against the known entities, model requests, and
+``extract_key_entities`` latency with ``--llm-latency`` per request.
+``hybrid_learned`` runs hybrid mode on new notes after the first hybrid
+run, when the gazetteer knows the names the model returned. ``local_only``
+is the latency of the local extractor alone.
+
+Usage:
+    cd benchmarks
+    python bench_entity_extraction.py --notes 300 --llm-latency 0.5 --output entity_extraction.json
+"""
+
+import argparse
+import random
+import re
+import time
+
+from langchain_core.messages import AIMessage
+
+from harness import CallCounter, latency_stats, load_agent, run_metadata, write_report
+
+FIRST = ["John", "Sarah", "Mike", "Priya", "Lena", "Omar", "Chen", "Maria", "David", "Aisha", "Tom", "Yuki"]
+LAST = ["Smith", "Johnson", "Chen", "Patel", "Garcia", "Müller", "Okafor", "Novak", "Silva", "Kim", "Brown"]
+KNOWN_PLACES = ["Paris", "Tokyo", "New York", "Berlin", "San Francisco", "Singapore", "London", "Toronto"]
+UNKNOWN_PLACES = ["Porto", "Kyoto", "Bergen", "Valencia", "Tallinn", "Cork"]
+KNOWN_ORGS = ["Google", "Microsoft", "Stripe", "Deloitte", "NASA", "Spotify"]
+SUFFIX_ORGS = ["Northwind Corp", "Globex Inc", "Umbrella Group", "Acme Labs", "Contoso Ltd"]
+UNKNOWN_ORGS = ["Initech", "Hooli", "Vandelay", "Pied Piper"]
+TOPICS = ["budget planning", "hiring", "product launch", "data migration", "security review", "onboarding"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+
+def random_date(rng):
+    month, day, year = rng.randrange(12), rng.randint(1, 28), rng.choice([2024, 2025])
+    return rng.choice([
+        f"{MONTHS[month]} {day}, {year}",
+        f"{MONTHS[month][:3]} {day}",
+        f"{year}-{month + 1:02d}-{day:02d}",
+        f"{day} {MONTHS[month]} {year}",
+        "next Monday", "tomorrow", "end of the quarter", f"Q{rng.randint(1, 4)} {year}",
+    ])
+
+
+def make_note(rng):
+    gold = {"People": set(), "Places": set(), "Organizations": set(), "Dates": set(), "Topics": set()}
+
+    def person():
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+        gold["People"].add(name)
+        return name
+
+    def place():
+        name = rng.choice(KNOWN_PLACES if rng.random() < 0.6 else UNKNOWN_PLACES)
+        gold["Places"].add(name)
+        return name
+
+    def org():
+        name = rng.choice(rng.choice([KNOWN_ORGS, SUFFIX_ORGS, UNKNOWN_ORGS]))
+        gold["Organizations"].add(name)
+        return name
+
+    def date():
+        value = random_date(rng)
+        gold["Dates"].add(value)
+        return value
+
+    def time_of_day():
+        value = rng.choice(["9am", "3pm", "10:30", "4:15 pm"])
+        gold["Dates"].add(value)
+        return value
+
+    templates = [
+        lambda: f"Participants: {person()}, {person()} and {person()}.",
+        lambda: f"Met with {person()} from {org()} in {place()} on {date()}.",
+        lambda: f"Call with {person()} {date()} at {time_of_day()}.",
+        lambda: f"{person()} will send the contract to {org()} by {date()}.",
+        lambda: f"Flight to {place()} on {date()}, then a workshop at {org()}.",
+        lambda: "Remember to water the plants and buy coffee.",
+    ]
+    sentences = [rng.choice(templates)() for _ in range(rng.randint(2, 5))]
+    topics = rng.sample(TOPICS, 2)
+    gold["Topics"].update(topics)
+    if rng.random() < 0.5:
+        sentences.append(f"\nKey topics: {topics[0]}, {topics[1]}")
+    else:
+        sentences.append(f"We talked about {topics[0]} and {topics[1]}.")
+    return "\n".join(sentences), gold
+
+
+def make_script(notes, miss_rate, seed):
+    rng = random.Random(seed)
+
+    def script(messages, tools_bound):
+        prompt = messages[-1].content
+        note = prompt.split("Note content:", 1)[-1].rsplit("Entities:", 1)[0].strip()
+        gold = notes[note]
+        kinds = re.findall(r"^\s*(People|Places|Organizations|Dates|Topics): \[list or None\]", prompt, re.MULTILINE)
+        lines = []
+        for kind in kinds:
+            values = [value for value in sorted(gold[kind]) if rng.random() >= miss_rate]
+            lines.append(f"{kind}: {', '.join(values) or 'None'}")
+        return AIMessage(content="\n".join(lines))
+
+    return script
+
+
+def score(replies, golds, parse):
+    report = {}
+    parsed = [parse(reply) for reply in replies]
+    for kind in ("People", "Places", "Organizations", "Dates", "Topics"):
+        found = expected = correct = 0
+        for entities, gold in zip(parsed, golds):
+            values = {value.casefold() for value in entities.get(kind)}
+            truth = {value.casefold() for value in gold[kind]}
+            found += len(values)
+            expected += len(truth)
+            correct += len(values & truth)
+        precision = correct / found if found else 0.0
+        recall = correct / expected if expected else 0.0
+        report[kind] = {"precision": round(precision, 3), "recall": round(recall, 3),
+                        "f1": round(2 * precision * recall / (precision + recall), 3) if correct else 0.0}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=300)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-miss-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    first = [make_note(rng) for _ in range(args.notes)]
+    second = [make_note(rng) for _ in range(args.notes)]
+    notes = {text: gold for text, gold in first + second}
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    counter = CallCounter()
+    app = load_agent("note_categorization_agent/app.py", make_script(notes, args.llm_miss_rate, args.seed),
+                     llm_latency=args.llm_latency, counter=counter)
+    import entity_extractor
+
+    app.entity_extractor = entity_extractor.EntityExtractor("")
+    runs = [("llm", "llm", first), ("local", "local", first), ("hybrid", "hybrid", first),
+            ("hybrid_learned", "hybrid", second)]
+    for label, mode, sample in runs:
+        app.ENTITY_EXTRACTION_MODE = mode
+        counter.reset()
+        replies, durations = [], []
+        for text, _ in sample:
+            start = time.perf_counter()
+            replies.append(app.extract_key_entities.invoke({"note_content": text}))
+            durations.append(time.perf_counter() - start)
+        report["results"][label] = {
+            "requests": counter.completion,
+            "latency": latency_stats(durations),
+            "per_type": score(replies, [gold for _, gold in sample], entity_extractor.parse_entities),
+        }
+    report["results"]["gazetteer_size"] = app.entity_extractor.gazetteer.size
+
+    extractor = entity_extractor.EntityExtractor("")
+    durations = []
+    for text, _ in first:
+        start = time.perf_counter()
+        extractor.extract(text)
+        durations.append(time.perf_counter() - start)
+    report["results"]["local_only"] = latency_stats(durations)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Many feedback texts through CHAINS_AGENTS/conditionalChain.py: one chain call per text vs the batch mode.
+
+``--feedback`` generated texts mix clear reviews (the local lexicon scorer is
+sure of them), unclear ones that need a model, and short stock replies
+("Great product!", "meh") that customers send over and over with different
+case and punctuation. Every model request takes ``--llm-latency`` seconds;
+the scripted model knows the true sentiment of every text and leaves
+``--batch-miss-rate`` of the items out of a batch classification reply. The
+report lists, per mode, wall time, feedback per second, speedup over the
+loop, model requests by kind and sentiment accuracy:
+
+- ``invoke_loop``: ``chain.invoke`` in a Python loop over the first
+  ``--serial-feedback`` texts, with the sentiment cache disabled (as before)
+- ``chain_batch``: LangChain's ``batch`` of the chain over every text with
+  ``--concurrency`` in flight, sentiment cache disabled
+- ``respond_cold``: ``respond_to_feedback`` with an empty cache
+- ``respond_warm``: ``respond_to_feedback`` on the same texts again, every
+  sentiment now cached
+
+Usage:
+    cd benchmarks
+    python bench_feedback_routing.py --feedback 500 --llm-latency 0.2 --output feedback_routing.json
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from langchain_core.messages import AIMessage
+
+from harness import load_agent, run_metadata, write_report
+
+PRODUCTS = ["phone", "laptop", "headset", "charger", "smart watch", "camera", "router", "keyboard"]
+CLEAR = {
+    "positive": ["I love this {p}, the battery is excellent", "Great {p}, setup was easy and fast",
+                 "Fantastic {p}, works perfectly and support was helpful"],
+    "negative": ["Terrible {p}, it broke after a week", "The {p} is slow and the app crashes all the time",
+                 "Worst {p} I have bought, a total waste of money"],
+}
+UNCLEAR = {
+    "positive": ["The {p} arrived on Tuesday and I use it every day for {n} hours",
+                 "Bought a second {p} for my office after {n} months with the first"],
+    "negative": ["Expected more from a {p} at this price, order {n}",
+                 "Sent the {p} back, order {n}, picking another brand next time"],
+}
+STOCK = [("Great product!", "positive"), ("Thanks, love it", "positive"), ("Five stars", "positive"),
+         ("meh", "negative"), ("Not worth it.", "negative"), ("Broken on arrival", "negative"),
+         ("As described", "positive"), ("Meh...", "negative")]
+
+
+def key(text):
+    return " ".join(re.findall(r"[a-z0-9]+(?:'[a-z]+)?", text.lower()))
+
+
+def make_feedback(rng, count, stock_share):
+    feedback, truth = [], {}
+    for i in range(count):
+        if rng.random() < stock_share:
+            text, label = rng.choice(STOCK)
+            text = rng.choice([text, text.upper(), text.lower(), f"{text}!!", f"  {text} "])
+        else:
+            label = rng.choice(["positive", "negative"])
+            templates = CLEAR if rng.random() < 0.6 else UNCLEAR
+            text = rng.choice(templates[label]).format(p=rng.choice(PRODUCTS), n=rng.randint(2, 10 ** 6))
+        feedback.append(text)
+        truth[key(text)] = label
+    return feedback, truth
+
+
+def make_script(truth, miss_rate, seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    requests = Counter()
+
+    def script(messages, tools_bound):
+        prompt = messages[-1].content
+        if prompt.startswith("Classify the sentiment of each"):
+            kind = "classify_batch"
+            items = re.findall(r"^--- Feedback (\d+) ---\n(.*)$", prompt, re.MULTILINE)
+            with lock:
+                kept = [(number, text) for number, text in items if rng.random() >= miss_rate]
+            reply = "\n".join(json.dumps({"id": int(number), "sentiment": truth[key(text)]})
+                              for number, text in kept)
+        elif "Respond with JSON only" in prompt:
+            kind = "classify_small"
+            text = prompt.split("\n", 2)[2]
+            # Stock replies and clear reviews are easy; the small model hesitates on the rest
+            sure = any(key(text) == key(stock) for stock, _ in STOCK) or not re.search(r"\d", text)
+            reply = json.dumps({"sentiment": truth[key(text)], "confidence": 0.9 if sure else 0.4})
+        elif prompt.startswith("Classify the sentiment"):
+            kind = "classify_flash"
+            reply = json.dumps({"sentiment": truth[key(prompt.split(" \n ")[1])]})
+        else:
+            kind = "respond"
+            reply = "Thank you for your feedback, we will pass it on to the team."
+        with lock:
+            requests[kind] += 1
+        return AIMessage(content=reply)
+
+    return script, requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feedback", type=int, default=500)
+    parser.add_argument("--serial-feedback", type=int, default=40)
+    parser.add_argument("--stock-share", type=float, default=0.3)
+    parser.add_argument("--batch-miss-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    feedback, truth = make_feedback(rng, args.feedback, args.stock_share)
+    script, requests = make_script(truth, args.batch_miss_rate, args.seed)
+    chain = load_agent("CHAINS_AGENTS/conditionalChain.py", script, llm_latency=args.llm_latency)
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    results["feedback"] = {"total": len(feedback), "unique": len({key(text) for text in feedback})}
+
+    def run(label, texts, call, rate=None):
+        requests.clear()
+        chain.feedback_stats.clear()
+        start = time.perf_counter()
+        sentiments = call(texts)
+        seconds = time.perf_counter() - start
+        results[label] = {
+            "feedback": len(texts),
+            "seconds": round(seconds, 2),
+            "feedback_per_second": round(len(texts) / seconds, 1),
+            "speedup_vs_loop": round(len(texts) / seconds / rate, 1) if rate else 1.0,
+            "requests": dict(requests),
+            "accuracy": round(sum(s == truth[key(t)] for s, t in zip(sentiments, texts)) / len(texts), 4),
+        }
+        if chain.feedback_stats:
+            results[label]["classified_by"] = dict(chain.feedback_stats)
+        return len(texts) / seconds
+
+    # chain = classifier_chain | branch_chain; the steps run separately to see the sentiment
+    def per_item(texts):
+        sentiments = []
+        for text in texts:
+            classified = chain.classifier_chain.invoke({"feedback": text})
+            chain.branch_chain.invoke(classified)
+            sentiments.append(classified.sentiment)
+        return sentiments
+
+    def chain_batch(texts):
+        config = {"max_concurrency": args.concurrency}
+        classified = chain.classifier_chain.batch([{"feedback": text} for text in texts], config=config)
+        chain.branch_chain.batch(classified, config=config)
+        return [item.sentiment for item in classified]
+
+    def respond(texts):
+        return [result["sentiment"] for result in chain.respond_to_feedback(texts, args.concurrency)]
+
+    # Before: every text classified by the cascade, no sentiment cache
+    chain.sentiment_cache = chain.SentimentCache(0)
+    rate = run("invoke_loop", feedback[:args.serial_feedback], per_item)
+    run("chain_batch", feedback, chain_batch, rate)
+    chain.sentiment_cache = chain.SentimentCache()
+    run("respond_cold", feedback, respond, rate)
+    run("respond_warm", feedback, respond, rate)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Tail latency and failover of hedged search_web calls.
+
+``search_web`` runs against stub Serper and DuckDuckGo endpoints in three
+scenarios: both healthy, Serper with a slow tail (a share of requests take
+``--slow-latency`` seconds) and Serper down (HTTP 503). Each scenario is run
+with Serper alone, the way the tool worked before hedging, and with the
+hedged Serper + DuckDuckGo race. The report lists latency percentiles, the
+share of calls that returned an error and which backend answered.
+
+Usage:
+    cd benchmarks
+    python bench_hedged_search.py --hedge-delay 0.3 --slow-share 0.1 --output hedged_search.json
+"""
+
+import argparse
+import random
+import time
+
+from harness import StubServices, latency_stats, load_agent, run_metadata, write_report
+
+from agent_common.tracing import METRICS
+
+SERPER = "/serper/search"
+DUCKDUCKGO = "/duckduckgo/"
+
+
+def backend_outcomes() -> dict:
+    outcomes = {}
+    for counter in METRICS.snapshot()["counters"]:
+        if counter["name"] == "agent_search_backend_total":
+            labels = counter["labels"]
+            outcomes[f"{labels['backend']}:{labels['outcome']}"] = counter["value"]
+    return dict(sorted(outcomes.items()))
+
+
+def bench(hedged, services, args):
+    module = load_agent("web_search_agent/app.py", lambda messages, tools_bound: None, services=services)
+    if not hedged:
+        module.SEARCH_BACKENDS = module.SEARCH_BACKENDS[:1]
+    module.SEARCH_HEDGE_DELAY = args.hedge_delay
+    module.SEARCH_DEADLINE = args.deadline
+    METRICS.reset()
+    durations, errors = [], 0
+    for i in range(args.calls):
+        start = time.perf_counter()
+        output = module.search_web.invoke({"query": f"hedged search query {i}", "num_results": 5})
+        durations.append(time.perf_counter() - start)
+        errors += output.startswith("Error")
+    return {
+        "latency": latency_stats(durations),
+        "error_rate": round(errors / args.calls, 4),
+        "backends": backend_outcomes(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--hedge-delay", type=float, default=0.3)
+    parser.add_argument("--deadline", type=float, default=5.0)
+    parser.add_argument("--serper-latency", type=float, default=0.1)
+    parser.add_argument("--duckduckgo-latency", type=float, default=0.15)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    parser.add_argument("--slow-share", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tail = lambda: args.slow_latency if rng.random() < args.slow_share else args.serper_latency
+    scenarios = {
+        "healthy": ({SERPER: args.serper_latency, DUCKDUCKGO: args.duckduckgo_latency}, ()),
+        "serper_slow_tail": ({SERPER: tail, DUCKDUCKGO: args.duckduckgo_latency}, ()),
+        "serper_down": ({SERPER: args.serper_latency, DUCKDUCKGO: args.duckduckgo_latency}, (SERPER,)),
+    }
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    for name, (path_latency, failing) in scenarios.items():
+        with StubServices(path_latency=path_latency, failing=failing) as services:
+            report["results"][name] = {
+                "serper_only": bench(False, services, args),
+                "hedged": bench(True, services, args),
+            }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+list_note_files on a large notes directory: per-file stat calls vs NoteIndex.
+
+A temporary notes directory is filled with ``--files`` small notes. The
+report compares:
+
+- ``listdir_stat``: the previous implementation (listdir, isfile, sort by
+  getmtime, then getsize/getmtime per file), which always lists everything
+- ``index_cold``: the first ``list_note_files`` call, which scans the
+  directory once with os.scandir
+- ``index_warm``: later calls for the first page, a later page, a filtered
+  listing and a listing sorted by name
+- ``after_save``: a listing right after ``save_note_to_file``, which updates
+  the index in place instead of rescanning
+
+Usage:
+    cd benchmarks
+    python bench_note_index.py --files 100000 --output note_index.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+
+def listdir_stat(notes_dir):
+    """The listing code list_note_files used before the metadata index."""
+    files = [f for f in os.listdir(notes_dir) if os.path.isfile(os.path.join(notes_dir, f))]
+    files.sort(key=lambda x: os.path.getmtime(os.path.join(notes_dir, x)), reverse=True)
+    file_list = "Available note files:\n"
+    for i, file in enumerate(files, 1):
+        filepath = os.path.join(notes_dir, file)
+        size = os.path.getsize(filepath)
+        modified = datetime.fromtimestamp(os.path.getmtime(filepath)).strftime("%Y-%m-%d %H:%M:%S")
+        file_list += f"{i}. {file} ({size} bytes, modified: {modified})\n"
+    return file_list.strip()
+
+
+def timed(function, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    module = load_agent("file_operations_agent/app.py", lambda messages, tools_bound: None)
+    with tempfile.TemporaryDirectory(prefix="bench_note_index_") as notes_dir:
+        for i in range(args.files):
+            extension = "md" if i % 10 == 0 else "txt"
+            with open(os.path.join(notes_dir, f"note_{i:06d}.{extension}"), "w", encoding="utf-8") as f:
+                f.write(f"Note {i}\n")
+        module.NOTES_DIR = notes_dir
+        listing = module.list_note_files
+
+        results = report["results"]
+        results["listdir_stat"] = timed(lambda: listdir_stat(notes_dir), max(1, args.iterations // 2))
+        results["index_cold"] = timed(lambda: listing.invoke({}), 1)
+        results["index_warm"] = {
+            "first_page": timed(lambda: listing.invoke({}), args.iterations),
+            "offset_half": timed(lambda: listing.invoke({"offset": args.files // 2}), args.iterations),
+            "filter_md": timed(lambda: listing.invoke({"pattern": "*.md"}), args.iterations),
+            "sort_by_name": timed(lambda: listing.invoke({"sort_by": "name"}), args.iterations),
+        }
+        counter = iter(range(10 ** 9))
+        results["after_save"] = timed(
+            lambda: (module.save_note_to_file.invoke({"content": "new", "filename": f"new_{next(counter)}"}),
+                     listing.invoke({})),
+            args.iterations,
+        )
+        results["index"] = module._notes().stats()
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Reading and updating large notes: whole-file I/O vs ranged reads and appends.
+
+For each size in ``--sizes`` (MB) a note of numbered lines is written and the
+report compares, per operation:
+
+- ``read``: the previous read_note_from_file (read the whole file, return all
+  of it) against ranged reads through the tool: the first part, a part at
+  an offset in the middle, a line range in the middle and the last lines.
+  ``returned_bytes`` shows how much text each puts into the model's context.
+- ``append``: adding one line by rewriting the whole note (read + write, the
+  only option before) against the in-place append behind
+  ``save_note_to_file(append=True)`` (file I/O only; the tool also
+  re-indexes the note for search)
+- ``write``: a plain ``open(..., "w")`` against the atomic temporary file +
+  rename write, to show the cost of the fsyncs
+
+Usage:
+    cd benchmarks
+    python bench_note_io.py --sizes 1,10,100 --output note_io.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+
+def timed(function, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    module = load_agent("file_operations_agent/app.py", lambda messages, tools_bound: None)
+    import note_io
+
+    with tempfile.TemporaryDirectory(prefix="bench_note_io_") as notes_dir:
+        module.NOTES_DIR = notes_dir
+        read = module.read_note_from_file
+        for size_mb in (int(size) for size in args.sizes.split(",")):
+            name = f"large_{size_mb}mb.txt"
+            path = os.path.join(notes_dir, name)
+            line = "A line of a long running log note with some words in it, number {:09d}.\n"
+            lines = size_mb * 1024 * 1024 // len(line.format(0))
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("".join(line.format(i) for i in range(lines)))
+            size = os.path.getsize(path)
+
+            def whole_file():
+                with open(path, "r", encoding="utf-8") as f:
+                    return f"Content of {name}:\n\n{f.read()}"
+
+            calls = {
+                "whole_file": whole_file,
+                "first_part": lambda: read.invoke({"filename": name}),
+                "offset_middle": lambda: read.invoke({"filename": name, "offset": size // 2}),
+                "lines_middle": lambda: read.invoke({"filename": name, "start_line": lines // 2,
+                                                     "end_line": lines // 2 + 50}),
+                "tail_lines": lambda: read.invoke({"filename": name, "tail_lines": 50}),
+            }
+            result = {"bytes": size, "read": {}}
+            for label, call in calls.items():
+                result["read"][label] = timed(call, args.iterations)
+                result["read"][label]["returned_bytes"] = len(call().encode("utf-8"))
+
+            def rewrite():
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content + "One more line.\n")
+
+            result["append"] = {
+                "rewrite": timed(rewrite, args.iterations),
+                "append_mode": timed(lambda: note_io.append_to_note(path, "One more line."), args.iterations),
+            }
+            content = "Short note.\n" * 100
+
+            def plain_write():
+                with open(os.path.join(notes_dir, "small.txt"), "w", encoding="utf-8") as f:
+                    f.write(content)
+
+            result["write"] = {
+                "plain": timed(plain_write, args.iterations),
+                "atomic": timed(lambda: note_io.write_atomic(os.path.join(notes_dir, "small.txt"), content),
+                                args.iterations),
+            }
+            os.remove(path)
+            report["results"][f"{size_mb}MB"] = result
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
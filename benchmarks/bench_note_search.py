@@ -0,0 +1,132 @@
+"""
+search_notes over a large notes directory.
+
+A temporary notes directory is filled with ``--notes`` generated notes: a
+few sentences drawn from a Zipf-distributed vocabulary of everyday note words
+and generated filler words, plus a rare topic word in about 1% of the notes.
+The report lists:
+
+- ``scan``: reading every file and counting query term matches, the only
+  way to find a note before search_notes
+- ``build``: the first search_notes call, which indexes every note
+- ``restart``: opening the index again, reconciling by mtime when nothing
+  changed and when 1% of the notes were edited
+- ``query``: search_notes latency for common and rare terms
+- ``save``: save_note_to_file, including the incremental index update
+
+Usage:
+    cd benchmarks
+    python bench_note_search.py --notes 100000 --output note_search.json
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+# Frequent note words, followed in the vocabulary by generated words of decreasing frequency
+WORDS = ("project meeting budget review design team schedule client report launch deadline idea research "
+         "travel grocery recipe workout doctor invoice contract hiring roadmap feedback release bug fix "
+         "python langchain agent model prompt data api server deploy test").split()
+RARE = ["zeppelin", "quokka", "marzipan", "obsidian", "tamarind", "yodel", "fjord", "kumquat"]
+QUERIES = ["budget review", "langchain agent prompt", "quokka", "fjord marzipan", "client invoice deadline"]
+SYLLABLES = ["ka", "lo", "mi", "ren", "to", "sa", "vi", "nu", "pe", "dor", "li", "ba", "ze", "qu", "fa", "mo"]
+
+
+def vocabulary(rng, size=5000):
+    words = list(WORDS)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in words:
+            words.append(word)
+    weights, total = [], 0.0
+    for rank in range(len(words)):
+        total += 1 / (rank + 10)
+        weights.append(total)
+    return words, weights
+
+
+def note_text(rng, vocab, i):
+    words, weights = vocab
+    sentences = [" ".join(rng.choices(words, cum_weights=weights, k=rng.randint(6, 14))).capitalize() + "."
+                 for _ in range(rng.randint(3, 8))]
+    if i % 97 == 0:
+        sentences.insert(rng.randrange(len(sentences)), f"Remember the {RARE[i % len(RARE)]}.")
+    return " ".join(sentences)
+
+
+def scan(notes_dir, query):
+    terms = query.lower().split()
+    hits = []
+    for name in os.listdir(notes_dir):
+        with open(os.path.join(notes_dir, name), encoding="utf-8") as f:
+            words = re.findall(r"\w+", f.read().lower())
+        score = sum(words.count(term) for term in terms)
+        if score:
+            hits.append((score, name))
+    return sorted(hits, reverse=True)[:5]
+
+
+def timed(function, iterations=1):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    module = load_agent("file_operations_agent/app.py", lambda messages, tools_bound: None)
+    with tempfile.TemporaryDirectory(prefix="bench_note_search_") as tmp:
+        notes_dir = os.path.join(tmp, "notes")
+        os.makedirs(notes_dir)
+        for i in range(args.notes):
+            with open(os.path.join(notes_dir, f"note_{i:06d}.txt"), "w", encoding="utf-8") as f:
+                f.write(note_text(rng, vocab, i))
+        module.NOTES_DIR = notes_dir
+        index_file = os.path.join(tmp, "notes_index.sqlite3")
+        # Point the agent at an index in the temporary directory instead of NOTES_SEARCH_INDEX_DIR
+        module.note_search = module.NoteSearch(module._notes(), path=index_file)
+
+        results["scan"] = timed(lambda: scan(notes_dir, QUERIES[0]))
+        results["build"] = timed(lambda: module.note_search.reconcile(module._notes().list()[1]))
+
+        reopened = module.NoteSearch(module._notes(), path=index_file)
+        results["restart"] = {"unchanged": timed(lambda: reopened.reconcile(module._notes().list()[1]))}
+        for i in range(0, args.notes, 100):
+            with open(os.path.join(notes_dir, f"note_{i:06d}.txt"), "a", encoding="utf-8") as f:
+                f.write(" Edited later.")
+        module._notes().index.max_age = 0  # edits in place do not change the directory mtime
+        results["restart"]["edited_1_percent"] = timed(lambda: reopened.reconcile(module._notes().list()[1]))
+
+        results["query"] = {
+            query: timed(lambda: module.search_notes.invoke({"query": query}), args.iterations) for query in QUERIES
+        }
+        counter = iter(range(10 ** 9))
+        results["save"] = timed(
+            lambda: module.save_note_to_file.invoke({"content": "Quokka budget review notes.",
+                                                     "filename": f"new_{next(counter)}"}),
+            args.iterations,
+        )
+        results["indexed_notes"] = len(module.note_search.index)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
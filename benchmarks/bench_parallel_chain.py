@@ -0,0 +1,110 @@
+"""
+Many documents through CHAINS_AGENTS/parallelChain.py: a serial invoke loop vs the batch mode.
+
+``--documents`` generated texts (``--duplicates`` of them repeated, and
+``--failure-rate`` of them making the scripted model fail) go through the
+notes + quiz + merge chain, three model requests per document taking
+``--llm-latency`` seconds each. The report lists:
+
+- ``serial``: ``chain.invoke`` in a Python loop over the first
+  ``--serial-documents`` documents, the only option before
+- ``c<N>``: ``process_documents`` with N documents in flight: wall time,
+  documents per second, speedup over the serial loop, model requests (the
+  duplicates are processed once), failures, and time until the first result
+  was streamed
+
+Usage:
+    cd benchmarks
+    python bench_parallel_chain.py --documents 256 --llm-latency 0.2 --output parallel_chain.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import time
+
+from langchain_core.messages import AIMessage
+
+from bench_note_search import note_text, vocabulary
+from harness import CallCounter, load_agent, run_metadata, write_report
+
+FAILURE_MARKER = "unparseable-document"
+
+
+def script(messages, tools_bound):
+    prompt = messages[-1].content
+    if FAILURE_MARKER in prompt:
+        raise RuntimeError("Simulated model failure")
+    if prompt.startswith("Merge"):
+        return AIMessage(content="# Notes and quiz\n\n- note one\n- note two\n\nQ1: ...\nA1: ...")
+    return AIMessage(content="- point one\n- point two\n- point three")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=256)
+    parser.add_argument("--serial-documents", type=int, default=16)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32,64")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    texts = []
+    for i in range(args.documents):
+        if texts and rng.random() < args.duplicates:
+            texts.append(rng.choice(texts))
+        elif rng.random() < args.failure_rate:
+            texts.append(f"{note_text(rng, vocab, i)} {FAILURE_MARKER}")
+        else:
+            texts.append(note_text(rng, vocab, i))
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    results["documents"] = {"total": len(texts), "unique": len(set(texts)),
+                            "failing": sum(FAILURE_MARKER in text for text in set(texts))}
+    counter = CallCounter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        chain = load_agent("CHAINS_AGENTS/parallelChain.py", script, llm_latency=args.llm_latency, counter=counter)
+
+    serial = [text for text in texts if FAILURE_MARKER not in text][:args.serial_documents]
+    counter.reset()
+    start = time.perf_counter()
+    for text in serial:
+        chain.chain.invoke({"text": text})
+    seconds = time.perf_counter() - start
+    serial_rate = len(serial) / seconds
+    results["serial"] = {"documents": len(serial), "seconds": round(seconds, 2),
+                         "documents_per_second": round(serial_rate, 2), "requests": counter.completion}
+
+    async def run(concurrency):
+        first, failed, done = None, 0, 0
+        start = time.perf_counter()
+        async for _, result in chain.astream_documents(texts, concurrency):
+            first = first or time.perf_counter() - start
+            done += 1
+            failed += isinstance(result, Exception)
+        return time.perf_counter() - start, first, done, failed
+
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        counter.reset()
+        seconds, first, done, failed = asyncio.run(run(concurrency))
+        results[f"c{concurrency}"] = {
+            "seconds": round(seconds, 2),
+            "documents_per_second": round(done / seconds, 2),
+            "speedup_vs_serial": round(done / seconds / serial_rate, 1),
+            "requests": counter.completion,
+            "results": done,
+            "failed": failed,
+            "first_result_seconds": round(first, 3),
+        }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Wall-time benefit of running the tool calls of one model turn concurrently.
+
+The scripted planner emits several tool calls in a single response (weather
+for N cities, or categorize + tags + entities for one note). Each agent is run
+with ``max_concurrency=1`` (one tool call at a time) and with the default
+bounded pool, and the tool results are checked to be in the order the model
+requested them.
+
+Usage:
+    cd benchmarks
+    python bench_parallel_tools.py --cities 6 --service-latency 0.2 --output parallel.json
+"""
+
+import argparse
+import time
+
+from harness import StubServices, latency_stats, load_agent, run_metadata, tool_turn_script, write_report
+from langchain_core.messages import HumanMessage, ToolMessage
+
+CITIES = ["Tokyo", "Paris", "Lima", "Cairo", "Oslo", "Delhi", "Quito", "Perth", "Accra", "Seoul"]
+
+NOTE = "Meeting with John Smith at TechCorp on January 15, 2024 about the LangChain integration."
+
+
+def _note_completion(prompt):
+    # Distinct answers per tool so the result order can be checked
+    if prompt.startswith("Based on"):
+        return "meeting, langchain"
+    if prompt.startswith("Extract key entities"):
+        return "People: John Smith"
+    return "Primary Category: Meeting"
+
+
+def bench(module, query, expected_prefixes, iterations):
+    """Time one conversation per mode and verify tool results keep the requested order."""
+    report = {}
+    for mode, config in (("sequential", {"max_concurrency": 1}), ("concurrent", {})):
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            result = module.agent_graph.invoke({"messages": [HumanMessage(content=query)]}, config=config)
+            durations.append(time.perf_counter() - start)
+            tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+            for message, prefix in zip(tool_messages, expected_prefixes):
+                if not message.content.startswith(prefix):
+                    raise AssertionError(f"{mode}: tool results out of order: {message.content[:40]!r}")
+        report[mode] = latency_stats(durations)
+    report["speedup"] = round(report["sequential"]["mean_ms"] / report["concurrent"]["mean_ms"], 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=3, help="Parallel get_weather calls in one turn")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.1)
+    parser.add_argument("--service-latency", type=float, default=0.2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    cities = CITIES[:args.cities]
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    with StubServices(latency=args.service_latency) as services:
+        weather = load_agent(
+            "weather_agent/app.py",
+            tool_turn_script([[("get_weather", {"city_name": city}) for city in cities]], "Done."),
+            services=services, llm_latency=args.llm_latency,
+        )
+        report["results"]["weather_agent"] = bench(
+            weather, f"Weather in {', '.join(cities)}", [f"Weather in {city}" for city in cities], args.iterations)
+
+        categorization = load_agent(
+            "note_categorization_agent/app.py",
+            tool_turn_script(
+                [[("categorize_note", {"note_content": NOTE}),
+                  ("suggest_tags", {"note_content": NOTE}),
+                  ("extract_key_entities", {"note_content": NOTE})]],
+                "Done.",
+                completion=_note_completion,
+            ),
+            services=services, llm_latency=args.llm_latency,
+        )
+        report["results"]["note_categorization_agent"] = bench(
+            categorization, f"Categorize, tag and extract entities: {NOTE}",
+            ["Primary Category", "Suggested tags", "People"], args.iterations)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
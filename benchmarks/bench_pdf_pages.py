@@ -0,0 +1,154 @@
+"""
+PDF loading: PyPDFLoader(...).load() vs agent_common/pdf_pages.py.
+
+A ``--pages`` page PDF with ``--lines`` lines of text per page is generated.
+Each mode loads it and splits every page as TEXTSPLITTER/lengthbased.py does
+(CharacterTextSplitter, 200 characters). The report lists, per mode, the
+time until the first chunk, the total time, pages per second, and (in a
+separate run, unless ``--skip-memory``) the peak memory allocated by Python
+in this process (tracemalloc; worker processes are not included):
+
+- ``pypdf_loader``: ``PyPDFLoader(path).load()`` then ``split_documents``, as before
+  (``pypdf_serial``, a plain pypdf loop, when langchain_community is missing)
+- ``lazy_w<N>``: ``PagedPdfLoader(path, workers=N).lazy_load()`` split page by
+  page, without the cache
+- ``cache_cold`` / ``cache_warm``: with the cache, on the first run (which
+  writes it) and on a re-run
+
+``same_text`` checks that every mode produced the same chunks.
+
+Usage:
+    cd benchmarks
+    python bench_pdf_pages.py --pages 2000 --workers 1,2,4 --output pdf_pages.json
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from langchain_text_splitters import CharacterTextSplitter
+
+from harness import run_metadata, write_report
+
+WORDS = ("network layer gradient neuron training loss batch model dropout kernel tensor weight bias epoch "
+         "optimizer learning rate activation convolution recurrent attention embedding").split()
+
+
+def write_pdf(path, pages, lines, seed):
+    """A plain PDF with one Helvetica text block per page, written without any PDF library."""
+    rng = random.Random(seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = [f"Page {page + 1}"] + [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+                                       for _ in range(lines)]
+        stream = "BT /F1 10 Tf 14 TL 50 780 Td " + " ".join(f"({line}) Tj T*" for line in text) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def measure(load_chunks):
+    """(seconds to first chunk, total seconds, chunk count, digest of the chunk texts) of one run."""
+    digest = hashlib.sha256()
+    start = time.perf_counter()
+    first, count = None, 0
+    for chunk in load_chunks():
+        first = first or time.perf_counter() - start
+        count += 1
+        digest.update(chunk.page_content.encode())
+    return first, time.perf_counter() - start, count, digest.hexdigest()
+
+
+def peak_memory(load_chunks):
+    """Peak MiB allocated by Python while the chunks are produced (a separate run: tracing is slow)."""
+    tracemalloc.start()
+    for _ in load_chunks():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 2 ** 20, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--skip-memory", action="store_true", help="Skip the (slow) traced memory runs")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    from agent_common.pdf_pages import PagedPdfLoader
+
+    splitter = CharacterTextSplitter(chunk_size=200, chunk_overlap=0, separator="")
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    results = report["results"]
+    with tempfile.TemporaryDirectory(prefix="bench_pdf_pages_") as tmp:
+        path = os.path.join(tmp, "large.pdf")
+        write_pdf(path, args.pages, args.lines, args.seed)
+        results["pdf"] = {"pages": args.pages, "bytes": os.path.getsize(path), "cpus": os.cpu_count()}
+
+        try:
+            from langchain_community.document_loaders import PyPDFLoader
+
+            modes = [("pypdf_loader", lambda: iter(splitter.split_documents(PyPDFLoader(path).load())))]
+        except ImportError:
+            from pypdf import PdfReader
+            from langchain_core.documents import Document
+
+            def load_serial():
+                pages = [Document(page_content=page.extract_text()) for page in PdfReader(path).pages]
+                return iter(splitter.split_documents(pages))
+
+            modes = [("pypdf_serial", load_serial)]
+
+        def lazy(**kwargs):
+            loader = PagedPdfLoader(path, **kwargs)
+            return lambda: (chunk for page in loader.lazy_load() for chunk in splitter.split_documents([page]))
+
+        for workers in (int(w) for w in args.workers.split(",")):
+            modes.append((f"lazy_w{workers}", lazy(workers=workers, cache_dir="")))
+        cache_dir = os.path.join(tmp, "cache")
+        modes.append(("cache_cold", lazy(cache_dir=cache_dir)))
+        modes.append(("cache_warm", lazy(cache_dir=cache_dir)))
+
+        baseline = None
+        for label, load_chunks in modes:
+            first, seconds, chunks, digest = measure(load_chunks)
+            baseline = baseline or digest
+            results[label] = {
+                "first_chunk_seconds": round(first, 4),
+                "seconds": round(seconds, 2),
+                "pages_per_second": round(args.pages / seconds),
+                "chunks": chunks,
+                "same_text": digest == baseline,
+            }
+        if not args.skip_memory:
+            for label, load_chunks in modes:
+                # cache_cold would find the cache written by its timed run; it parses like lazy_w<CPUs>
+                if label != "cache_cold":
+                    results[label]["peak_traced_mib"] = peak_memory(load_chunks)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
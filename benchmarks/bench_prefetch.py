@@ -0,0 +1,77 @@
+"""
+Latency saved and calls wasted by speculative tool prefetch.
+
+The weather + email agent answers a mix of requests with and without
+``AGENT_PREFETCH``. Most requests name the cities the scripted planner asks
+for; the "misses" scenario names cities the planner ignores, so every
+speculative call is wasted. The report lists latency per mode, prefetch
+outcomes and OpenWeather requests per conversation.
+
+Usage:
+    cd benchmarks
+    python bench_prefetch.py --llm-latency 0.3 --service-latency 0.2 --output prefetch.json
+"""
+
+import argparse
+import time
+
+from harness import StubServices, latency_stats, load_agent, run_metadata, tool_turn_script, write_report
+from langchain_core.messages import HumanMessage
+
+import agent_common.prefetch as prefetch
+
+EMAIL = ("send_email", {"email_input": "ana@example.com|Weather update|See the forecast below"})
+
+SCENARIOS = {
+    "one_city": ("What's the weather in Tokyo? Email it to ana@example.com",
+                 [[("get_weather", {"city_name": "Tokyo"})], [EMAIL]]),
+    "three_cities": ("Get the weather in Tokyo, Paris and Lima and email it to ana@example.com",
+                     [[("get_weather", {"city_name": city}) for city in ("Tokyo", "Paris", "Lima")], [EMAIL]]),
+    "misses": ("Compare the weather in Oslo and Quito for me",
+               [[("get_weather", {"city_name": "Oslo, NO"}), ("get_weather", {"city_name": "Quito, EC"})]]),
+}
+
+
+def bench(enabled, query, turns, services, args):
+    # The flag is read when the module is imported, so switch it directly between modes
+    prefetch.PREFETCH_ENABLED = enabled
+    module = load_agent("WEATHER_EMAIL_AGENT_LANGCHAIN/app.py", tool_turn_script(turns, "Done."),
+                        services=services, llm_latency=args.llm_latency)
+    durations = []
+    services.reset_counts()
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        module.agent_graph.invoke({"messages": [HumanMessage(content=query)]})
+        durations.append(time.perf_counter() - start)
+    result = {
+        "latency": latency_stats(durations),
+        "weather_requests_per_run": services.counts.get("/data/2.5/weather", 0) / args.iterations,
+    }
+    if module.weather_prefetch:
+        result["prefetch"] = module.weather_prefetch[0].stats()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--service-latency", type=float, default=0.2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    with StubServices(latency=args.service_latency) as services:
+        for name, (query, turns) in SCENARIOS.items():
+            baseline = bench(False, query, turns, services, args)
+            speculative = bench(True, query, turns, services, args)
+            report["results"][name] = {
+                "baseline": baseline,
+                "prefetch": speculative,
+                "saved_ms": round(baseline["latency"]["mean_ms"] - speculative["latency"]["mean_ms"], 3),
+            }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
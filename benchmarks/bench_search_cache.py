@@ -0,0 +1,85 @@
+"""
+Upstream calls and latency saved by the search_web result cache.
+
+A workload of research-style queries is replayed against the web search
+agent's ``search_web`` tool. It repeats queries with different case, spacing,
+punctuation and word order, and asks again for fewer results, the way an
+agent re-searches while refining an answer. Modes:
+
+- ``no_cache``: SEARCH_CACHE_TTL=0, every call goes upstream
+- ``memory``: in-memory LRU only, starting cold
+- ``disk_warm``: a new process (fresh LRU) reading the SQLite file written by
+  a previous run of the same workload
+
+Usage:
+    cd benchmarks
+    python bench_search_cache.py --service-latency 0.2 --output search_cache.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from harness import StubServices, latency_stats, load_agent, run_metadata, write_report
+
+WORKLOAD = [
+    ("LangChain agents tutorial", 10),
+    ("langchain agents tutorial", 5),
+    ("Tutorial: LangChain agents", 3),
+    ("python decorators explained", 5),
+    ("Python  decorators   explained", 5),
+    ("latest AI news", 8),
+    ("AI news latest", 4),
+    ("LangChain agents tutorial?", 10),
+    ("vector databases comparison", 5),
+    ("vector databases comparison", 10),
+    ("comparison of vector databases", 5),
+    ("python decorators explained", 2),
+]
+
+
+def bench(mode, cache_path, services, args):
+    module = load_agent("web_search_agent/app.py", lambda messages, tools_bound: None, services=services)
+    # search_web looks the cache up at call time, so each mode swaps in its own
+    module.search_cache = module.SearchCache(path=cache_path if mode.startswith("disk") else "",
+                                             ttl=0 if mode == "no_cache" else 3600)
+    durations = []
+    services.reset_counts()
+    for _ in range(args.iterations):
+        for query, num_results in WORKLOAD:
+            start = time.perf_counter()
+            module.search_web.invoke({"query": query, "num_results": num_results})
+            durations.append(time.perf_counter() - start)
+    calls = len(WORKLOAD) * args.iterations
+    upstream = services.counts.get("/serper/search", 0)
+    return {
+        "calls": calls,
+        "upstream_calls": upstream,
+        "upstream_calls_saved": calls - upstream,
+        "latency": latency_stats(durations),
+        "cache": module.search_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1, help="Times the workload is replayed per mode")
+    parser.add_argument("--service-latency", type=float, default=0.2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_search_cache_") as tmp, \
+            StubServices(latency=args.service_latency) as services:
+        cache_path = os.path.join(tmp, "search_cache.sqlite3")
+        report["results"]["no_cache"] = bench("no_cache", cache_path, services, args)
+        report["results"]["memory"] = bench("memory", cache_path, services, args)
+        # Fill the SQLite file, then measure a fresh process that only has the disk tier warm
+        bench("disk_cold", cache_path, services, args)
+        report["results"]["disk_warm"] = bench("disk_warm", cache_path, services, args)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
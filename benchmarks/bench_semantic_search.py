@@ -0,0 +1,104 @@
+"""
+semantic_search_notes: embedding throughput and query latency vs note count.
+
+Notes are generated as in bench_note_search.py and embedded with the local
+hashing embeddings, so nothing leaves the machine. For each size in
+``--sizes`` the directory is grown to that many notes and the report lists:
+
+- ``build``: reconciling the vector index with the new notes (notes/s of
+  embedding plus writing the memory-mapped matrix)
+- ``exact``: top-10 search scoring every stored vector
+- ``ivf``: top-10 search over the ``nprobe`` closest clusters, and its
+  recall of the exact top 10
+- ``tool``: the ``semantic_search_notes`` tool call, including snippets
+- ``save``: ``save_note_to_file``, including embedding the new note
+
+Usage:
+    cd benchmarks
+    python bench_semantic_search.py --sizes 1000,10000,100000 --output semantic_search.json
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench_note_search import QUERIES, note_text, vocabulary
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+
+def timed(function, iterations=1):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    module = load_agent("file_operations_agent/app.py", lambda messages, tools_bound: None)
+    with tempfile.TemporaryDirectory(prefix="bench_semantic_search_") as tmp:
+        notes_dir = os.path.join(tmp, "notes")
+        os.makedirs(notes_dir)
+        module.NOTES_DIR = notes_dir
+        vectors = module.note_vectors = module.NoteVectors(module._notes(), path=os.path.join(tmp, "vectors"))
+        index = vectors.index
+        index.ivf_min_vectors = None
+        module._search_index()  # open the (empty) full-text index that saves also update
+        written = 0
+        counter = iter(range(10 ** 9))
+        for size in (int(size) for size in args.sizes.split(",")):
+            for i in range(written, size):
+                with open(os.path.join(notes_dir, f"note_{i:06d}.txt"), "w", encoding="utf-8") as f:
+                    f.write(note_text(rng, vocab, i))
+            added = size - written
+            written = size
+            start = time.perf_counter()
+            vectors.reconcile(module._notes().list()[1])
+            seconds = time.perf_counter() - start
+            result = {"build": {"notes": added, "seconds": round(seconds, 3),
+                                "notes_per_second": round(added / seconds, 1)}}
+
+            query_vectors = [vectors.embeddings.embed([query])[0] for query in QUERIES]
+            exact = [[key for key, _ in index.search(vector, 10, exact=True)] for vector in query_vectors]
+            result["exact"] = timed(lambda: [index.search(v, 10, exact=True) for v in query_vectors],
+                                    args.iterations)
+            result["exact"]["per_query_ms"] = round(result["exact"]["p50_ms"] / len(QUERIES), 3)
+
+            index.ivf_min_vectors, index.nprobe = 1, args.nprobe
+            start = time.perf_counter()
+            index.search(query_vectors[0], 10)
+            result["ivf"] = {"clustering_ms": round((time.perf_counter() - start) * 1000, 1)}
+            result["ivf"].update(timed(lambda: [index.search(v, 10) for v in query_vectors], args.iterations))
+            result["ivf"]["per_query_ms"] = round(result["ivf"]["p50_ms"] / len(QUERIES), 3)
+            found = [[key for key, _ in index.search(vector, 10)] for vector in query_vectors]
+            result["ivf"]["recall_at_10"] = round(
+                sum(len(set(a) & set(b)) for a, b in zip(exact, found)) / sum(len(a) for a in exact), 3)
+            index.ivf_min_vectors, index._clusters = None, None
+
+            result["tool"] = timed(lambda: module.semantic_search_notes.invoke({"query": QUERIES[0]}),
+                                   args.iterations)
+            result["save"] = timed(
+                lambda: module.save_note_to_file.invoke({"content": "Quokka budget review notes.",
+                                                         "filename": f"new_{next(counter)}"}),
+                args.iterations,
+            )
+            report["results"][str(size)] = result
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Prompt size and session memory of a long multi-turn conversation.
+
+One session of the file operations agent reads a large note on every turn.
+The session is replayed with an unbounded history and with
+``ConversationMemoryMiddleware``; both keep their state in a
+``BoundedSessionSaver``. The report lists the estimated prompt tokens of the
+planner call per turn, the latency per turn and the serialized bytes held for
+the session.
+
+Usage:
+    cd benchmarks
+    python bench_session_memory.py --turns 30 --note-kb 24 --output session_memory.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from harness import latency_stats, load_agent, run_metadata, tool_turn_script, write_report
+from langchain.agents import create_agent
+from langchain_core.messages import HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+from agent_common.memory import BoundedSessionSaver, ConversationMemoryMiddleware, session_config
+
+
+def recording_script(script, prompt_tokens):
+    """Wrap a script so the prompt size of every planner call is recorded."""
+    def wrapped(messages, tools_bound):
+        if tools_bound:
+            prompt_tokens.append(count_tokens_approximately(messages))
+        return script(messages, tools_bound)
+    return wrapped
+
+
+def run_session(module, middleware, turns):
+    saver = BoundedSessionSaver(max_sessions=4)
+    graph = create_agent(model=module.chat, tools=module.tools, middleware=middleware, checkpointer=saver)
+    config = session_config("bench-session")
+    durations = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        graph.invoke({"messages": [HumanMessage(content=f"Read the note file: big_note (turn {turn})")]}, config)
+        durations.append(time.perf_counter() - start)
+    return durations, saver.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--note-kb", type=int, default=16, help="Size of the note read on every turn")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    prompt_tokens = []
+    script = recording_script(
+        tool_turn_script([[("read_note_from_file", {"filename": "big_note"})]], "The note covers the project plan.",
+                         completion="The user repeatedly read big_note, a long project plan."),
+        prompt_tokens,
+    )
+    module = load_agent("file_operations_agent/app.py", script, llm_latency=args.llm_latency)
+    module.NOTES_DIR = tempfile.mkdtemp(prefix="bench_notes_")
+    with open(os.path.join(module.NOTES_DIR, "big_note.txt"), "w", encoding="utf-8") as f:
+        line = "Project plan: milestones, owners, risks and open questions for the next release.\n"
+        f.write(line * (args.note_kb * 1024 // len(line)))
+
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    modes = (
+        ("unbounded", []),
+        ("bounded", [ConversationMemoryMiddleware(summary_model=module.chat)]),
+    )
+    for mode, middleware in modes:
+        prompt_tokens.clear()
+        durations, stats = run_session(module, middleware, args.turns)
+        report["results"][mode] = {
+            "prompt_tokens_first_turn": prompt_tokens[0],
+            "prompt_tokens_last_turn": prompt_tokens[-1],
+            "prompt_tokens_max": max(prompt_tokens),
+            "latency": latency_stats(durations),
+            "session_bytes": stats["max_session_bytes"],
+        }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Note storage backends: one file per note vs one SQLite database.
+
+``--notes`` generated notes (as in bench_note_search.py) are loaded into each
+backend of file_operations_agent/storage.py, then the report lists per
+backend:
+
+- ``load``: writing every note (notes/s), as migrate_notes.py does
+- ``open_list``: opening the store and listing the first page, the cost of
+  the first ``list_note_files`` after a restart
+- ``list``: warm ``list_note_files`` calls for the first page, a page in the
+  middle, a filename filter and the listing sorted by name
+- ``read``: ``read_note_from_file`` of random notes
+- ``save`` / ``append`` / ``delete``: single-note updates through the store
+- ``disk_bytes``: space used on disk (allocated blocks for the files)
+
+Usage:
+    cd benchmarks
+    python bench_storage.py --notes 1000000 --output storage.json
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bench_note_search import note_text, vocabulary
+from harness import latency_stats, load_agent, run_metadata, write_report
+
+
+def timed(function, iterations=1):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+
+def disk_bytes(path):
+    if os.path.isfile(path):
+        return sum(os.stat(p).st_blocks * 512 for p in (path, path + "-wal") if os.path.exists(p))
+    with os.scandir(path) as entries:
+        return sum(entry.stat().st_blocks * 512 for entry in entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=100000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--backends", default="files,sqlite,sqlite_uncompressed")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = vocabulary(rng)
+    notes = [(f"note_{i:07d}.txt", note_text(rng, vocab, i), 1.7e9 + i) for i in range(args.notes)]
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    module = load_agent("file_operations_agent/app.py", lambda messages, tools_bound: None)
+    import storage
+
+    def open_backend(backend, tmp):
+        if backend == "files":
+            return storage.FileStore(os.path.join(tmp, "notes"))
+        return storage.SQLiteStore(os.path.join(tmp, "notes.sqlite3"), compress=backend == "sqlite")
+
+    for backend in args.backends.split(","):
+        with tempfile.TemporaryDirectory(prefix="bench_storage_") as tmp:
+            os.makedirs(os.path.join(tmp, "notes"))
+            store = open_backend(backend, tmp)
+            start = time.perf_counter()
+            for batch in range(0, len(notes), 1000):
+                store.write_many(notes[batch:batch + 1000])
+            seconds = time.perf_counter() - start
+            result = {"load": {"seconds": round(seconds, 2), "notes_per_second": round(len(notes) / seconds)}}
+
+            def open_list():
+                module.note_store = open_backend(backend, tmp)
+                module._store_notes_dir = module.NOTES_DIR
+                module.list_note_files.invoke({})
+
+            result["open_list"] = timed(open_list)
+            listing = module.list_note_files
+            result["list"] = {
+                "first_page": timed(lambda: listing.invoke({}), args.iterations),
+                "offset_half": timed(lambda: listing.invoke({"offset": args.notes // 2}), args.iterations),
+                "pattern": timed(lambda: listing.invoke({"pattern": "note_00012*"}), args.iterations),
+                "sort_by_name": timed(lambda: listing.invoke({"sort_by": "name", "offset": 1000}), args.iterations),
+            }
+            result["read"] = timed(
+                lambda: module.read_note_from_file.invoke({"filename": rng.choice(notes)[0]}), args.iterations)
+            store = module.note_store
+            counter = iter(range(10 ** 9))
+            result["save"] = timed(lambda: store.write(f"new_{next(counter)}.txt", notes[0][1]), args.iterations)
+            result["append"] = timed(lambda: store.append(notes[1][0], "One more line."), args.iterations)
+            deleted = iter(notes[-args.iterations:])
+            result["delete"] = timed(lambda: store.delete(next(deleted)[0]), args.iterations)
+            result["disk_bytes"] = disk_bytes(os.path.join(tmp, "notes" if backend == "files" else "notes.sqlite3"))
+            result["stats"] = store.stats()
+            report["results"][backend] = result
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+"""
+Offline benchmark harness for the agents in this repository.
+
+Provides:
+- ScriptedChatModel: a deterministic chat model that replays predetermined
+  tool calls, so ``create_agent`` graphs run without calling Gemini
+- StubServices: local stand-ins for OpenWeather, Serper, DuckDuckGo and an
+  SMTP server that accepts and discards mail
+- load_agent(): imports an agent's ``app.py`` with the stubs wired in
+- measure(): latency / throughput / memory numbers for a callable
+"""
+
+import asyncio
+import base64
+import functools
+import importlib.util
+import itertools
+import json
+import os
+import resource
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import ConfigDict
+
+
+# ---------------------------------------------------------------------------
+# Deterministic chat model
+# ---------------------------------------------------------------------------
+
+class CallCounter:
+    """Thread-safe count of model calls made during a benchmark."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.planner = 0
+        self.completion = 0
+
+    def add(self, planner: bool):
+        with self._lock:
+            if planner:
+                self.planner += 1
+            else:
+                self.completion += 1
+
+    def reset(self):
+        with self._lock:
+            self.planner = self.completion = 0
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model that answers from a script instead of an API.
+
+    ``script(messages, tools_bound)`` returns the next AIMessage. When the model
+    is bound to tools (the agent's planner) the script usually emits tool calls;
+    unbound instances (models created inside tools) return plain completions.
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    script: Callable[[list, bool], AIMessage]
+    model: str = "stub-model"
+    temperature: float | None = None
+    latency: float = 0.0
+    tools_bound: bool = False
+    counter: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools_bound": True})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages)
+
+    def _respond(self, messages):
+        if self.counter is not None:
+            self.counter.add(self.tools_bound)
+        message = self.script(messages, self.tools_bound)
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = len(str(message.content)) // 4 + 10 * len(message.tool_calls)
+        message = message.model_copy(update={
+            "usage_metadata": {
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            "response_metadata": {"model_name": self.model},
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def tool_turn_script(turns: list, answer: str, completion: str = "Stub completion."):
+    """
+    Build a script for a tool-calling agent.
+
+    ``turns`` is a list of tool-call batches; each batch is a list of
+    ``(tool_name, args)`` pairs emitted in one model response. After the last
+    batch the planner returns ``answer``. Models used inside tools get
+    ``completion`` (a string, or a callable taking the prompt text).
+    """
+    ids = itertools.count()
+    ids_lock = threading.Lock()
+
+    def script(messages, tools_bound):
+        if not tools_bound:
+            text = completion(str(messages[-1].content)) if callable(completion) else completion
+            return AIMessage(content=text)
+        last_human = max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage))
+        step = sum(1 for m in messages[last_human:] if isinstance(m, AIMessage) and m.tool_calls)
+        if step >= len(turns):
+            return AIMessage(content=answer)
+        with ids_lock:
+            calls = [{"name": name, "args": args, "id": f"call_{next(ids)}", "type": "tool_call"}
+                     for name, args in turns[step]]
+        return AIMessage(content="", tool_calls=calls)
+
+    return script
+
+
+# ---------------------------------------------------------------------------
+# Local service stand-ins
+# ---------------------------------------------------------------------------
+
+class _StubHTTPHandler(BaseHTTPRequestHandler):
+    server_version = "StubServices/1.0"
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        services = self.server.services
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        services.record(url.path)
+        time.sleep(services.delay(url.path))
+        if url.path in services.failing:
+            self._reply({"error": "unavailable"}, status=503)
+        elif url.path == "/data/2.5/weather":
+            self._reply(_weather_payload(params.get("q", "Unknown")))
+        elif url.path == "/duckduckgo/":
+            self._reply(_duckduckgo_payload(params.get("q", "")))
+        elif url.path.startswith("/pages/"):
+            body = _page_html(url.path.rsplit("/", 1)[-1]).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._reply({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        services = self.server.services
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        services.record(url.path)
+        time.sleep(services.delay(url.path))
+        if url.path in services.failing:
+            self._reply({"error": "unavailable"}, status=503)
+        elif url.path == "/serper/search":
+            self._reply(_serper_payload(payload.get("q", ""), int(payload.get("num", 10)), services.base_url))
+        else:
+            self._reply({"error": "not found"}, status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _weather_payload(city):
+    seed = sum(map(ord, city.lower()))
+    return {
+        "name": city.title(),
+        "sys": {"country": "IN"},
+        "main": {"temp": 20 + seed % 15, "feels_like": 21 + seed % 15, "humidity": 40 + seed % 50},
+        "weather": [{"description": "scattered clouds"}],
+        "wind": {"speed": round(1 + (seed % 70) / 10, 1)},
+    }
+
+
+def _serper_payload(query, num, base_url):
+    return {"organic": [
+        {"title": f"{query} - result {i + 1}",
+         "snippet": f"Snippet {i + 1} about {query}.",
+         "link": f"{base_url}/pages/{i + 1}"}
+        for i in range(num)
+    ]}
+
+
+def _duckduckgo_payload(query):
+    return {
+        "AbstractText": f"Abstract about {query}.",
+        "AbstractURL": "https://example.com/abstract",
+        "RelatedTopics": [{"Text": f"Related topic {i + 1} for {query}", "FirstURL": f"https://example.com/{i + 1}"}
+                          for i in range(10)],
+    }
+
+
+def _page_html(page_id):
+    paragraphs = "".join(
+        f"<p>Paragraph {i} of page {page_id}. LangChain agents call tools and language models "
+        f"to answer questions about topic number {i}.</p>"
+        for i in range(40)
+    )
+    return f"<html><head><title>Page {page_id}</title><script>var x = 1;</script></head>" \
+           f"<body><nav>Home | About</nav><article>{paragraphs}</article></body></html>"
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server: accepts EHLO/AUTH/MAIL/RCPT/DATA and discards the message."""
+
+    def _send(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        self._send("220 stub-smtp ready")
+        in_data = False
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if in_data:
+                if line == ".":
+                    in_data = False
+                    self.server.services.record("smtp:message")
+                    self._send("250 OK: queued")
+                continue
+            command = line.split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self._send("250-stub-smtp")
+                self._send("250 AUTH PLAIN LOGIN")
+            elif command == "AUTH":
+                parts = line.split()
+                if len(parts) > 2 or parts[1].upper() != "PLAIN":
+                    self._send("235 Authentication successful")
+                else:
+                    self._send("334 ")
+                    base64.b64decode(self.rfile.readline().strip() or b"")
+                    self._send("235 Authentication successful")
+            elif command == "DATA":
+                in_data = True
+                self._send("354 End data with <CR><LF>.<CR><LF>")
+            elif command == "QUIT":
+                self._send("221 Bye")
+                return
+            else:
+                self._send("250 OK")
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StubServices:
+    """
+    Run the HTTP and SMTP stand-ins on free localhost ports.
+
+    ``path_latency`` overrides ``latency`` per request path; a value may be a
+    function returning the delay for each request. Paths in ``failing`` answer
+    with HTTP 503.
+    """
+
+    def __init__(self, latency: float = 0.0, path_latency: dict = None, failing=()):
+        self.latency = latency
+        self.path_latency = dict(path_latency or {})
+        self.failing = set(failing)
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._http = None
+        self._smtp = None
+
+    def record(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def delay(self, path) -> float:
+        latency = self.path_latency.get(path, self.latency)
+        return latency() if callable(latency) else latency
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._http.server_address[1]}"
+
+    @property
+    def smtp_port(self):
+        return self._smtp.server_address[1]
+
+    def env(self) -> dict:
+        """Environment variables that point the agents at these stubs."""
+        return {
+            "OPENWEATHER_BASE_URL": f"{self.base_url}/data/2.5/weather",
+            "SERPER_URL": f"{self.base_url}/serper/search",
+            "DUCKDUCKGO_URL": f"{self.base_url}/duckduckgo/",
+            "SMTP_SERVER": "127.0.0.1",
+            "SMTP_PORT": str(self.smtp_port),
+            "SMTP_USE_TLS": "false",
+        }
+
+    def __enter__(self):
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _StubHTTPHandler)
+        self._http.daemon_threads = True
+        self._http.services = self
+        self._smtp = _ThreadingTCPServer(("127.0.0.1", 0), _SMTPSinkHandler)
+        self._smtp.services = self
+        for server in (self._http, self._smtp):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        for server in (self._http, self._smtp):
+            server.shutdown()
+            server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# Loading agents with the stubs wired in
+# ---------------------------------------------------------------------------
+
+BENCH_ENV = {
+    "GOOGLE_API_KEY": "bench-google-key",
+    "OPENWEATHER_API_KEY": "bench-openweather-key",
+    "SERPER_API_KEY": "bench-serper-key",
+    "EMAIL_ADDRESS": "bench@example.com",
+    "EMAIL_PASSWORD": "bench-password",
+    "AGENT_DEBUG": "false",
+    # Agent runs repeat the same query, so a search cache would hide upstream latency;
+    # bench_search_cache.py measures the cache on its own
+    "SEARCH_CACHE_TTL": "0",
+    # Same for pages stored by deep search; bench_deep_search.py uses its own store
+    "PAGE_STORE_PATH": "",
+    # Benchmarks use throwaway notes directories; keep their search indexes out of the repository
+    "NOTES_SEARCH_INDEX_DIR": os.path.join(tempfile.gettempdir(), "bench_notes_index"),
+    # A trained local category model would answer categorize_note without Gemini;
+    # bench_category_model.py trains and measures its own
+    "CATEGORY_MODEL_DIR": os.path.join(tempfile.gettempdir(), "bench_category_model"),
+    "CATEGORY_MODEL_MIN_CONFIDENCE": "1.1",
+    # Same for local entity extraction (bench_entity_extraction.py compares the modes),
+    # and names the model returns are not written to a gazetteer file
+    "ENTITY_EXTRACTION_MODE": "llm",
+    "ENTITY_GAZETTEER_PATH": "",
+    # Keep the shared Gemini rate limiter out of the way unless a benchmark sets its own limits
+    "GEMINI_RPM": "1000000000",
+    "GEMINI_TPM": "1000000000000",
+    "GEMINI_INITIAL_CONCURRENCY": "1024",
+    "GEMINI_MAX_CONCURRENCY": "1024",
+}
+
+# agent_common reads some settings (e.g. AGENT_DEBUG) at import time, and benchmark
+# scripts may import it before the first load_agent() call
+os.environ.update(BENCH_ENV)
+
+_module_ids = itertools.count()
+
+
+def load_agent(app_path: str, script, services: StubServices = None, llm_latency: float = 0.0,
+               counter: CallCounter = None, env: dict = None, model_latency: dict = None):
+    """
+    Import an agent's app.py with every Gemini model replaced by ScriptedChatModel.
+
+    Environment variables from BENCH_ENV, the stub services and ``env`` are set
+    before import so the agent picks them up instead of values from .env.
+    ``model_latency`` overrides ``llm_latency`` per model name.
+    """
+    os.environ.update(BENCH_ENV)
+    if services is not None:
+        os.environ.update(services.env())
+    if env:
+        os.environ.update(env)
+
+    def chat_model_factory(**kwargs):
+        latency = (model_latency or {}).get(kwargs.get("model"), llm_latency)
+        return ScriptedChatModel(script=script, latency=latency, counter=counter, **kwargs)
+
+    import langchain_google_genai
+    from agent_common import models
+    original_cls = langchain_google_genai.ChatGoogleGenerativeAI
+    original_create = models.create_chat_model
+    # Scripts either build the class directly or go through create_chat_model; the
+    # agent module keeps whichever name it imported, so in-tool models stay scripted
+    langchain_google_genai.ChatGoogleGenerativeAI = chat_model_factory
+    models.create_chat_model = functools.partial(original_create, chat_model_cls=chat_model_factory)
+    try:
+        path = os.path.join(REPO_ROOT, app_path)
+        # Agents import sibling modules, as they would when run from their own folder
+        agent_dir = os.path.dirname(path)
+        if agent_dir not in sys.path:
+            sys.path.insert(0, agent_dir)
+        name = f"bench_agent_{next(_module_ids)}"
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    finally:
+        langchain_google_genai.ChatGoogleGenerativeAI = original_cls
+        models.create_chat_model = original_create
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_stats(samples: list) -> dict:
+    """Summarise latency samples (seconds) in milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+        "min_ms": round(min(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def measure(fn: Callable[[], Any], iterations: int = 20, concurrency: int = 4, warmup: int = 1) -> dict:
+    """
+    Measure ``fn`` three ways: sequential latency, concurrent throughput and
+    peak Python memory allocated during a single call.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: fn(), range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "latency": latency_stats(samples),
+        "throughput": {
+            "concurrency": concurrency,
+            "runs": iterations,
+            "runs_per_sec": round(iterations / elapsed, 3),
+        },
+        "memory": {
+            "peak_traced_kib": round(peak / 1024, 1),
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+    }
+
+
+def run_metadata(config: dict) -> dict:
+    """Commit, interpreter and settings recorded alongside every result file."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": config,
+    }
+
+
+def write_report(report: dict, output: str = None):
+    """Write a report as JSON to ``output`` (or stdout)."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+@dataclass
+class AgentScenario:
+    """One benchmarked conversation for an agent."""
+
+    name: str
+    app_path: str
+    query: str
+    turns: list
+    answer: str
+    completion: Any = "Stub completion."
+    setup: Callable = None
+    extra_env: dict = field(default_factory=dict)
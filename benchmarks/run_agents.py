@@ -0,0 +1,184 @@
+"""
+End-to-end offline benchmark for every agent in the repository.
+
+Each agent runs against ScriptedChatModel (no Gemini calls) and the local
+OpenWeather / Serper / DuckDuckGo / SMTP stand-ins. Results are written as
+JSON so runs from different commits can be diffed.
+
+Usage:
+    cd benchmarks
+    python run_agents.py --output results.json
+    python run_agents.py --agents weather_agent web_search_agent --llm-latency 0.2
+    python run_agents.py --fast-path --output fast.json
+"""
+
+import argparse
+import os
+import tempfile
+
+from harness import (AgentScenario, CallCounter, StubServices, load_agent, measure,
+                     run_metadata, tool_turn_script, write_report)
+from langchain_core.messages import HumanMessage
+
+from agent_common.cascade import ModelCascade
+
+EXAMPLE_NOTE = """Meeting Notes - AI Project Discussion
+Date: January 15, 2024
+Participants: John Smith, Sarah Johnson, Mike Chen
+The team at TechCorp is interested in integrating our LangChain-based agents.
+Key topics: Machine learning, Natural language processing, API integration"""
+
+
+def _use_temp_notes_dir(module):
+    module.NOTES_DIR = tempfile.mkdtemp(prefix="bench_notes_")
+
+
+SCENARIOS = [
+    AgentScenario(
+        name="weather_agent",
+        app_path="weather_agent/app.py",
+        query="What's the weather in Bangalore?",
+        turns=[[("get_weather", {"city_name": "Bangalore"})]],
+        answer="It is 28°C and partly cloudy in Bangalore.",
+    ),
+    AgentScenario(
+        name="weather_email_agent",
+        app_path="WEATHER_EMAIL_AGENT_LANGCHAIN/app.py",
+        query="Get the weather in Bangalore and send it to user@example.com",
+        turns=[
+            [("get_weather", {"city_name": "Bangalore"})],
+            [("send_email", {"email_input": "user@example.com|Weather Update|It is sunny in Bangalore"})],
+        ],
+        answer="I sent the Bangalore weather to user@example.com.",
+    ),
+    AgentScenario(
+        name="email_agent",
+        app_path="email_agent/app.py",
+        query="Send an email to user@example.com saying hello",
+        turns=[[("send_email", {"email_input": "user@example.com|Hello|Hello from the benchmark"})]],
+        answer="Email sent to user@example.com.",
+    ),
+    AgentScenario(
+        name="summarization_agent",
+        app_path="summarization_agent/app.py",
+        query=f"Summarize this text in bullet points: {EXAMPLE_NOTE}",
+        turns=[[("summarize_text", {"text": EXAMPLE_NOTE, "summary_type": "bullet"})]],
+        answer="- TechCorp wants to integrate the agents.",
+        completion="- TechCorp wants to integrate the agents.\n- Topics: ML, NLP, APIs",
+    ),
+    AgentScenario(
+        name="file_operations_agent",
+        app_path="file_operations_agent/app.py",
+        query=f"Save this note to a file named 'meeting_notes': {EXAMPLE_NOTE}",
+        turns=[
+            [("save_note_to_file", {"content": EXAMPLE_NOTE, "filename": "meeting_notes"})],
+            [("list_note_files", {}), ("read_note_from_file", {"filename": "meeting_notes"})],
+        ],
+        answer="Saved meeting_notes.txt.",
+        setup=_use_temp_notes_dir,
+    ),
+    AgentScenario(
+        name="file_operations_agent:list_files",
+        app_path="file_operations_agent/app.py",
+        query="List all my note files",
+        turns=[[("list_note_files", {})]],
+        answer="You have no notes yet.",
+        setup=_use_temp_notes_dir,
+    ),
+    AgentScenario(
+        name="translation_agent",
+        app_path="translation_agent/app.py",
+        query="Translate this to Hindi: Hello, how are you today?",
+        turns=[[("detect_language", {"text": "Hello, how are you today?"}),
+                ("translate_text", {"text": "Hello, how are you today?", "target_language": "Hindi"})]],
+        answer="नमस्ते, आज आप कैसे हैं?",
+        completion="नमस्ते, आज आप कैसे हैं?",
+    ),
+    AgentScenario(
+        name="translation_agent:detect_language",
+        app_path="translation_agent/app.py",
+        query="What language is this: Bonjour, je suis très content de vous voir dans la ville",
+        turns=[[("detect_language", {"text": "Bonjour, je suis très content de vous voir dans la ville"})]],
+        answer="The text is in French.",
+        completion="French",
+    ),
+    AgentScenario(
+        name="web_search_agent",
+        app_path="web_search_agent/app.py",
+        query="What are the latest developments in LangChain?",
+        turns=[[("search_web", {"query": "latest developments in LangChain", "num_results": 5})]],
+        answer="LangChain released new agent features.",
+    ),
+    AgentScenario(
+        name="note_categorization_agent",
+        app_path="note_categorization_agent/app.py",
+        query=f"Categorize this note and suggest tags: {EXAMPLE_NOTE}",
+        turns=[[("categorize_note", {"note_content": EXAMPLE_NOTE}),
+                ("suggest_tags", {"note_content": EXAMPLE_NOTE}),
+                ("extract_key_entities", {"note_content": EXAMPLE_NOTE})]],
+        answer="Primary category: Meeting. Tags: ai, agents, langchain.",
+        completion="Primary Category: Meeting\nSecondary Categories: Work, Project\nTags: ai, agents, langchain",
+    ),
+]
+
+
+def benchmark_scenario(scenario, services, args):
+    counter = CallCounter()
+    script = tool_turn_script(scenario.turns, scenario.answer, scenario.completion)
+    module = load_agent(scenario.app_path, script, services=services, llm_latency=args.llm_latency,
+                        counter=counter, env=scenario.extra_env)
+    if scenario.setup:
+        scenario.setup(module)
+
+    def run_once():
+        result = module.agent_graph.invoke({"messages": [HumanMessage(content=scenario.query)]})
+        last = result["messages"][-1]
+        # Fast-path answers come straight from the tool, not from the script
+        if last.content != scenario.answer and "fast_path" not in last.response_metadata:
+            raise AssertionError(f"{scenario.name}: unexpected answer {last.content!r}")
+        return result
+
+    # One checked run to record per-conversation call counts
+    services.reset_counts()
+    counter.reset()
+    messages = run_once()["messages"]
+    per_run = {
+        "llm_planner_calls": counter.planner,
+        "llm_completion_calls": counter.completion,
+        "messages": len(messages),
+        "service_requests": dict(services.counts),
+    }
+
+    result = measure(run_once, iterations=args.iterations, concurrency=args.concurrency)
+    result["per_run"] = per_run
+    if args.fast_path and hasattr(module, "fast_path_router"):
+        result["fast_path"] = module.fast_path_router.stats()
+    cascades = {c.tool_name: c.stats() for c in vars(module).values() if isinstance(c, ModelCascade)}
+    if cascades:
+        result["cascades"] = cascades
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", nargs="*", help="Subset of agents to run (default: all)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Simulated seconds per model call")
+    parser.add_argument("--service-latency", type=float, default=0.02, help="Simulated seconds per HTTP request")
+    parser.add_argument("--fast-path", action="store_true", help="Enable the deterministic fast path (AGENT_FAST_PATH)")
+    parser.add_argument("--output", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+    if args.fast_path:
+        os.environ["AGENT_FAST_PATH"] = "true"
+
+    selected = [s for s in SCENARIOS if not args.agents or s.name in args.agents]
+    report = {"meta": run_metadata(vars(args)), "results": {}}
+    with StubServices(latency=args.service_latency) as services:
+        for scenario in selected:
+            report["results"][scenario.name] = benchmark_scenario(scenario, services, args)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
+import sys
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -10,6 +11,17 @@ from datetime import datetime
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.fast_path import FAST_PATH_ENABLED, FastPathRoute, FastPathRouter, fast_path_middleware
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.tool_concurrency import bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, METRICS, instrument
+from note_search import NoteSearch
+from note_vectors import NOTES_EMBEDDINGS, NoteVectors
+from storage import open_store
+
 # Get API keys from environment
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
@@ -23,8 +35,85 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 NOTES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "notes")
 os.makedirs(NOTES_DIR, exist_ok=True)
 
+# Where notes are kept (NOTES_BACKEND: files in NOTES_DIR, or a SQLite database); the files backend
+# keeps cached file metadata for list_note_files, updated by save/delete
+note_store = open_store(NOTES_DIR)
+_store_notes_dir = NOTES_DIR
+
+def _notes():
+    """The note store of NOTES_DIR (reopened if NOTES_DIR is pointed elsewhere)."""
+    global note_store, _store_notes_dir
+    if _store_notes_dir != NOTES_DIR:
+        note_store, _store_notes_dir = open_store(NOTES_DIR), NOTES_DIR
+    return note_store
+
+METRICS.describe("agent_note_index_errors_total", "Index updates that failed after a note was saved or deleted, "
+                                                  "by index")
+
+def _update_index(label, index, change) -> bool:
+    """
+    Apply ``change`` to an open index after a note was saved or deleted.
+
+    A failure does not fail the save: it is logged, and False tells the caller
+    to drop the index so it is reconciled with the store on its next use.
+    """
+    try:
+        change(index)
+        return True
+    except Exception as e:
+        METRICS.inc("agent_note_index_errors_total", index=label)
+        print(f"Could not update the {label} index: {type(e).__name__}: {e}", file=sys.stderr)
+        return False
+
+# Persistent full-text index for search_notes, opened and reconciled with the disk on first use
+note_search = None
+# Tools run in parallel: one of them opens the index, the others wait for it
+_search_lock = threading.Lock()
+
+def _search_index() -> NoteSearch:
+    """The full-text index of the note store, reconciled against the stored notes when opened."""
+    global note_search
+    with _search_lock:
+        if note_search is None or note_search.store is not _notes():
+            index = NoteSearch(_notes())
+            index.reconcile(_notes().list()[1])
+            note_search = index
+        return note_search
+
+def _update_search_index(change):
+    """Apply ``change`` to the full-text index if it is open; reconcile() catches up an index opened later."""
+    global note_search
+    index = note_search
+    if index is not None and index.store is _notes() and not _update_index("search", index, change):
+        with _search_lock:
+            if note_search is index:
+                note_search = None
+
+# Persistent embedding index for semantic_search_notes, opened and reconciled on first use
+note_vectors = None
+_vectors_lock = threading.Lock()
+
+def _vector_index() -> NoteVectors:
+    """The embedding index of the note store, reconciled against the stored notes when opened."""
+    global note_vectors
+    with _vectors_lock:
+        if note_vectors is None or note_vectors.store is not _notes():
+            index = NoteVectors(_notes())
+            index.reconcile(_notes().list()[1])
+            note_vectors = index
+        return note_vectors
+
+def _update_vector_index(change):
+    """Apply ``change`` to the embedding index if it is open; reconcile() catches up an index opened later."""
+    global note_vectors
+    index = note_vectors
+    if index is not None and index.store is _notes() and not _update_index("vector", index, change):
+        with _vectors_lock:
+            if note_vectors is index:
+                note_vectors = None
+
 @tool
-def save_note_to_file(content: str, filename: str = None) -> str:
+def save_note_to_file(content: str, filename: str = None, append: bool = False) -> str:
     """
     Save note content to a file. If filename is not provided, generates one with timestamp.
     
@@ -32,6 +121,7 @@ def save_note_to_file(content: str, filename: str = None) -> str:
         content: The note content to save
         filename: Optional filename (without extension). If not provided, uses timestamp.
                   If provided without extension, adds .txt. If provided with extension, uses as-is.
+        append: Add the content to the end of an existing note instead of replacing it (default: False)
     
     Returns:
         Success message with file path
@@ -44,74 +134,168 @@ def save_note_to_file(content: str, filename: str = None) -> str:
         elif not filename.endswith(('.txt', '.md', '.json')):
             filename = f"{filename}.txt"
         
-        filepath = os.path.join(NOTES_DIR, filename)
+        store = _notes()
+        
+        if append and store.exists(filename):
+            # Only the new content is written; the indexes re-read the whole note
+            store.append(filename, content)
+            _update_search_index(lambda index: index.update(filename))
+            _update_vector_index(lambda index: index.update(filename))
+            return f"Note appended successfully to: {store.describe(filename)}"
         
-        # Save content to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Written atomically, so a crash never leaves a half-written note
+        store.write(filename, content)
+        _update_search_index(lambda index: index.update(filename, content))
+        _update_vector_index(lambda index: index.update(filename, content))
         
-        return f"Note saved successfully to: {filepath}"
+        return f"Note saved successfully to: {store.describe(filename)}"
     
     except Exception as e:
         return f"Error saving note: {str(e)}"
 
 @tool
-def read_note_from_file(filename: str) -> str:
+def read_note_from_file(filename: str, offset: int = 0, start_line: int = None, end_line: int = None,
+                        tail_lines: int = None) -> str:
     """
-    Read content from a note file.
+    Read content from a note file. Long notes are returned in parts; the result says how to read the next part.
     
     Args:
         filename: Name of the file to read (with or without extension)
+        offset: Byte position to start reading from, to continue a partial read (default: 0)
+        start_line: Read from this line on (1-based), e.g. start_line=1, end_line=20 for the first 20 lines
+        end_line: Last line to read (inclusive)
+        tail_lines: Read only the last this many lines
     
     Returns:
-        Content of the file or error message
+        Content of the file (or of the requested part) or error message
     """
     try:
         # Add .txt extension if not present
         if not filename.endswith(('.txt', '.md', '.json')):
             filename = f"{filename}.txt"
         
-        filepath = os.path.join(NOTES_DIR, filename)
+        store = _notes()
         
-        if not os.path.exists(filepath):
+        if not store.exists(filename):
             return f"Error: File '{filename}' not found in notes directory"
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        part = store.read(filename, offset=offset, start_line=start_line, end_line=end_line,
+                          tail_lines=tail_lines)
+        if part.complete:
+            return f"Content of {filename}:\n\n{part.text}"
         
-        return f"Content of {filename}:\n\n{content}"
+        result = f"Content of {filename} (bytes {part.start}-{part.end} of {part.size}):\n\n{part.text}"
+        if part.truncated and part.end < part.size:
+            result += f"\n\n[{part.size - part.end} more bytes; call again with offset={part.end} to continue]"
+        return result
     
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
 @tool
-def list_note_files() -> str:
+def list_note_files(offset: int = 0, limit: int = 50, pattern: str = None, sort_by: str = "modified") -> str:
     """
-    List all note files in the notes directory.
+    List note files in the notes directory, newest first by default.
+    
+    Args:
+        offset: Number of files to skip, for paging through long listings (default: 0)
+        limit: Maximum number of files to list (default: 50)
+        pattern: Optional filename filter with * wildcards, e.g. "*.md" or "*meeting*"
+        sort_by: "modified" (newest first), "name" (A-Z) or "size" (largest first)
     
     Returns:
         List of available note files
     """
     try:
-        files = [f for f in os.listdir(NOTES_DIR) if os.path.isfile(os.path.join(NOTES_DIR, f))]
+        total, files = _notes().list(offset=max(offset, 0), limit=max(limit, 1), pattern=pattern, sort_by=sort_by)
         
-        if not files:
+        if not total:
+            if pattern:
+                return f"No note files match '{pattern}'."
             return "No note files found in the notes directory."
-        
-        files.sort(key=lambda x: os.path.getmtime(os.path.join(NOTES_DIR, x)), reverse=True)
+        if not files:
+            return f"No note files after offset {offset} ({total} files in total)."
         
         file_list = "Available note files:\n"
-        for i, file in enumerate(files, 1):
-            filepath = os.path.join(NOTES_DIR, file)
-            size = os.path.getsize(filepath)
-            modified = datetime.fromtimestamp(os.path.getmtime(filepath)).strftime("%Y-%m-%d %H:%M:%S")
-            file_list += f"{i}. {file} ({size} bytes, modified: {modified})\n"
+        for i, note in enumerate(files, offset + 1):
+            modified = datetime.fromtimestamp(note.modified).strftime("%Y-%m-%d %H:%M:%S")
+            file_list += f"{i}. {note.name} ({note.size} bytes, modified: {modified})\n"
+        
+        if len(files) < total:
+            file_list += f"Showing {offset + 1}-{offset + len(files)} of {total} files (use offset to see more)\n"
         
         return file_list.strip()
     
     except Exception as e:
         return f"Error listing files: {str(e)}"
 
+@tool
+def search_notes(query: str, max_results: int = 5) -> str:
+    """
+    Search the contents of all note files. Returns the best matching files with a snippet of the matching text.
+    Use read_note_from_file to read a result in full.
+    
+    Args:
+        query: Words to look for in the notes
+        max_results: Maximum number of notes to return (default: 5, max: 20)
+    
+    Returns:
+        Matching note files, best first, with snippets
+    """
+    try:
+        hits = _search_index().search(query, k=min(max(max_results, 1), 20))
+        
+        if not hits:
+            return f"No notes match '{query}'."
+        
+        results = f"Notes matching '{query}':\n"
+        for i, hit in enumerate(hits, 1):
+            modified = datetime.fromtimestamp(hit["modified"]).strftime("%Y-%m-%d %H:%M:%S")
+            results += f"{i}. {hit['name']} (modified: {modified})\n   {hit['snippet']}\n"
+        
+        return results.strip()
+    
+    except Exception as e:
+        return f"Error searching notes: {str(e)}"
+
+@tool
+def semantic_search_notes(query: str, k: int = 5) -> str:
+    """
+    Find the notes most similar to a description. Matching is fuzzy on words and word stems (e.g.
+    "budgeting" also finds notes on a "budget"), but notes sharing no words with the query are not found.
+    Use search_notes when looking for specific words or names.
+    
+    Args:
+        query: Description of what the notes are about
+        k: Maximum number of notes to return (default: 5, max: 20)
+    
+    Returns:
+        The most similar note files, best first, with similarity scores and snippets
+    """
+    try:
+        hits = _vector_index().search(query, k=min(max(k, 1), 20))
+        
+        if not hits:
+            return "No notes found in the notes directory."
+        
+        results = f"Notes related to '{query}':\n"
+        for i, hit in enumerate(hits, 1):
+            modified = datetime.fromtimestamp(hit["modified"]).strftime("%Y-%m-%d %H:%M:%S")
+            results += f"{i}. {hit['name']} (similarity: {hit['score']:.2f}, modified: {modified})\n   {hit['snippet']}\n"
+        
+        return results.strip()
+    
+    except Exception as e:
+        return f"Error searching notes: {str(e)}"
+
+
+# Only model embeddings match by meaning; the default hashed embeddings match words and word stems
+if NOTES_EMBEDDINGS == "google":
+    semantic_search_notes.description = (
+        'Find notes by meaning rather than exact words, e.g. "notes about money" also finds notes on budgets '
+        'and invoices. Use search_notes when looking for specific words or names.\n\n'
+        + semantic_search_notes.description.split("\n\n", 1)[1])
+
 @tool
 def delete_note_file(filename: str) -> str:
     """
@@ -128,33 +312,61 @@ def delete_note_file(filename: str) -> str:
         if not filename.endswith(('.txt', '.md', '.json')):
             filename = f"{filename}.txt"
         
-        filepath = os.path.join(NOTES_DIR, filename)
-        
-        if not os.path.exists(filepath):
+        if not _notes().delete(filename):
             return f"Error: File '{filename}' not found"
         
-        os.remove(filepath)
+        _update_search_index(lambda index: index.remove(filename))
+        _update_vector_index(lambda index: index.remove(filename))
         return f"File '{filename}' deleted successfully"
     
     except Exception as e:
         return f"Error deleting file: {str(e)}"
 
+def _answer_list_files(match):
+    """Fast-path handler: the file listing is already a complete answer."""
+    result = list_note_files.invoke({})
+    return None if result.startswith("Error") else result
+
+# Simple listing requests answered without the model (enable with AGENT_FAST_PATH=true)
+fast_path_router = FastPathRouter("file_operations_agent", [
+    FastPathRoute(
+        "list_files",
+        r"(?:please\s+)?(?:list|show)(?:\s+me)?\s+(?:all\s+)?(?:of\s+)?(?:my\s+|the\s+)?(?:note\s+files|notes|files)\s*[.?!]*",
+        _answer_list_files,
+    ),
+    FastPathRoute("list_files", r"what\s+(?:note\s+files|notes|files)\s+do\s+i\s+have\s*\??", _answer_list_files),
+])
+
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
 
 # Define tools
-tools = [save_note_to_file, read_note_from_file, list_note_files, delete_note_file]
+tools = [save_note_to_file, read_note_from_file, list_note_files, search_notes, semantic_search_notes,
+         delete_note_file]
 
 # Create agent graph
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True
+    middleware=fast_path_middleware(fast_path_router) + [
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "file_operations_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("File Operations Agent is ready!")
@@ -162,6 +374,8 @@ if __name__ == "__main__":
     print("- 'Save this note: [content]'")
     print("- 'Read the note file: [filename]'")
     print("- 'List all my note files'")
+    print("- 'Find my notes about [topic]'")
+    print("- 'Which of my notes are related to [idea]?'")
     print("- 'Delete the note file: [filename]'")
     print("\n" + "="*50 + "\n")
     
@@ -197,3 +411,6 @@ if __name__ == "__main__":
     else:
         print(f"\nResult: {result}")
 
+    if FAST_PATH_ENABLED:
+        print(f"\nFast path: {fast_path_router.stats()}")
+
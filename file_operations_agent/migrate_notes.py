@@ -0,0 +1,48 @@
+"""
+Copy the notes from one storage backend to the other.
+
+Usage:
+    cd file_operations_agent
+    python migrate_notes.py --to sqlite    # files in NOTES_DIR -> NOTES_DB_PATH
+    python migrate_notes.py --to files     # and back
+
+Names, contents and modification times are copied; the source is left in
+place. Set NOTES_BACKEND to the new backend afterwards.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables from parent directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=env_path)
+
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import migrate, open_store
+
+DEFAULT_NOTES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "notes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", choices=["files", "sqlite"], required=True, help="Backend to copy the notes into")
+    parser.add_argument("--notes-dir", default=DEFAULT_NOTES_DIR)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.makedirs(args.notes_dir, exist_ok=True)
+    source = open_store(args.notes_dir, "sqlite" if args.to == "files" else "files")
+    target = open_store(args.notes_dir, args.to)
+    start = time.perf_counter()
+    count = migrate(source, target, args.batch_size)
+    print(f"Copied {count} notes to {target.location} in {time.perf_counter() - start:.1f}s")
+    print(f"Set NOTES_BACKEND={args.to} in .env to use them; the originals were left in place.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Cached metadata index of the notes directory.
+
+Listing notes used to cost about four ``stat`` calls per file (``isfile``,
+``getmtime`` in the sort key, then ``getsize`` and ``getmtime`` again).
+``NoteIndex`` scans the directory once with ``os.scandir`` (one ``stat`` per
+file) and keeps name, size and modification time in memory. Later listings
+only compare the directory's own mtime, which changes whenever a file is
+created, deleted or renamed, and rescan when it moved. The agent's own writes
+and deletes update the index in place, including the sorted orders kept for
+paging, so a listing after a save does not re-sort the directory.
+
+Editing an existing file in place does not touch the directory mtime, so the
+index is also rescanned once it is older than ``NOTE_INDEX_MAX_AGE`` seconds.
+
+Configuration (read from the environment / .env file):
+    NOTE_INDEX_MAX_AGE=60   Seconds before a full rescan even if the directory looks unchanged
+"""
+
+import bisect
+import fnmatch
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from agent_common.tracing import METRICS
+from note_io import is_temporary
+
+NOTE_INDEX_MAX_AGE = float(os.getenv("NOTE_INDEX_MAX_AGE", "60"))
+
+METRICS.describe("agent_note_index_scans_total", "Full scans of the notes directory by the metadata index")
+METRICS.describe("agent_note_index_files", "Files in the notes directory metadata index")
+
+SORT_KEYS = {
+    "modified": lambda note: note.modified,
+    "name": lambda note: note.name.casefold(),
+    "size": lambda note: note.size,
+}
+
+
+@dataclass(frozen=True)
+class NoteInfo:
+    """Name, size in bytes and modification time of one note file."""
+
+    name: str
+    size: int
+    modified: float
+
+
+class NoteIndex:
+    """
+    In-memory metadata of the files in ``directory``.
+
+    Args:
+        directory: The notes directory
+        max_age: Seconds before a full rescan regardless of the directory mtime
+    """
+
+    def __init__(self, directory: str, max_age: float = NOTE_INDEX_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+        self._notes = {}
+        # Sort field -> (sort keys, notes), both ascending; built on first use
+        self._orders = {}
+        self._directory_mtime = None
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+        self.counts = {"scans": 0, "cached": 0, "updates": 0}
+
+    def _refresh(self):
+        """Rescan when the directory changed or the last scan is too old (caller holds the lock)."""
+        directory_mtime = os.stat(self.directory).st_mtime_ns
+        if directory_mtime == self._directory_mtime and time.monotonic() - self._scanned_at < self.max_age:
+            self.counts["cached"] += 1
+            return
+        notes = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and not is_temporary(entry.name):
+                        info = entry.stat()
+                        notes[entry.name] = NoteInfo(entry.name, info.st_size, info.st_mtime)
+                except FileNotFoundError:
+                    continue
+        self._notes = notes
+        self._orders = {}
+        self._directory_mtime = directory_mtime
+        self._scanned_at = time.monotonic()
+        self.counts["scans"] += 1
+        METRICS.inc("agent_note_index_scans_total")
+        METRICS.set("agent_note_index_files", len(notes))
+
+    def _changed(self, name: str, note):
+        """
+        Replace the entry of ``name`` with ``note`` (None = removed) in every
+        sorted order, then adopt the directory mtime so our own change does
+        not trigger a rescan. The caller holds the lock.
+        """
+        old = self._notes.pop(name, None)
+        if note is not None:
+            self._notes[name] = note
+        for sort_by, (keys, notes) in self._orders.items():
+            key = SORT_KEYS[sort_by]
+            if old is not None:
+                position = bisect.bisect_left(keys, key(old))
+                while notes[position].name != name:
+                    position += 1
+                del keys[position], notes[position]
+            if note is not None:
+                position = bisect.bisect_right(keys, key(note))
+                keys.insert(position, key(note))
+                notes.insert(position, note)
+        if self._directory_mtime is not None:
+            self._directory_mtime = os.stat(self.directory).st_mtime_ns
+        self.counts["updates"] += 1
+        METRICS.set("agent_note_index_files", len(self._notes))
+
+    def record(self, name: str):
+        """Update the entry of a file that was just written."""
+        info = os.stat(os.path.join(self.directory, name))
+        with self._lock:
+            self._changed(name, NoteInfo(name, info.st_size, info.st_mtime))
+
+    def forget(self, name: str):
+        """Drop the entry of a file that was just deleted."""
+        with self._lock:
+            self._changed(name, None)
+
+    def get(self, name: str):
+        """Metadata of one file, or None if it is not in the directory."""
+        with self._lock:
+            self._refresh()
+            return self._notes.get(name)
+
+    def list(self, offset: int = 0, limit: int = None, pattern: str = None, sort_by: str = "modified",
+             descending: bool = None):
+        """
+        One page of the directory listing.
+
+        Args:
+            offset: Files to skip
+            limit: Files returned at most (None = all)
+            pattern: Case-insensitive glob the file name must match, e.g. "*.md" or "*meeting*"
+            sort_by: "modified", "name" or "size"
+            descending: Sort order; defaults to newest / largest first and A-Z for names
+
+        Returns:
+            Tuple of (number of matching files, list of NoteInfo)
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+        if descending is None:
+            descending = sort_by != "name"
+        with self._lock:
+            self._refresh()
+            order = self._orders.get(sort_by)
+            if order is None:
+                notes = sorted(self._notes.values(), key=SORT_KEYS[sort_by])
+                order = self._orders[sort_by] = ([SORT_KEYS[sort_by](note) for note in notes], notes)
+            notes = order[1]
+            if pattern:
+                pattern = pattern.casefold()
+                notes = [note for note in notes if fnmatch.fnmatchcase(note.name.casefold(), pattern)]
+            total = len(notes)
+            end = total if limit is None else min(total, offset + limit)
+            if descending:
+                page = notes[max(0, total - end):max(0, total - offset)][::-1]
+            else:
+                page = notes[offset:end]
+        return total, page
+
+    def stats(self) -> dict:
+        """Full scans, listings served from the cache, in-place updates and indexed files."""
+        with self._lock:
+            return {**self.counts, "files": len(self._notes)}
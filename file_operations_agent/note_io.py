@@ -0,0 +1,176 @@
+"""
+Reading and writing note files without loading or rewriting them whole.
+
+Reads return one bounded range of a note: a byte range (``offset`` and
+``max_bytes``), a range of lines, or the last lines (``slice_range``). Files of
+``MMAP_MIN_BYTES`` or more are memory-mapped, so only the pages that hold the
+requested range (and, for line ranges, the newlines before it) are read from
+disk. Ranges are widened or trimmed to whole UTF-8 characters.
+
+Writes go to a temporary file in the same directory that is fsynced and then
+renamed over the note with ``os.replace``, so a crash leaves either the old or
+the new note, never a torn one. Appends add to the end of the file in place
+instead of rewriting it.
+
+Configuration (read from the environment / .env file):
+    NOTES_READ_MAX_BYTES=16000   Bytes returned by one read at most (about 4000 tokens)
+"""
+
+import mmap
+import os
+import threading
+from dataclasses import dataclass
+
+NOTES_READ_MAX_BYTES = int(os.getenv("NOTES_READ_MAX_BYTES", "16000"))
+
+# Smaller files are read into memory; larger ones are memory-mapped
+MMAP_MIN_BYTES = 64 * 1024
+
+# Bytes whose newlines are counted at once when seeking to a line
+LINE_SCAN_CHUNK = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class NoteRange:
+    """Text of part of a note, where it starts and ends (bytes), the note's size and whether max_bytes cut it."""
+
+    text: str
+    start: int
+    end: int
+    size: int
+    truncated: bool = False
+
+    @property
+    def complete(self) -> bool:
+        return self.start == 0 and self.end == self.size
+
+
+def _char_start(buffer, position: int, size: int) -> int:
+    """Move ``position`` forward past UTF-8 continuation bytes."""
+    while position < size and 0x80 <= buffer[position] < 0xC0:
+        position += 1
+    return position
+
+
+def _skip_lines(buffer, position: int, lines: int, size: int) -> int:
+    """Byte offset of the line ``lines`` lines after ``position`` (``size`` if there are fewer)."""
+    # Skip whole chunks by counting their newlines, then find the remaining ones one by one
+    while lines and position < size:
+        count = buffer[position:position + LINE_SCAN_CHUNK].count(b"\n")
+        if count >= lines:
+            break
+        lines -= count
+        position += LINE_SCAN_CHUNK
+    if position >= size:
+        return size
+    for _ in range(lines):
+        position = buffer.find(b"\n", position, size)
+        if position < 0:
+            return size
+        position += 1
+    return position
+
+
+def slice_range(buffer, offset: int = 0, max_bytes: int = None, start_line: int = None, end_line: int = None,
+                tail_lines: int = None) -> NoteRange:
+    """
+    Cut the requested part out of a note's bytes (``bytes`` or an ``mmap``).
+
+    Args:
+        buffer: The whole note, UTF-8 encoded
+        offset: First byte to read (ignored when a line range or tail is requested)
+        max_bytes: Bytes returned at most (defaults to NOTES_READ_MAX_BYTES)
+        start_line: First line to read (1-based)
+        end_line: Last line to read (inclusive; defaults to the end, within max_bytes)
+        tail_lines: Read the last this many lines instead
+
+    Returns:
+        NoteRange with the decoded text and its byte range
+    """
+    max_bytes = max_bytes or NOTES_READ_MAX_BYTES
+    size = len(buffer)
+    if size == 0:
+        return NoteRange("", 0, 0, 0)
+    if tail_lines:
+        start = size - 1 if buffer[size - 1:size] == b"\n" else size
+        for _ in range(tail_lines):
+            start = buffer.rfind(b"\n", 0, start)
+            if start < 0:
+                break
+        start += 1
+        end = size
+    elif start_line or end_line:
+        first = max(start_line or 1, 1)
+        start = _skip_lines(buffer, 0, first - 1, size)
+        end = _skip_lines(buffer, start, max(end_line - first + 1, 0), size) if end_line else size
+    else:
+        start, end = min(max(offset, 0), size), size
+    start = _char_start(buffer, start, size)
+    truncated = end - start > max_bytes
+    if truncated:
+        # Keep the tail of a tail read, otherwise the beginning of the range; cut at a line
+        # break when there is one in the second half of the allowed bytes
+        if tail_lines:
+            start = end - max_bytes
+            newline = buffer.find(b"\n", start, start + max_bytes // 2)
+            start = _char_start(buffer, newline + 1 if newline >= 0 else start, size)
+        else:
+            end = start + max_bytes
+            newline = buffer.rfind(b"\n", end - max_bytes // 2, end)
+            end = newline + 1 if newline >= 0 else end
+    end = _char_start(buffer, end, size)
+    return NoteRange(buffer[start:end].decode("utf-8", errors="replace"), start, end, size, truncated)
+
+
+def read_range(path: str, **part) -> NoteRange:
+    """Read part of the note file at ``path``; ``part`` takes the arguments of ``slice_range``."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_MIN_BYTES:
+            return slice_range(f.read(), **part)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return slice_range(buffer, **part)
+
+
+def write_atomic(path: str, content: str):
+    """Replace the note at ``path`` with ``content`` in one step (temporary file + rename)."""
+    directory, name = os.path.split(os.path.abspath(path))
+    # Hidden name unique to this writer; created with the usual permissions (unlike mkstemp)
+    temporary = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporary, "x", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # Make the rename itself durable
+        directory_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+
+def is_temporary(name: str) -> bool:
+    """Whether ``name`` is a temporary file left by ``write_atomic``."""
+    return name.startswith(".") and name.endswith(".tmp")
+
+
+def append_to_note(path: str, content: str):
+    """
+    Add ``content`` to the end of the note at ``path`` (created if missing),
+    on a new line if the note does not end with one.
+    """
+    with open(path, "ab+") as f:
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                content = "\n" + content
+        f.write(content.encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,107 @@
+"""
+Full-text search over the notes.
+
+``NoteSearch`` keeps a persistent ``TextIndex`` (agent_common/text_index.py)
+of every note in a note store (storage.py), keyed by name, with the note's
+mtime as the indexed time. The agent's saves and deletes update the index as
+they happen. Changes made outside the agent are picked up by ``reconcile``,
+which compares the indexed mtimes with the store's listing and re-reads only
+the notes that were added or modified since, so a restart does not rebuild
+the index.
+
+Configuration (read from the environment / .env file):
+    NOTES_SEARCH_INDEX_DIR=<repo>/.cache   Where the index files are kept (one per note store)
+"""
+
+import hashlib
+import os
+
+from agent_common.text_index import TextIndex, make_snippet
+from agent_common.tracing import METRICS
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+NOTES_SEARCH_INDEX_DIR = os.getenv("NOTES_SEARCH_INDEX_DIR", DEFAULT_INDEX_DIR)
+
+# Files indexed per transaction while reconciling
+RECONCILE_BATCH = 500
+
+METRICS.describe("agent_note_search_reconciled_total", "Notes re-indexed or dropped when reconciling with the disk")
+
+
+def index_path(location: str) -> str:
+    """Index file for a note store (named after a hash of its absolute location)."""
+    digest = hashlib.sha1(os.path.abspath(location).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(NOTES_SEARCH_INDEX_DIR, f"notes_index_{digest}.sqlite3")
+
+
+def _title(name: str) -> str:
+    """File name as searchable words ("meeting_notes-2024.txt" -> "meeting notes 2024")."""
+    return os.path.splitext(name)[0].replace("_", " ").replace("-", " ")
+
+
+class NoteSearch:
+    """
+    BM25 search over the notes in ``store``.
+
+    Args:
+        store: The note store (FileStore or SQLiteStore)
+        path: Index file (defaults to one under NOTES_SEARCH_INDEX_DIR)
+    """
+
+    def __init__(self, store, path: str = None):
+        self.store = store
+        self.index = TextIndex(path or index_path(store.location))
+
+    def update(self, name: str, content: str = None):
+        """(Re-)index one note after it was written."""
+        if content is None:
+            content = self.store.read_all(name)
+        self.index.add(name, content, title=_title(name), fetched=self.store.info(name).modified)
+
+    def remove(self, name: str):
+        """Drop a deleted note from the index."""
+        self.index.remove(name)
+
+    def reconcile(self, notes: list) -> dict:
+        """
+        Bring the index in line with the notes in the store.
+
+        Args:
+            notes: NoteInfo of every note in the store
+
+        Returns:
+            Counts of notes added, updated and removed
+        """
+        indexed = self.index.fetched_times()
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        batch = []
+        for note in notes:
+            known = indexed.pop(note.name, None)
+            if known == note.modified:
+                continue
+            try:
+                batch.append({"key": note.name, "title": _title(note.name), "fetched": note.modified,
+                              "text": self.store.read_all(note.name)})
+            except OSError:
+                continue
+            counts["added" if known is None else "updated"] += 1
+            if len(batch) >= RECONCILE_BATCH:
+                self.index.add_many(batch)
+                batch = []
+        if batch:
+            self.index.add_many(batch)
+        for name in indexed:
+            self.index.remove(name)
+            counts["removed"] += 1
+        for outcome, count in counts.items():
+            if count:
+                METRICS.inc("agent_note_search_reconciled_total", count, outcome=outcome)
+        return counts
+
+    def search(self, query: str, k: int = 5, snippet_width: int = 200) -> list:
+        """Best matching notes as dicts with name, score, modified and snippet."""
+        return [
+            {"name": hit["key"], "score": hit["score"], "modified": hit["fetched"],
+             "snippet": make_snippet(hit["text"], query, snippet_width)}
+            for hit in self.index.search(query, k=k)
+        ]
@@ -0,0 +1,133 @@
+"""
+Semantic search over the notes.
+
+``NoteVectors`` embeds every note and keeps the vectors in a persistent
+``VectorIndex`` (agent_common/vector_index.py), keyed by note name with the
+note's mtime as the stamp. Like the full-text index of note_search.py, it is
+updated by the agent's saves and deletes and reconciled by mtime with the
+note store when opened, embedding new and modified notes in batches.
+
+The default embeddings are computed locally (agent_common/embeddings.py), so
+the index works offline; NOTES_EMBEDDINGS=google uses Gemini embeddings
+instead (one API call per batch, and per saved note).
+
+Exact search scores every note with one matrix product (about 12 ms at 100k
+notes). IVF search is faster on larger indexes but approximate: how many of
+the true best matches it finds depends on how well the embeddings cluster.
+
+Configuration (read from the environment / .env file):
+    NOTES_EMBEDDINGS=hashing        "hashing", "hashing-<dim>" or "google"
+    NOTES_VECTOR_IVF_MIN=0          Notes before queries switch to IVF search (0 = always exact)
+    NOTES_VECTOR_NPROBE=8           Clusters scored per query with IVF search
+"""
+
+import hashlib
+import os
+
+from agent_common.embeddings import create_embeddings
+from agent_common.text_index import make_snippet
+from agent_common.tracing import METRICS
+from agent_common.vector_index import VectorIndex
+from note_search import NOTES_SEARCH_INDEX_DIR, _title
+
+NOTES_EMBEDDINGS = os.getenv("NOTES_EMBEDDINGS", "hashing")
+NOTES_VECTOR_IVF_MIN = int(os.getenv("NOTES_VECTOR_IVF_MIN", "0"))
+NOTES_VECTOR_NPROBE = int(os.getenv("NOTES_VECTOR_NPROBE", "8"))
+
+# Notes embedded per batch while reconciling
+EMBED_BATCH = 256
+
+METRICS.describe("agent_note_vectors_embedded_total", "Notes embedded for semantic search")
+
+
+def vectors_path(location: str, embeddings_name: str) -> str:
+    """Index directory for a note store and embedding model."""
+    digest = hashlib.sha1(os.path.abspath(location).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(NOTES_SEARCH_INDEX_DIR, f"notes_vectors_{digest}_{embeddings_name}")
+
+
+class NoteVectors:
+    """
+    Embedding search over the notes in ``store``.
+
+    Args:
+        store: The note store (FileStore or SQLiteStore)
+        path: Index directory (defaults to one under NOTES_SEARCH_INDEX_DIR)
+        embeddings: Object with ``name``, ``dim`` and ``embed(texts)`` (defaults to NOTES_EMBEDDINGS)
+    """
+
+    def __init__(self, store, path: str = None, embeddings=None):
+        self.store = store
+        self.embeddings = embeddings or create_embeddings(NOTES_EMBEDDINGS)
+        self.index = VectorIndex(
+            path or vectors_path(store.location, self.embeddings.name),
+            self.embeddings.dim,
+            ivf_min_vectors=NOTES_VECTOR_IVF_MIN or None,
+            nprobe=NOTES_VECTOR_NPROBE,
+        )
+
+    @staticmethod
+    def _document(name: str, content: str) -> str:
+        return f"{_title(name)}\n{content}"
+
+    def update(self, name: str, content: str = None):
+        """(Re-)embed one note after it was written."""
+        if content is None:
+            content = self.store.read_all(name)
+        self.index.add(name, self.embeddings.embed([self._document(name, content)]), self.store.info(name).modified)
+        METRICS.inc("agent_note_vectors_embedded_total")
+
+    def remove(self, name: str):
+        """Drop a deleted note from the index."""
+        self.index.remove(name)
+
+    def _embed_batch(self, batch: list):
+        self.index.add_many([name for name, _, _ in batch],
+                            self.embeddings.embed([self._document(name, text) for name, _, text in batch]),
+                            [modified for _, modified, _ in batch])
+        METRICS.inc("agent_note_vectors_embedded_total", len(batch))
+
+    def reconcile(self, notes: list) -> dict:
+        """
+        Bring the index in line with the notes in the store.
+
+        Args:
+            notes: NoteInfo of every note in the store
+
+        Returns:
+            Counts of notes added, updated and removed
+        """
+        indexed = self.index.stamps()
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        batch = []
+        for note in notes:
+            known = indexed.pop(note.name, None)
+            if known == note.modified:
+                continue
+            try:
+                batch.append((note.name, note.modified, self.store.read_all(note.name)))
+            except OSError:
+                continue
+            counts["added" if known is None else "updated"] += 1
+            if len(batch) >= EMBED_BATCH:
+                self._embed_batch(batch)
+                batch = []
+        if batch:
+            self._embed_batch(batch)
+        for name in indexed:
+            self.index.remove(name)
+            counts["removed"] += 1
+        return counts
+
+    def search(self, query: str, k: int = 5, snippet_width: int = 200) -> list:
+        """Notes closest in meaning to ``query`` as dicts with name, score, modified and snippet."""
+        hits = self.index.search(self.embeddings.embed([query])[0], k=k)
+        results = []
+        for name, score in hits:
+            try:
+                snippet = make_snippet(self.store.read_all(name), query, snippet_width)
+            except OSError:
+                continue
+            results.append({"name": name, "score": score, "modified": self.index.stamp(name),
+                            "snippet": snippet})
+        return results
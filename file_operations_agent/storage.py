@@ -0,0 +1,280 @@
+"""
+Storage backends for notes.
+
+The agent's tools work on a note store chosen by ``NOTES_BACKEND``:
+
+- ``files`` (default): one file per note in NOTES_DIR, listed through the
+  metadata index of note_index.py and read / written with note_io.py
+- ``sqlite``: every note is a row of one SQLite database (WAL mode) with
+  indexes on name, modification time and size, so listing, paging and
+  filtering millions of notes is an index scan instead of a directory scan.
+  Contents above ``NOTES_COMPRESS_MIN_BYTES`` are zlib-compressed when that
+  makes them smaller.
+
+Both stores expose the same methods (``exists``, ``info``, ``read``,
+``read_all``, ``write``, ``write_many``, ``append``, ``delete``, ``list``,
+``describe`` and ``stats``) and describe notes with ``NoteInfo``.
+
+Move existing notes from one backend to the other with migrate_notes.py.
+
+Configuration (read from the environment / .env file):
+    NOTES_BACKEND=files             "files" or "sqlite"
+    NOTES_DB_PATH=<NOTES_DIR>.sqlite3   Database of the sqlite backend
+    NOTES_COMPRESS=true             Compress note contents in the sqlite backend
+    NOTES_COMPRESS_MIN_BYTES=512    Smaller notes are stored uncompressed
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from note_index import SORT_KEYS, NoteIndex, NoteInfo
+from note_io import append_to_note, read_range, slice_range, write_atomic
+
+NOTES_BACKEND = os.getenv("NOTES_BACKEND", "files")
+NOTES_DB_PATH = os.getenv("NOTES_DB_PATH", "")
+NOTES_COMPRESS = os.getenv("NOTES_COMPRESS", "true").lower() == "true"
+NOTES_COMPRESS_MIN_BYTES = int(os.getenv("NOTES_COMPRESS_MIN_BYTES", "512"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    folded TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    modified REAL NOT NULL,
+    compressed INTEGER NOT NULL,
+    content BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_folded ON notes (folded);
+CREATE INDEX IF NOT EXISTS notes_modified ON notes (modified);
+CREATE INDEX IF NOT EXISTS notes_size ON notes (size);
+"""
+
+# Column each sort field of list() orders by
+SORT_COLUMNS = {"modified": "modified", "name": "folded", "size": "size"}
+
+
+class FileStore:
+    """
+    One file per note in ``directory`` (the original layout).
+
+    Args:
+        directory: The notes directory
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.location = os.path.abspath(directory)
+        self.index = NoteIndex(directory)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def describe(self, name: str) -> str:
+        """Where the note is stored, for messages to the user."""
+        return self._path(name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def info(self, name: str):
+        """NoteInfo of a note, or None if it does not exist."""
+        try:
+            info = os.stat(self._path(name))
+        except FileNotFoundError:
+            return None
+        return NoteInfo(name, info.st_size, info.st_mtime)
+
+    def read(self, name: str, **part):
+        """Part of a note as a NoteRange; ``part`` takes the arguments of note_io.slice_range."""
+        return read_range(self._path(name), **part)
+
+    def read_all(self, name: str) -> str:
+        with open(self._path(name), "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    def write(self, name: str, content: str):
+        """Create or replace a note atomically."""
+        write_atomic(self._path(name), content)
+        self.index.record(name)
+
+    def write_many(self, notes):
+        """Write (name, content, modified) tuples, keeping the given modification times."""
+        for name, content, modified in notes:
+            write_atomic(self._path(name), content)
+            os.utime(self._path(name), (modified, modified))
+            self.index.record(name)
+
+    def append(self, name: str, content: str):
+        """Add content to the end of an existing note without rewriting it."""
+        append_to_note(self._path(name), content)
+        self.index.record(name)
+
+    def delete(self, name: str) -> bool:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            return False
+        self.index.forget(name)
+        return True
+
+    def list(self, offset: int = 0, limit: int = None, pattern: str = None, sort_by: str = "modified",
+             descending: bool = None):
+        """One page of the listing as (matching notes, list of NoteInfo); see NoteIndex.list."""
+        return self.index.list(offset, limit, pattern, sort_by, descending)
+
+    def stats(self) -> dict:
+        return {"backend": "files", **self.index.stats()}
+
+
+class SQLiteStore:
+    """
+    Notes as rows of one SQLite database.
+
+    Args:
+        path: Database file (created if missing)
+        compress: zlib-compress contents of at least ``compress_min_bytes``
+        compress_min_bytes: Smaller contents are stored as they are
+    """
+
+    def __init__(self, path: str, compress: bool = NOTES_COMPRESS,
+                 compress_min_bytes: int = NOTES_COMPRESS_MIN_BYTES):
+        self.path = path
+        self.location = os.path.abspath(path)
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        os.makedirs(os.path.dirname(self.location), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.counts = {"reads": 0, "writes": 0, "listings": 0}
+
+    def describe(self, name: str) -> str:
+        return f"{self.path} (note '{name}')"
+
+    def _encode(self, content: str):
+        data = content.encode("utf-8")
+        if self.compress and len(data) >= self.compress_min_bytes:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                return len(data), 1, packed
+        return len(data), 0, data
+
+    def _data(self, name: str):
+        """The note's UTF-8 bytes, or None (caller holds the lock)."""
+        row = self._db.execute("SELECT compressed, content FROM notes WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        self.counts["reads"] += 1
+        return zlib.decompress(row[1]) if row[0] else bytes(row[1])
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM notes WHERE name = ?", (name,)).fetchone() is not None
+
+    def info(self, name: str):
+        with self._lock:
+            row = self._db.execute("SELECT name, size, modified FROM notes WHERE name = ?", (name,)).fetchone()
+        return NoteInfo(*row) if row else None
+
+    def read(self, name: str, **part):
+        with self._lock:
+            data = self._data(name)
+        if data is None:
+            raise FileNotFoundError(name)
+        return slice_range(data, **part)
+
+    def read_all(self, name: str) -> str:
+        with self._lock:
+            data = self._data(name)
+        if data is None:
+            raise FileNotFoundError(name)
+        return data.decode("utf-8", errors="replace")
+
+    def write(self, name: str, content: str):
+        self.write_many([(name, content, time.time())])
+
+    def write_many(self, notes):
+        """Write (name, content, modified) tuples in one transaction."""
+        rows = [(name, name.casefold(), *self._encode(content), modified) for name, content, modified in notes]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO notes (name, folded, size, compressed, content, modified) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET size = excluded.size, compressed = excluded.compressed, "
+                "content = excluded.content, modified = excluded.modified",
+                rows,
+            )
+            self.counts["writes"] += len(rows)
+
+    def append(self, name: str, content: str):
+        """Add content to the end of a note (the row is rewritten, recompressed if needed)."""
+        with self._lock, self._db:
+            data = self._data(name)
+            if data is None:
+                raise FileNotFoundError(name)
+            if data and not data.endswith(b"\n"):
+                content = "\n" + content
+            size, compressed, packed = self._encode(data.decode("utf-8", errors="replace") + content)
+            self._db.execute("UPDATE notes SET size = ?, compressed = ?, content = ?, modified = ? WHERE name = ?",
+                             (size, compressed, packed, time.time(), name))
+            self.counts["writes"] += 1
+
+    def delete(self, name: str) -> bool:
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM notes WHERE name = ?", (name,)).rowcount > 0
+
+    def list(self, offset: int = 0, limit: int = None, pattern: str = None, sort_by: str = "modified",
+             descending: bool = None):
+        """One page of the listing as (matching notes, list of NoteInfo); same arguments as NoteIndex.list."""
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+        if descending is None:
+            descending = sort_by != "name"
+        where, parameters = "", []
+        if pattern:
+            # GLOB has fnmatch's wildcards; both sides are case-folded like NoteIndex does
+            where, parameters = "WHERE folded GLOB ?", [pattern.casefold()]
+        order = f"{SORT_COLUMNS[sort_by]} {'DESC' if descending else 'ASC'}"
+        with self._lock:
+            self.counts["listings"] += 1
+            total = self._db.execute(f"SELECT COUNT(*) FROM notes {where}", parameters).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT name, size, modified FROM notes {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                parameters + [-1 if limit is None else limit, offset],
+            ).fetchall()
+        return total, [NoteInfo(*row) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            notes, stored, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0), COALESCE(SUM(size), 0) FROM notes").fetchone()
+        return {"backend": "sqlite", **self.counts, "notes": notes, "bytes": size, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(notes_dir: str, backend: str = None):
+    """The note store of ``backend`` (defaults to NOTES_BACKEND) for the notes directory."""
+    backend = backend or NOTES_BACKEND
+    if backend == "files":
+        return FileStore(notes_dir)
+    if backend == "sqlite":
+        return SQLiteStore(NOTES_DB_PATH or os.path.abspath(notes_dir).rstrip(os.sep) + ".sqlite3")
+    raise ValueError(f"Unknown NOTES_BACKEND '{backend}' (use 'files' or 'sqlite')")
+
+
+def migrate(source, target, batch_size: int = 1000) -> int:
+    """Copy every note (content and modification time) from one store to another; returns the count."""
+    total, notes = source.list(sort_by="name")
+    for start in range(0, total, batch_size):
+        target.write_many([(note.name, source.read_all(note.name), note.modified)
+                           for note in notes[start:start + batch_size]])
+    return total
@@ -1,6 +1,6 @@
 import os
+import sys
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -9,6 +9,17 @@ from langchain_core.messages import HumanMessage
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.cascade import SMALL_MODEL, Candidate, ModelCascade, model_stage
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.tool_concurrency import bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, METRICS, instrument
+from categories import COMMON_CATEGORIES
+from category_model import CategoryModel
+from entity_extractor import ENTITY_EXTRACTION_MODE, ENTITY_LEARN, EntityExtractor, parse_entities
+
 # Get API keys from environment
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
@@ -18,12 +29,18 @@ if not GOOGLE_API_KEY:
 # Set GOOGLE_API_KEY in environment for LangChain to use
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
-# Common note categories
-COMMON_CATEGORIES = [
-    "Work", "Personal", "Study", "Meeting", "Ideas", "Research", 
-    "Shopping", "Travel", "Health", "Finance", "Project", "Journal",
-    "Recipe", "Book Notes", "Code", "Documentation", "Reminder", "Other"
-]
+def _load_category_model():
+    """The newest saved category model, or an empty one when none is saved or it cannot be read."""
+    try:
+        return CategoryModel.load()
+    except Exception as e:
+        # A corrupt version must not keep the agent from starting; the next save gets a new version
+        print(f"Could not load the category model, starting with an empty one: {type(e).__name__}: {e}",
+              file=sys.stderr)
+        return CategoryModel()
+
+# Local categorizer learned from gemini-2.5-flash's answers (newest saved version, empty if none)
+category_model = _load_category_model()
 
 @tool
 def categorize_note(note_content: str, suggested_categories: str = None) -> str:
@@ -38,7 +55,12 @@ def categorize_note(note_content: str, suggested_categories: str = None) -> str:
         Categorization result with primary category, secondary categories, and suggested tags
     """
     try:
-        categorization_model = ChatGoogleGenerativeAI(
+        # The local model only knows the categories it was trained on, so custom ones always go to Gemini
+        prediction = None if suggested_categories else category_model.predict(note_content)
+        if not suggested_categories and category_model.answers(prediction):
+            return prediction.format()
+        
+        categorization_model = create_chat_model(
             model="gemini-2.5-flash",
             temperature=0.3  # Lower temperature for more consistent categorization
         )
@@ -68,11 +90,41 @@ def categorize_note(note_content: str, suggested_categories: str = None) -> str:
         response = categorization_model.invoke(prompt)
         result = response.content if hasattr(response, 'content') else str(response)
         
+        if not suggested_categories:
+            # Learn from the answer and count whether the local prediction agreed with it
+            category_model.observe(note_content, result, prediction)
+        
         return result.strip()
     
     except Exception as e:
         return f"Error categorizing note: {str(e)}"
 
+def _tags_prompt(note_content, num_tags=5):
+    return f"""Based on the following note content, suggest {num_tags} relevant tags (keywords).
+        Tags should be short, descriptive, and useful for searching.
+        Return only the tags as a comma-separated list, no additional text.
+        
+        Note content:
+        {note_content}
+        
+        Tags:"""
+
+def _parse_tags(reply):
+    tags = [tag.strip().strip("#").strip() for tag in reply.replace("\n", ",").split(",")]
+    tags = [tag for tag in tags if tag]
+    return Candidate(tags) if tags else None
+
+def _valid_tags(tags, note_content, num_tags=5):
+    # Short keywords, roughly as many as requested; prose or a long list means the model drifted
+    return 0 < len(tags) <= num_tags + 2 and all(len(tag) <= 40 and len(tag.split()) <= 4 for tag in tags)
+
+# The small model answers when its tags look like tags; gemini-2.5-flash otherwise
+tag_cascade = ModelCascade("suggest_tags", [
+    model_stage(SMALL_MODEL, create_chat_model(model=SMALL_MODEL, temperature=0.4), _tags_prompt, _parse_tags),
+    model_stage("gemini-2.5-flash", create_chat_model(model="gemini-2.5-flash", temperature=0.4),
+                _tags_prompt, _parse_tags),
+], validate=_valid_tags)
+
 @tool
 def suggest_tags(note_content: str, num_tags: int = 5) -> str:
     """
@@ -86,27 +138,43 @@ def suggest_tags(note_content: str, num_tags: int = 5) -> str:
         Comma-separated list of suggested tags
     """
     try:
-        tag_model = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.4
-        )
+        tags = tag_cascade(note_content, num_tags)
         
-        prompt = f"""Based on the following note content, suggest {num_tags} relevant tags (keywords).
-        Tags should be short, descriptive, and useful for searching.
-        Return only the tags as a comma-separated list, no additional text.
+        return f"Suggested tags: {', '.join(tags)}"
+    
+    except Exception as e:
+        return f"Error suggesting tags: {str(e)}"
+
+ENTITY_DESCRIPTIONS = {
+    "People": "People (names mentioned)",
+    "Places": "Places/Locations",
+    "Organizations": "Organizations/Companies",
+    "Dates": "Dates/Time references",
+    "Topics": "Main topics/subjects",
+}
+
+# Dates, labelled names and known places / organizations are found without the model
+entity_extractor = EntityExtractor()
+
+def _residual_entities_prompt(note_content, entities):
+    kinds = entities.missing()
+    # Types asked for again are left out, including their low-confidence matches
+    found = "\n".join(line for line in entities.format().splitlines()
+                      if not line.endswith(": None") and line.split(":", 1)[0] not in kinds)
+    return f"""Extract key entities from the following note.
+        These were already found, do not repeat them:
+        {found or 'Nothing yet'}
         
-        Note content:
-        {note_content}
+        Identify and list only:
+        {chr(10).join('- ' + ENTITY_DESCRIPTIONS[kind] for kind in kinds)}
         
-        Tags:"""
+        Format as:
+        {chr(10).join(f'{kind}: [list or None]' for kind in kinds)}
         
-        response = tag_model.invoke(prompt)
-        tags = response.content if hasattr(response, 'content') else str(response)
+        Note content:
+        {note_content}
         
-        return f"Suggested tags: {tags.strip()}"
-    
-    except Exception as e:
-        return f"Error suggesting tags: {str(e)}"
+        Entities:"""
 
 @tool
 def extract_key_entities(note_content: str) -> str:
@@ -120,10 +188,26 @@ def extract_key_entities(note_content: str) -> str:
         Extracted entities organized by type
     """
     try:
-        entity_model = ChatGoogleGenerativeAI(
+        if ENTITY_EXTRACTION_MODE != "llm":
+            entities = entity_extractor.extract(note_content)
+            # Local-only mode, or nothing left for the model to find
+            if ENTITY_EXTRACTION_MODE == "local" or not entities.missing():
+                METRICS.inc("agent_entity_extraction_total", mode=ENTITY_EXTRACTION_MODE, model="false")
+                return entities.format()
+        
+        entity_model = create_chat_model(
             model="gemini-2.5-flash",
             temperature=0.2
         )
+        METRICS.inc("agent_entity_extraction_total", mode=ENTITY_EXTRACTION_MODE, model="true")
+        
+        if ENTITY_EXTRACTION_MODE != "llm":
+            # Ask only for the types the local pass found nothing certain for
+            response = entity_model.invoke(_residual_entities_prompt(note_content, entities))
+            found = parse_entities(response.content if hasattr(response, 'content') else str(response))
+            if ENTITY_LEARN:
+                entity_extractor.learn(found)
+            return entities.replace(found, entities.missing()).format()
         
         prompt = f"""Extract key entities from the following note. 
         Identify and list:
@@ -154,7 +238,7 @@ def extract_key_entities(note_content: str) -> str:
         return f"Error extracting entities: {str(e)}"
 
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
@@ -166,9 +250,22 @@ tools = [categorize_note, suggest_tags, extract_key_entities]
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True
+    middleware=[
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "note_categorization_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("Note Categorization Agent is ready!")
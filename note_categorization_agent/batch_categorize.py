@@ -0,0 +1,280 @@
+"""
+Categorize every note in a directory in bulk.
+
+Instead of one agent conversation per note, notes are packed into batches
+that fit a prompt token budget, and each batch is categorized with a single
+model request that answers with one JSON line per note. Several batches run
+at once; the shared Gemini rate limiter (agent_common/rate_limit.py) keeps
+them within GEMINI_RPM / GEMINI_TPM.
+
+Results are appended to a JSONL sidecar file next to the notes directory
+(``<notes dir>.categories.jsonl``), one line per note with its primary and
+secondary categories and tags. The sidecar doubles as the checkpoint: a new
+run skips every note whose name and modification time are already recorded,
+so an interrupted run resumes where it stopped and edited notes are
+categorized again. Notes the model left out of its answer are retried once
+in a batch of their own.
+
+Usage:
+    cd note_categorization_agent
+    python batch_categorize.py ../notes
+    python batch_categorize.py ../notes --force    # categorize everything again
+
+Configuration (read from the environment / .env file):
+    BATCH_CATEGORIZE_TOKEN_BUDGET=6000   Approximate prompt tokens per request
+    BATCH_CATEGORIZE_MAX_NOTES=25        Notes per request at most
+    BATCH_CATEGORIZE_NOTE_CHARS=3000     Characters of each note sent to the model
+    BATCH_CATEGORIZE_CONCURRENCY=4       Requests in flight
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+# Load environment variables from parent directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=env_path)
+
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.models import create_chat_model
+from agent_common.tracing import METRICS
+from categories import COMMON_CATEGORIES
+
+BATCH_CATEGORIZE_TOKEN_BUDGET = int(os.getenv("BATCH_CATEGORIZE_TOKEN_BUDGET", "6000"))
+BATCH_CATEGORIZE_MAX_NOTES = int(os.getenv("BATCH_CATEGORIZE_MAX_NOTES", "25"))
+BATCH_CATEGORIZE_NOTE_CHARS = int(os.getenv("BATCH_CATEGORIZE_NOTE_CHARS", "3000"))
+BATCH_CATEGORIZE_CONCURRENCY = int(os.getenv("BATCH_CATEGORIZE_CONCURRENCY", "4"))
+
+NOTE_EXTENSIONS = (".txt", ".md", ".json")
+
+# Rough size of a prompt in tokens (the usual four characters per token)
+CHARS_PER_TOKEN = 4
+
+METRICS.describe("agent_batch_categorize_notes_total", "Notes handled by the batch categorization job")
+METRICS.describe("agent_batch_categorize_batch_size", "Notes per batch categorization request")
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 15, 20, 25, 50)
+
+PROMPT = """Categorize each of the notes below.
+For every note give a primary category (one of: {categories} or a new appropriate category),
+up to 2 secondary categories and 3-5 tags.
+
+Answer with exactly one JSON object per line, one line per note, in this form and nothing else:
+{{"id": 1, "primary": "Work", "secondary": ["Meeting"], "tags": ["budget", "q3", "review"]}}
+
+{notes}"""
+
+
+def sidecar_path(notes_dir: str) -> str:
+    """Default results file for a notes directory."""
+    return os.path.abspath(notes_dir).rstrip(os.sep) + ".categories.jsonl"
+
+
+def load_results(path: str) -> dict:
+    """Latest recorded result per note name (later lines win)."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut off by an interrupted run
+            results[record["name"]] = record
+    return results
+
+
+def pending_notes(notes_dir: str, done: dict, stats: dict = None):
+    """
+    (name, modified) of the notes not categorized since their last change, by name.
+
+    Notes skipped because they are up to date are counted in ``stats["already_done"]``;
+    records of notes that were edited or deleted since are not.
+    """
+    with os.scandir(notes_dir) as entries:
+        notes = sorted((entry.name, entry.stat().st_mtime) for entry in entries
+                       if entry.is_file() and entry.name.endswith(NOTE_EXTENSIONS))
+    for name, modified in notes:
+        record = done.get(name)
+        if record is None or record.get("modified") != modified:
+            yield name, modified
+        elif stats is not None:
+            stats["already_done"] += 1
+
+
+def _note_block(number: int, name: str, text: str) -> str:
+    return f"--- Note {number} ({name}) ---\n{text[:BATCH_CATEGORIZE_NOTE_CHARS].strip()}\n"
+
+
+def pack_batches(notes_dir: str, notes, token_budget: int = None, max_notes: int = None):
+    """
+    Group notes into batches whose prompt stays within the token budget.
+
+    Yields lists of (name, modified, text); a note larger than the budget on its
+    own (after truncation to BATCH_CATEGORIZE_NOTE_CHARS) gets a batch to itself.
+    """
+    token_budget = token_budget or BATCH_CATEGORIZE_TOKEN_BUDGET
+    max_notes = max_notes or BATCH_CATEGORIZE_MAX_NOTES
+    overhead = len(PROMPT) + len(", ".join(COMMON_CATEGORIES))
+    batch, used = [], overhead
+    for name, modified in notes:
+        try:
+            with open(os.path.join(notes_dir, name), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read(BATCH_CATEGORIZE_NOTE_CHARS)
+        except OSError:
+            continue
+        size = len(_note_block(len(batch) + 1, name, text))
+        if batch and ((used + size) / CHARS_PER_TOKEN > token_budget or len(batch) >= max_notes):
+            yield batch
+            batch, used = [], overhead
+        batch.append((name, modified, text))
+        used += size
+    if batch:
+        yield batch
+
+
+def _parse(reply: str, count: int) -> dict:
+    """Note number -> result dict from the model's JSON lines."""
+    results = {}
+    for match in re.finditer(r"\{.*?\}(?=\s*(?:\n|$|\{))", reply, re.DOTALL):
+        try:
+            item = json.loads(match.group())
+            number = int(item["id"])
+        except (ValueError, KeyError, TypeError):
+            continue
+        if 1 <= number <= count and item.get("primary"):
+            results[number] = {
+                "primary": str(item["primary"]).strip(),
+                "secondary": [str(c).strip() for c in item.get("secondary") or []][:2],
+                "tags": [str(t).strip() for t in item.get("tags") or []][:5],
+            }
+    return results
+
+
+def categorize_batch(model, batch: list) -> tuple:
+    """
+    Categorize one batch with a single request.
+
+    Returns:
+        (records for the notes the model answered, notes it left out)
+    """
+    notes = "\n".join(_note_block(number, name, text) for number, (name, _, text) in enumerate(batch, 1))
+    reply = model.invoke(PROMPT.format(categories=", ".join(COMMON_CATEGORIES), notes=notes))
+    answers = _parse(reply.content if hasattr(reply, "content") else str(reply), len(batch))
+    records, missing = [], []
+    for number, (name, modified, text) in enumerate(batch, 1):
+        if number in answers:
+            records.append({"name": name, "modified": modified, **answers[number], "categorized_at": time.time()})
+        else:
+            missing.append((name, modified, text))
+    METRICS.observe("agent_batch_categorize_batch_size", len(batch), buckets=BATCH_SIZE_BUCKETS)
+    return records, missing
+
+
+def run(notes_dir: str, output: str = None, model=None, concurrency: int = None, token_budget: int = None,
+        max_notes: int = None, force: bool = False, max_batches: int = None) -> dict:
+    """
+    Categorize the notes of ``notes_dir`` that are not in the sidecar yet.
+
+    Args:
+        notes_dir: Directory with the notes
+        output: JSONL results file (defaults to ``<notes_dir>.categories.jsonl``)
+        model: Chat model (defaults to gemini-2.5-flash through the shared rate limiter)
+        concurrency: Requests in flight
+        token_budget: Approximate prompt tokens per request
+        max_notes: Notes per request at most
+        force: Categorize every note again, ignoring earlier results
+        max_batches: Stop after this many batches (None = all)
+
+    Returns:
+        Counts of categorized, already done and failed notes, requests made, and notes per minute
+    """
+    output = output or sidecar_path(notes_dir)
+    model = model or create_chat_model(model="gemini-2.5-flash", temperature=0.3)
+    concurrency = concurrency or BATCH_CATEGORIZE_CONCURRENCY
+    done = {} if force else load_results(output)
+    stats = {"categorized": 0, "already_done": 0, "failed": 0, "requests": 0, "retried": 0}
+    batches = pack_batches(notes_dir, pending_notes(notes_dir, done, stats), token_budget, max_notes)
+    if max_batches is not None:
+        batches = (batch for _, batch in zip(range(max_batches), batches))
+    start = time.perf_counter()
+
+    def attempt(batch):
+        outcome = {"records": [], "missing": batch, "requests": 1, "retried": 0}
+        try:
+            outcome["records"], outcome["missing"] = categorize_batch(model, batch)
+            if outcome["missing"]:
+                # Retry the notes the model skipped once, on their own
+                outcome["requests"] += 1
+                outcome["retried"] = len(outcome["missing"])
+                records, outcome["missing"] = categorize_batch(model, outcome["missing"])
+                outcome["records"] += records
+        except Exception as e:
+            outcome["error"] = str(e)[:200]
+        return outcome
+
+    with open(output, "a", encoding="utf-8") as sidecar, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        running = set()
+        for batch in batches:
+            running.add(pool.submit(attempt, batch))
+            # Keep a few batches queued per worker, so a huge directory is never read at once
+            if len(running) >= 2 * concurrency:
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                _record(finished, sidecar, stats)
+        _record(running, sidecar, stats)
+
+    seconds = time.perf_counter() - start
+    stats["seconds"] = round(seconds, 2)
+    stats["notes_per_minute"] = round(stats["categorized"] / seconds * 60, 1) if seconds else 0.0
+    stats["output"] = output
+    return stats
+
+
+def _record(futures, sidecar, stats: dict):
+    """Append the results of finished batches to the sidecar (flushed, so they survive a crash)."""
+    for future in wait(futures)[0]:
+        outcome = future.result()
+        records, missing = outcome["records"], outcome["missing"]
+        if records:
+            sidecar.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+            sidecar.flush()
+            os.fsync(sidecar.fileno())
+        stats["categorized"] += len(records)
+        stats["failed"] += len(missing)
+        stats["requests"] += outcome["requests"]
+        stats["retried"] += outcome["retried"]
+        if "error" in outcome:
+            stats.setdefault("errors", []).append(outcome["error"])
+        METRICS.inc("agent_batch_categorize_notes_total", len(records), outcome="categorized")
+        if missing:
+            METRICS.inc("agent_batch_categorize_notes_total", len(missing), outcome="failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("notes_dir", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "notes"))
+    parser.add_argument("--output", help="Results file (default: <notes_dir>.categories.jsonl)")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--token-budget", type=int)
+    parser.add_argument("--max-notes", type=int)
+    parser.add_argument("--force", action="store_true", help="Categorize every note again")
+    args = parser.parse_args()
+
+    stats = run(args.notes_dir, args.output, concurrency=args.concurrency, token_budget=args.token_budget,
+                max_notes=args.max_notes, force=args.force)
+    print(f"Categorized {stats['categorized']} notes with {stats['requests']} requests "
+          f"({stats['notes_per_minute']} notes/min); {stats['already_done']} already done, {stats['failed']} failed.")
+    print(f"Results: {stats['output']}")
+
+
+if __name__ == "__main__":
+    main()
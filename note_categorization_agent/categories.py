@@ -0,0 +1,10 @@
+"""
+Note categories shared by the categorization tools and the batch job.
+"""
+
+# Common note categories
+COMMON_CATEGORIES = [
+    "Work", "Personal", "Study", "Meeting", "Ideas", "Research", 
+    "Shopping", "Travel", "Health", "Finance", "Project", "Journal",
+    "Recipe", "Book Notes", "Code", "Documentation", "Reminder", "Other"
+]
@@ -0,0 +1,483 @@
+"""
+A local note categorizer trained on gemini-2.5-flash's own answers.
+
+Most notes fall cleanly into one of COMMON_CATEGORIES, and once a few hundred
+of them have been categorized by the model, the category is predictable from
+the words alone. ``CategoryModel`` is a nearest-centroid classifier over
+hashed TF-IDF features:
+
+- a note becomes a sparse vector of ``FEATURE_DIM`` hashed word buckets,
+  weighted by 1 + log(tf) and L2-normalized
+- every category keeps the sum of its notes' vectors and a count, so
+  learning one more note (or a whole batch of them) is an in-place addition:
+  the model is trained incrementally and never needs the old notes again
+- for prediction the sums are weighted by IDF and normalized into one
+  prototype per category; the cosine similarity to every prototype is a
+  gather and a dot product over the note's nonzero features, and a softmax
+  over the similarities is the confidence
+
+Tags are the note's words with the highest TF-IDF weight, preferring words
+the model already used as tags for the predicted category.
+
+``categorize_note`` answers locally when the prediction is confident and asks
+gemini-2.5-flash otherwise. Every answer from gemini-2.5-flash is learned,
+and a small share of confident predictions is sent to gemini-2.5-flash as
+well, so the agreement between the two is measured all the time
+(``stats()``).
+
+Models are saved as numbered versions (``v00001.npz``, ...) in
+CATEGORY_MODEL_DIR. Loading picks the newest version unless one is given,
+and versions older than the last CATEGORY_MODEL_KEEP_VERSIONS are removed.
+train_category_model.py trains the model from batch_categorize.py's results.
+
+Configuration (read from the environment / .env file):
+    CATEGORY_MODEL_DIR=<repo>/.cache/category_model   Where the model versions are kept
+    CATEGORY_MODEL_MIN_CONFIDENCE=0.6   Below this, categorize_note asks gemini-2.5-flash
+    CATEGORY_MODEL_MIN_EXAMPLES=200     Notes learned before the model answers at all
+    CATEGORY_MODEL_AUDIT_RATE=0.02      Share of confident predictions also sent to gemini-2.5-flash
+    CATEGORY_MODEL_SAVE_EVERY=50        Notes learned by categorize_note between saves
+    CATEGORY_MODEL_KEEP_VERSIONS=3      Model versions kept on disk
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from itertools import repeat
+
+import numpy as np
+
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.bm25 import tokenize
+from agent_common.tracing import METRICS
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "category_model")
+
+CATEGORY_MODEL_DIR = os.getenv("CATEGORY_MODEL_DIR") or DEFAULT_DIR
+CATEGORY_MODEL_MIN_CONFIDENCE = float(os.getenv("CATEGORY_MODEL_MIN_CONFIDENCE", "0.6"))
+CATEGORY_MODEL_MIN_EXAMPLES = int(os.getenv("CATEGORY_MODEL_MIN_EXAMPLES", "200"))
+CATEGORY_MODEL_AUDIT_RATE = float(os.getenv("CATEGORY_MODEL_AUDIT_RATE", "0.02"))
+CATEGORY_MODEL_SAVE_EVERY = int(os.getenv("CATEGORY_MODEL_SAVE_EVERY", "50"))
+CATEGORY_MODEL_KEEP_VERSIONS = int(os.getenv("CATEGORY_MODEL_KEEP_VERSIONS", "3"))
+
+# Hashed word buckets per note vector
+FEATURE_DIM = 1 << 15
+
+# Only the start of a note is used, like batch_categorize.py sends to the model
+NOTE_CHARS = 3000
+
+# Softmax sharpness over the cosine similarities (higher = more decisive confidences)
+SHARPNESS = 50.0
+
+# Share of the confidence a runner-up category needs to be listed as secondary
+SECONDARY_MIN_SHARE = 0.2
+
+TAG_COUNT = 5
+MIN_TAG_LENGTH = 3
+# Tags remembered per category when the model is saved
+TAGS_PER_CATEGORY = 200
+
+# Agreement with gemini-2.5-flash is counted per confidence bucket of 0.1
+CONFIDENCE_BUCKETS = 10
+
+VERSION_PATTERN = re.compile(r"^v(\d+)\.npz$")
+
+METRICS.describe("agent_category_model_total", "categorize_note calls, by who answered (local, deferred, audited, "
+                                               "untrained)")
+METRICS.describe("agent_category_model_agreement_total", "Local predictions compared with gemini-2.5-flash, "
+                                                         "by whether they agreed")
+
+
+@dataclass(frozen=True)
+class Prediction:
+    """A local categorization and its confidence (0..1)."""
+
+    primary: str
+    secondary: tuple
+    tags: tuple
+    confidence: float
+
+    def format(self) -> str:
+        return format_categorization(self.primary, self.secondary, self.tags)
+
+
+def format_categorization(primary: str, secondary, tags) -> str:
+    """The reply format categorize_note asks gemini-2.5-flash for."""
+    return (f"Primary Category: {primary}\n"
+            f"Secondary Categories: {', '.join(secondary) if secondary else 'None'}\n"
+            f"Tags: {', '.join(tags)}")
+
+
+def _field(text: str, label: str):
+    match = re.search(rf"{label}\s*:\**\s*(.+)", text, re.IGNORECASE)
+    if match is None:
+        return None
+    value = match.group(1).strip().strip("*[]").strip()
+    return None if value.lower() in ("", "none", "n/a") else value
+
+
+def parse_categorization(text: str):
+    """(primary, secondary, tags) from a categorize_note reply, or None without a primary category."""
+    primary = _field(text, "Primary Category")
+    if primary is None:
+        return None
+    secondary = [c.strip() for c in (_field(text, "Secondary Categories") or "").split(",") if c.strip()]
+    tags = [t.strip().strip("#") for t in (_field(text, "Tags") or "").split(",") if t.strip().strip("#")]
+    return primary, secondary[:2], tags
+
+
+def versions(directory: str = None) -> list:
+    """Version numbers saved in ``directory``, oldest first."""
+    directory = directory or CATEGORY_MODEL_DIR
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(VERSION_PATTERN.match, names) if match)
+
+
+def summarize_agreement(counts) -> dict:
+    """Rates from the [notes, agreed, answered, answered and agreed] counts of CategoryModel.compare."""
+    notes, agreed, answered, answered_agreed = (int(count) for count in counts)
+    return {
+        "notes": notes,
+        "agreement": round(agreed / notes, 4) if notes else None,
+        "answered_locally": round(answered / notes, 4) if notes else None,
+        "agreement_when_answered": round(answered_agreed / answered, 4) if answered else None,
+    }
+
+
+class CategoryModel:
+    """
+    Nearest-centroid note categorizer over hashed TF-IDF features.
+
+    Args:
+        directory: Where versions are saved (defaults to CATEGORY_MODEL_DIR)
+        dim: Hashed feature buckets
+        min_confidence: Confidence a prediction needs for ``answers``
+        min_examples: Notes learned before ``answers`` returns True at all
+        audit_rate: Share of confident predictions ``answers`` still sends to the model
+    """
+
+    def __init__(self, directory: str = None, dim: int = FEATURE_DIM,
+                 min_confidence: float = CATEGORY_MODEL_MIN_CONFIDENCE,
+                 min_examples: int = CATEGORY_MODEL_MIN_EXAMPLES, audit_rate: float = CATEGORY_MODEL_AUDIT_RATE):
+        self.directory = directory or CATEGORY_MODEL_DIR
+        self.dim = dim
+        self.min_confidence = min_confidence
+        self.min_examples = min_examples
+        self.audit_rate = audit_rate
+        self.version = 0
+        self.categories = []
+        self.sums = np.zeros((0, dim), dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.document_frequency = np.zeros(dim, dtype=np.float32)
+        self.examples = 0
+        self.tags = {}
+        # Training file -> bytes of it already learned (see train_category_model.py)
+        self.sources = {}
+        self.evaluation = {}
+        # [confidence bucket] -> (agreed, compared)
+        self.agreement = np.zeros((CONFIDENCE_BUCKETS, 2), dtype=np.int64)
+        self.outcomes = Counter()
+        self._folded = {}
+        self._buckets = {}
+        self._prototypes = None
+        self._idf = None
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    # Features
+
+    def _bucket(self, word: str) -> int:
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            bucket = zlib.crc32(word.encode("utf-8")) % self.dim
+            if len(self._buckets) < 500000:
+                self._buckets[word] = bucket
+        return bucket
+
+    def _vector(self, text: str):
+        """
+        Features of a note: (bucket indices, unit-length 1 + log(tf) weights, words).
+
+        ``words`` is (distinct words, their buckets, their weights), used to pick tags.
+        """
+        counts = Counter(tokenize(text[:NOTE_CHARS]))
+        terms = list(counts)
+        buckets = list(map(self._buckets.get, terms))
+        if None in buckets:
+            buckets = [self._bucket(term) if bucket is None else bucket for term, bucket in zip(terms, buckets)]
+        buckets = np.array(buckets, dtype=np.intp)
+        weights = 1.0 + np.log(np.array(list(counts.values()), dtype=np.float32))
+        # Words sharing a bucket add up
+        indices, inverse = np.unique(buckets, return_inverse=True)
+        values = np.bincount(inverse, weights, minlength=len(indices)).astype(np.float32)
+        norm = float(np.linalg.norm(values))
+        return indices, values / norm if norm else values, (terms, buckets, weights)
+
+    def _category(self, name: str) -> int:
+        """Row of a category, added if new; names are matched case-insensitively (caller holds the lock)."""
+        folded = name.strip().casefold()
+        row = self._folded.get(folded)
+        if row is None:
+            row = len(self.categories)
+            self.categories.append(name.strip())
+            self._folded[folded] = row
+            self.sums = np.vstack([self.sums, np.zeros((1, self.dim), dtype=np.float32)])
+            self.counts = np.append(self.counts, 0)
+            self.tags.setdefault(name.strip(), Counter())
+        return row
+
+    # Training
+
+    def learn(self, text: str, primary: str, tags=()):
+        """Add one categorized note to the model."""
+        self.learn_many([(text, primary, tags)])
+
+    def learn_many(self, examples):
+        """Add (text, primary category, tags) examples to the model in one vectorized update."""
+        vectors = [(self._vector(text), primary, tags) for text, primary, tags in examples]
+        if not vectors:
+            return
+        with self._lock:
+            rows = np.empty(len(vectors), dtype=np.intp)
+            for position, (_, primary, tags) in enumerate(vectors):
+                rows[position] = self._category(primary)
+                self.tags[self.categories[rows[position]]].update(
+                    tag.casefold() for tag in tags if len(tag) >= MIN_TAG_LENGTH)
+            indices = np.concatenate([vector[0] for vector, _, _ in vectors])
+            values = np.concatenate([vector[1] for vector, _, _ in vectors])
+            lengths = [len(vector[0]) for vector, _, _ in vectors]
+            np.add.at(self.sums, (np.repeat(rows, lengths), indices), values)
+            np.add.at(self.counts, rows, 1)
+            np.add.at(self.document_frequency, indices, 1)
+            self.examples += len(vectors)
+            self._unsaved += len(vectors)
+            self._prototypes = None
+
+    def _refresh(self):
+        """IDF weights and the (dim, categories) prototype matrix (caller holds the lock)."""
+        if self._prototypes is None:
+            self._idf = (np.log((1 + self.examples) / (1 + self.document_frequency)) + 1).astype(np.float32)
+            # Centroids relative to the average note, so words every category uses cancel out
+            means = self.sums / np.maximum(self.counts, 1)[:, None]
+            prototypes = (means - self.sums.sum(axis=0) / max(self.examples, 1)) * self._idf
+            norms = np.linalg.norm(prototypes, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._prototypes = np.ascontiguousarray((prototypes / norms).T, dtype=np.float32)
+        return self._prototypes, self._idf
+
+    # Prediction
+
+    def predict(self, text: str):
+        """Prediction for a note, or None when the model has not learned anything yet."""
+        return self.predict_many([text])[0]
+
+    def predict_many(self, texts: list) -> list:
+        """Predictions for a batch of notes, scored with one matrix product (None for empty notes)."""
+        vectors = [self._vector(text) for text in texts]
+        with self._lock:
+            if not self.categories:
+                return [None] * len(texts)
+            prototypes, idf = self._refresh()
+            present = [position for position, vector in enumerate(vectors) if len(vector[0])]
+            if not present:
+                return [None] * len(texts)
+            indices = np.concatenate([vectors[position][0] for position in present])
+            weights = np.concatenate([vectors[position][1] for position in present]) * idf[indices]
+            starts = np.cumsum([0] + [len(vectors[position][0]) for position in present[:-1]])
+            norms = np.sqrt(np.add.reduceat(weights * weights, starts))
+            norms[norms == 0] = 1.0
+            # Cosine similarity of every note to every category prototype
+            scores = np.add.reduceat(prototypes[indices] * weights[:, None], starts, axis=0) / norms[:, None]
+            scores = scores * SHARPNESS
+            scores -= scores.max(axis=1, keepdims=True)
+            probabilities = np.exp(scores)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            predictions = [None] * len(texts)
+            for row, position in enumerate(present):
+                ranked = np.argsort(probabilities[row])[::-1][:3]
+                top = float(probabilities[row, ranked[0]])
+                primary = self.categories[ranked[0]]
+                secondary = tuple(self.categories[c] for c in ranked[1:]
+                                  if probabilities[row, c] >= SECONDARY_MIN_SHARE * top)
+                tags = self._suggest_tags(vectors[position][2], primary, idf)
+                predictions[position] = Prediction(primary, secondary, tags, round(top, 4))
+        return predictions
+
+    def _suggest_tags(self, words, category: str, idf: np.ndarray) -> tuple:
+        """The note's highest TF-IDF words, boosted when they were tags of the category before."""
+        terms, buckets, weights = words
+        known = np.array(list(map(self.tags.get(category, {}).get, terms, repeat(0))), dtype=np.float32)
+        scores = weights * idf[buckets] * np.where(known > 0, 2.0 + np.log(np.maximum(known, 1)), 1.0)
+        tags = []
+        for i in np.argsort(-scores):
+            if len(terms[i]) >= MIN_TAG_LENGTH and not terms[i].isdigit():
+                tags.append(terms[i])
+                if len(tags) == TAG_COUNT:
+                    break
+        return tuple(tags)
+
+    # categorize_note integration
+
+    def answers(self, prediction) -> bool:
+        """
+        Whether categorize_note should use the prediction instead of asking the model.
+
+        Confident predictions of a trained model are used, except for the
+        ``audit_rate`` share that is checked against the model.
+        """
+        if prediction is None or self.examples < self.min_examples:
+            outcome = "untrained"
+        elif prediction.confidence < self.min_confidence:
+            outcome = "deferred"
+        elif random.random() < self.audit_rate:
+            outcome = "audited"
+        else:
+            outcome = "local"
+        with self._lock:
+            self.outcomes[outcome] += 1
+        METRICS.inc("agent_category_model_total", outcome=outcome)
+        return outcome == "local"
+
+    def observe(self, text: str, reply: str, prediction=None) -> bool:
+        """
+        Learn from a categorize_note reply of the model and compare it with the local prediction.
+
+        Saves a new version every CATEGORY_MODEL_SAVE_EVERY learned notes.
+        Returns False when the reply could not be parsed.
+        """
+        parsed = parse_categorization(reply)
+        if parsed is None:
+            return False
+        primary, _, tags = parsed
+        if prediction is not None:
+            self.record_agreement(prediction, primary)
+        self.learn(text, primary, tags)
+        if self._unsaved >= CATEGORY_MODEL_SAVE_EVERY:
+            self.save()
+        return True
+
+    def record_agreement(self, prediction, primary: str) -> bool:
+        """Count whether the local prediction matches the model's primary category."""
+        agreed = prediction.primary.casefold() == primary.strip().casefold()
+        bucket = min(int(prediction.confidence * CONFIDENCE_BUCKETS), CONFIDENCE_BUCKETS - 1)
+        with self._lock:
+            self.agreement[bucket] += (int(agreed), 1)
+        METRICS.inc("agent_category_model_agreement_total", agreed=str(agreed).lower())
+        return agreed
+
+    def compare(self, examples, min_confidence: float = None) -> np.ndarray:
+        """
+        Compare the model's predictions with known (text, primary) labels.
+
+        Returns the counts [notes, agreed, answered, answered and agreed], where
+        answered notes are those with a confidence of at least ``min_confidence``
+        (the ones categorize_note would not send to the model).
+        """
+        min_confidence = self.min_confidence if min_confidence is None else min_confidence
+        examples = list(examples)
+        counts = np.zeros(4, dtype=np.int64)
+        for prediction, (_, primary) in zip(self.predict_many([text for text, _ in examples]), examples):
+            agreed = prediction is not None and prediction.primary.casefold() == primary.strip().casefold()
+            answered = prediction is not None and prediction.confidence >= min_confidence
+            counts += (1, agreed, answered, answered and agreed)
+        return counts
+
+    def evaluate(self, examples, min_confidence: float = None) -> dict:
+        """Agreement with known (text, primary) labels, overall and on the notes the model would answer."""
+        return summarize_agreement(self.compare(examples, min_confidence))
+
+    # Persistence
+
+    def save(self, directory: str = None) -> str:
+        """Write the model as the next version in ``directory``; returns the file path."""
+        directory = directory or self.directory
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            version = max([self.version] + versions(directory)) + 1
+            meta = {
+                "version": version,
+                "created": time.time(),
+                "dim": self.dim,
+                "categories": self.categories,
+                "examples": self.examples,
+                "tags": {category: counter.most_common(TAGS_PER_CATEGORY) for category, counter in self.tags.items()},
+                "sources": self.sources,
+                "evaluation": self.evaluation,
+            }
+            arrays = {"sums": self.sums.copy(), "counts": self.counts.copy(),
+                      "document_frequency": self.document_frequency.copy(), "agreement": self.agreement.copy()}
+            self.version = version
+            self._unsaved = 0
+        path = os.path.join(directory, f"v{version:05d}.npz")
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(temporary, path)
+        for old in versions(directory)[:-CATEGORY_MODEL_KEEP_VERSIONS]:
+            try:
+                os.remove(os.path.join(directory, f"v{old:05d}.npz"))
+            except FileNotFoundError:
+                pass
+        return path
+
+    @classmethod
+    def load(cls, directory: str = None, version: int = None, **settings):
+        """
+        The saved model of ``version`` (default: the newest) from ``directory``.
+
+        Returns an empty model when nothing has been saved yet; ``settings``
+        are passed on to the constructor.
+        """
+        directory = directory or CATEGORY_MODEL_DIR
+        available = versions(directory)
+        if version is None and not available:
+            return cls(directory, **settings)
+        version = available[-1] if version is None else version
+        with np.load(os.path.join(directory, f"v{version:05d}.npz")) as data:
+            meta = json.loads(str(data["meta"]))
+            model = cls(directory, dim=meta["dim"], **settings)
+            model.sums = data["sums"]
+            model.counts = data["counts"]
+            model.document_frequency = data["document_frequency"]
+            model.agreement = data["agreement"]
+        model.version = meta["version"]
+        model.categories = meta["categories"]
+        model.examples = meta["examples"]
+        model.tags = {category: Counter(dict(tags)) for category, tags in meta["tags"].items()}
+        model.sources = meta["sources"]
+        model.evaluation = meta["evaluation"]
+        model._folded = {name.casefold(): row for row, name in enumerate(model.categories)}
+        return model
+
+    def stats(self) -> dict:
+        """Model size, who answered categorize_note calls, and agreement with gemini-2.5-flash."""
+        with self._lock:
+            agreement = self.agreement.copy()
+            outcomes = dict(self.outcomes)
+            examples = self.examples
+            per_category = dict(zip(self.categories, self.counts.tolist()))
+        confident = agreement[int(self.min_confidence * CONFIDENCE_BUCKETS):]
+        answered = sum(outcomes.values())
+        return {
+            "version": self.version,
+            "examples": examples,
+            "categories": per_category,
+            "calls": answered,
+            "outcomes": outcomes,
+            "local_rate": round(outcomes.get("local", 0) / answered, 4) if answered else 0.0,
+            "compared": int(agreement[:, 1].sum()),
+            "agreement": round(agreement[:, 0].sum() / agreement[:, 1].sum(), 4) if agreement[:, 1].sum() else None,
+            "agreement_when_confident": (round(confident[:, 0].sum() / confident[:, 1].sum(), 4)
+                                         if confident[:, 1].sum() else None),
+            "evaluation": self.evaluation,
+        }
@@ -0,0 +1,375 @@
+"""
+Local entity extraction for extract_key_entities.
+
+Many entities in notes follow obvious patterns: "January 15, 2024",
+"Participants: John Smith, Sarah Johnson", "Acme Corp". ``EntityExtractor``
+finds those without a model request:
+
+- Dates: one compiled regex for written and numeric dates, weekdays,
+  relative dates ("next week", "end of the quarter"), quarters and times
+- People: names listed after labels like "Participants:" or "Attendees:",
+  names with an honorific ("Dr. Chen"), names after "with" / "by" / "cc",
+  and people the model named before
+- Places and organizations: a gazetteer of known names, matched with a
+  token trie (longest match wins), plus company-style names ("Acme Corp",
+  "University of Oslo", "TechCorp"). Acronyms only match in capitals ("WHO",
+  not "Who"), and names that are also common words ("Apple", "Target") are
+  skipped at the start of a sentence and are only low-confidence elsewhere
+- Topics: "Topics:" / "Key topics:" / "Subject:" lines
+
+The gazetteer starts from the names in this module, is extended from
+ENTITY_GAZETTEER_PATH (a "Type<TAB>Name" line per entry, editable by hand),
+and learns the people, places and organizations the model returns in hybrid
+mode by appending them to that file.
+
+ENTITY_EXTRACTION_MODE selects how extract_key_entities works:
+
+- ``hybrid`` (default): local entities first, then the model is asked only
+  for the types the local pass found nothing certain for (the residual), with
+  the entities already found in the prompt; its answer replaces the
+  low-confidence matches of those types. No request when nothing is missing.
+- ``local``: local entities only, never a model request
+- ``llm``: the previous behavior, one model request for everything
+
+Configuration (read from the environment / .env file):
+    ENTITY_EXTRACTION_MODE=hybrid    "hybrid", "local" or "llm"
+    ENTITY_GAZETTEER_PATH=<repo>/.cache/entity_gazetteer.tsv   Extra and learned names (empty = in memory only)
+    ENTITY_LEARN=true                Add the model's people, places and organizations to the gazetteer
+"""
+
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.tracing import METRICS
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache",
+                                      "entity_gazetteer.tsv")
+
+ENTITY_EXTRACTION_MODE = os.getenv("ENTITY_EXTRACTION_MODE", "hybrid")
+ENTITY_GAZETTEER_PATH = os.getenv("ENTITY_GAZETTEER_PATH", DEFAULT_GAZETTEER_PATH)
+ENTITY_LEARN = os.getenv("ENTITY_LEARN", "true").lower() == "true"
+
+# Output types of extract_key_entities, in its output order
+TYPES = ("People", "Places", "Organizations", "Dates", "Topics")
+
+# Longest name (in words) learned from the model
+MAX_NAME_WORDS = 5
+
+METRICS.describe("agent_entity_extraction_total", "extract_key_entities calls, by mode and whether the model "
+                                                  "was asked")
+METRICS.describe("agent_entity_local_total", "Entities found without the model, by type")
+
+PLACES = """
+Amsterdam|Athens|Austin|Bangalore|Bangkok|Barcelona|Beijing|Berlin|Boston|Brussels|Budapest|Buenos Aires|Cairo
+|Cape Town|Chicago|Copenhagen|Dallas|Delhi|Denver|Dubai|Dublin|Edinburgh|Frankfurt|Geneva|Hamburg|Helsinki
+|Hong Kong|Istanbul|Jakarta|Lagos|Las Vegas|Lisbon|London|Los Angeles|Madrid|Manchester|Melbourne|Mexico City
+|Miami|Milan|Montreal|Moscow|Mumbai|Munich|Nairobi|New Delhi|New York|Osaka|Oslo|Paris|Prague|Rome|San Diego
+|San Francisco|Santiago|Seattle|Seoul|Shanghai|Singapore|Stockholm|Sydney|Tokyo|Toronto|Vancouver|Vienna
+|Warsaw|Washington|Zurich|Silicon Valley
+|Argentina|Australia|Austria|Belgium|Brazil|Canada|Chile|China|Denmark|Egypt|Finland|France|Germany|Greece
+|India|Indonesia|Ireland|Israel|Italy|Japan|Kenya|Mexico|Netherlands|New Zealand|Nigeria|Norway|Poland
+|Portugal|Russia|Saudi Arabia|South Africa|South Korea|Spain|Sweden|Switzerland|Thailand|Turkey|Ukraine
+|United Kingdom|United States|USA|UK|Vietnam|Europe|Asia|Africa|North America|South America
+|California|Texas|Florida|Ontario|Bavaria
+"""
+
+ORGANIZATIONS = """
+Google|Alphabet|Microsoft|Apple|Amazon|Meta|Facebook|Netflix|Nvidia|Intel|AMD|IBM|Oracle|Salesforce|Adobe
+|OpenAI|Anthropic|DeepMind|Hugging Face|LangChain|GitHub|GitLab|Atlassian|Slack|Zoom|Spotify|Uber|Airbnb
+|Tesla|SpaceX|Samsung|Sony|Siemens|SAP|Stripe|PayPal|Shopify|Twitter|LinkedIn|Dropbox|Notion|Figma
+|Accenture|Deloitte|McKinsey|Goldman Sachs|JPMorgan|Morgan Stanley|Visa|Mastercard|Walmart|Target|IKEA
+|Toyota|Volkswagen|BMW|Mercedes-Benz|Boeing|Airbus|Pfizer|Moderna|Coca-Cola|PepsiCo|Nike|Adidas
+|United Nations|UN|NASA|WHO|World Health Organization|European Union|EU|World Bank|IMF|FDA|MIT|Stanford
+|Harvard|Oxford|Cambridge|Red Cross|UNICEF
+"""
+
+# One-word names that are also ordinary English words: not matched at the start of a sentence
+# (where every word is capitalized) and only low-confidence elsewhere
+COMMON_WORDS = frozenset("""
+apple amazon meta oracle slack zoom target notion visa stripe adobe nike sony shell square
+turkey china chile jordan georgia reading nice mobile
+""".split())
+
+MONTH = (r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|June?|July?|Aug(?:ust)?"
+         r"|Sep(?:t(?:ember)?)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)\.?")
+WEEKDAY = r"(?:Mon|Tues|Wednes|Thurs|Fri|Satur|Sun)day"
+DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+
+# Alternatives are tried in order at each position, so longer forms come first; the lookahead
+# skips words that cannot start a date before any alternative is tried
+DATE_PATTERN = re.compile(r"\b(?=\d|q[1-4]|jan|feb|ma[ry]|apr|ju[nl]|aug|sep|oct|nov|dec|mon|tue|wed|thu|fri|sat|sun"
+                          r"|next|last|this|end|start|beg|tod|tom|yes|ton)(?:" + "|".join([
+    rf"(?:{WEEKDAY},?\s+)?{MONTH}\s+{DAY}(?:,?\s+\d{{4}})?",    # (Monday,) January 15(th)(, 2024)
+    rf"(?:{WEEKDAY},?\s+)?{DAY}\s+(?:of\s+)?{MONTH}(?:,?\s+\d{{4}})?",   # 15(th) (of) January (2024)
+    rf"{MONTH}\s+\d{{4}}",                                       # January 2024
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?",         # 2024-01-15(T10:30)
+    r"\d{1,2}[/.]\d{1,2}[/.]\d{2,4}",                            # 01/15/2024, 15.01.24
+    rf"(?:(?:next|last|this)\s+)?{WEEKDAY}",                     # (next) Monday
+    r"(?:(?:next|last|this)\s+(?:week|month|quarter|year))",
+    r"(?:end|start|beginning)\s+of\s+(?:the\s+)?(?:day|week|month|quarter|year)",
+    r"(?:today|tomorrow|yesterday|tonight)",
+    r"Q[1-4](?:\s+\d{4})?",                                      # Q3 (2024)
+    r"\d{1,2}(?::\d{2})?\s*(?:[ap]\.?m\.?)(?![a-z])",            # 3pm, 10:30 a.m.
+    r"\d{1,2}:\d{2}",                                            # 14:30
+]) + r")\b", re.IGNORECASE)
+
+NAME = r"[A-ZÀ-ÖØ-Þ][a-zß-öø-ÿ]+(?:[-'][A-ZÀ-ÖØ-Þ]?[a-zß-öø-ÿ]+)?"
+# Parts of a name are separated by spaces or tabs only: a line break ends the name
+FULL_NAME = rf"{NAME}(?:[ \t]+(?:[A-Z]\.[ \t]*)?{NAME}){{0,2}}"
+PERSON_LABELS = re.compile(
+    r"^[ \t>*-]*(?:participants|attendees|present|invitees|people|speakers?|owners?|assignees?|authors?|"
+    r"organizers?|hosts?|with|from|to|cc)\s*:\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+HONORIFIC = re.compile(rf"\b(?:Mr|Mrs|Ms|Mx|Dr|Prof)\.?[ \t]+({NAME}(?:[ \t]+{NAME})?)")
+# Two capitalized words after a word that usually precedes a person, or before one that usually follows
+PERSON_CONTEXT = re.compile(rf"\b(?:with|by|cc|ask|asked|told|call|called|email|emailed|ping|thanks)\s+"
+                            rf"({NAME}[ \t]+{NAME})\b")
+PERSON_SUBJECT = re.compile(rf"\b({NAME}[ \t]+{NAME})\s+(?:will|would|said|says|asked|is|was|has|had|wants|needs|"
+                            rf"sent|shared|mentioned|agreed|suggested|joined|owns|leads)\b")
+ORG_SUFFIX = re.compile(
+    r"\b((?:[A-Z][\w&'-]*\s+){0,3}[A-Z][\w&'-]*\s+(?:Inc|Corp|Corporation|LLC|Ltd|GmbH|AG|Co|Company|Group|"
+    r"Labs|Foundation|University|Institute|College|Bank|Agency|Association|Ministry|Council|Hospital)\b\.?)"
+    r"|\b((?:University|Institute|Bank|Ministry|Department)\s+of\s+(?:[A-Z]\w+\s+)*[A-Z]\w+)"
+    r"|\b([A-Z][a-z]+(?:Corp|Tech|Soft|Labs|Works|Systems|Bank))\b")
+TOPIC_LABELS = re.compile(r"^[ \t>*-]*(?:key\s+)?(?:topics?|subjects?|re|agenda)\s*:\s*(.+)$",
+                          re.IGNORECASE | re.MULTILINE)
+# Words that make a labelled item a group rather than a person ("To: Team", "Cc: Sales Team")
+PERSON_STOP_WORDS = frozenset("""
+team teams all everyone everybody staff group groups department management leadership board committee
+marketing sales engineering product design finance legal support operations ops hr it admin
+customers customer clients client partners partner users others me us you them none tbd
+""".split())
+LIST_SEPARATOR = re.compile(r"\s*(?:,|;|\band\b|&)\s*")
+TOKEN_PATTERN = re.compile(r"\w+(?:['’-]\w+)*")
+# Punctuation between two words that makes the second one start a sentence (or a line)
+SENTENCE_BREAK = re.compile(r"[.!?:;\n]")
+
+
+@dataclass
+class Entities:
+    """
+    Entities of a note, one list per type of TYPES (in order of appearance, without duplicates).
+
+    ``uncertain`` holds the (type, casefolded value) of low-confidence entities,
+    which do not count as found for ``missing()``.
+    """
+
+    people: list = field(default_factory=list)
+    places: list = field(default_factory=list)
+    organizations: list = field(default_factory=list)
+    dates: list = field(default_factory=list)
+    topics: list = field(default_factory=list)
+    uncertain: set = field(default_factory=set)
+
+    def get(self, kind: str) -> list:
+        return getattr(self, kind.lower())
+
+    def add(self, kind: str, value: str, uncertain: bool = False):
+        value = value.strip().strip(".,;:\"'()[]").strip()
+        values = self.get(kind)
+        if not value:
+            return
+        key = (kind, value.casefold())
+        if value.casefold() not in (v.casefold() for v in values):
+            values.append(value)
+            if uncertain:
+                self.uncertain.add(key)
+        elif not uncertain:
+            # Found again with confidence
+            self.uncertain.discard(key)
+
+    def merge(self, other, kinds=TYPES):
+        """Add the entities of ``other`` of the given types."""
+        for kind in kinds:
+            for value in other.get(kind):
+                self.add(kind, value)
+        return self
+
+    def replace(self, other, kinds):
+        """Replace the entities of the given types with those of ``other``."""
+        for kind in kinds:
+            self.get(kind).clear()
+            self.uncertain = {key for key in self.uncertain if key[0] != kind}
+        return self.merge(other, kinds)
+
+    def missing(self) -> list:
+        """Types without any entity found with confidence."""
+        return [kind for kind in TYPES
+                if all((kind, value.casefold()) in self.uncertain for value in self.get(kind))]
+
+    def format(self) -> str:
+        """The reply format extract_key_entities asks the model for."""
+        return "\n".join(f"{kind}: {', '.join(self.get(kind)) or 'None'}" for kind in TYPES)
+
+
+def parse_entities(text: str) -> Entities:
+    """Entities from a model reply in the "Type: a, b" format (other lines are ignored)."""
+    entities = Entities()
+    for kind in TYPES:
+        match = re.search(rf"^[ \t*-]*{kind}\**\s*:\**\s*(.*)$", text, re.IGNORECASE | re.MULTILINE)
+        if match is None:
+            continue
+        value = match.group(1).strip().strip("[]")
+        if value.lower() in ("", "none", "n/a", "[none]"):
+            continue
+        items = []
+        for item in value.split(","):
+            # "January 15, 2024" is one date, not two
+            if items and re.fullmatch(r"\s*\d{4}\s*", item):
+                items[-1] += "," + item
+            else:
+                items.append(item)
+        for item in items:
+            entities.add(kind, item)
+    return entities
+
+
+class Gazetteer:
+    """
+    Known names by type, matched in text with a token trie.
+
+    Names are matched case-insensitively on word boundaries, but a match
+    must start with a capital letter or a digit, so "reading" is not Reading.
+    Acronyms (names in capitals) must match exactly, so "Who" is not WHO, and
+    one-word names in COMMON_WORDS are skipped at the start of a sentence.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self.size = 0
+
+    @staticmethod
+    def _tokens(name: str) -> list:
+        return [token.casefold() for token in TOKEN_PATTERN.findall(name)]
+
+    def add(self, kind: str, name: str) -> bool:
+        """Add a name; returns False if it was known already (as any type)."""
+        tokens = self._tokens(name)
+        if not tokens:
+            return False
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if None in node:
+            return False
+        node[None] = (kind, name.strip())
+        self.size += 1
+        return True
+
+    def lookup(self, name: str):
+        """(type, name as added) of a known name, or None."""
+        node = self._root
+        for token in self._tokens(name):
+            node = node.get(token)
+            if node is None:
+                return None
+        return node.get(None)
+
+    @staticmethod
+    def ambiguous(name: str) -> bool:
+        """Whether a name is also a common word, so a match may not be the name at all."""
+        return name.casefold() in COMMON_WORDS
+
+    @staticmethod
+    def _accept(name: str, matched: list, sentence_start: bool) -> bool:
+        if name.isupper() and len(name) > 1:
+            return matched == TOKEN_PATTERN.findall(name)
+        return not (sentence_start and Gazetteer.ambiguous(name))
+
+    def find(self, text: str):
+        """
+        Yield (type, name, ambiguous) of every known name in the text, longest match first at each position.
+
+        ``ambiguous`` is True for names that are also common words.
+        """
+        matches = list(TOKEN_PATTERN.finditer(text))
+        folded = [match.group().casefold() for match in matches]
+        position = 0
+        while position < len(matches):
+            first = matches[position].group()
+            node = self._root.get(folded[position]) if first[0].isupper() or first[0].isdigit() else None
+            found, length, step = None, 0, position
+            sentence_start = position == 0 or bool(
+                SENTENCE_BREAK.search(text, matches[position - 1].end(), matches[position].start()))
+            while node is not None:
+                if None in node:
+                    matched = [match.group() for match in matches[position:step + 1]]
+                    if self._accept(node[None][1], matched, sentence_start):
+                        found, length = node[None], step - position + 1
+                step += 1
+                node = node.get(folded[step]) if step < len(matches) else None
+            if found is not None:
+                yield found + (self.ambiguous(found[1]),)
+                position += length
+            else:
+                position += 1
+
+
+class EntityExtractor:
+    """
+    Pattern and gazetteer based entity extraction.
+
+    Args:
+        gazetteer_path: "Type<TAB>Name" file with extra names; learned names are appended to it
+    """
+
+    def __init__(self, gazetteer_path: str = None):
+        self.gazetteer_path = ENTITY_GAZETTEER_PATH if gazetteer_path is None else gazetteer_path
+        self.gazetteer = Gazetteer()
+        for kind, names in (("Places", PLACES), ("Organizations", ORGANIZATIONS)):
+            for name in names.replace("\n", "").split("|"):
+                self.gazetteer.add(kind, name)
+        self._lock = threading.Lock()
+        if self.gazetteer_path and os.path.exists(self.gazetteer_path):
+            with open(self.gazetteer_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    kind, _, name = line.rstrip("\n").partition("\t")
+                    if kind in ("People", "Places", "Organizations") and name:
+                        self.gazetteer.add(kind, name)
+
+    def extract(self, text: str) -> Entities:
+        """Entities found without a model."""
+        entities = Entities()
+        for match in DATE_PATTERN.finditer(text):
+            entities.add("Dates", match.group())
+        for kind, name, ambiguous in self.gazetteer.find(text):
+            entities.add(kind, name, uncertain=ambiguous)
+        for match in PERSON_LABELS.finditer(text):
+            for item in LIST_SEPARATOR.split(match.group(1)):
+                item = re.sub(r"\s*\(.*?\)", "", item).strip(" .")
+                if (re.fullmatch(FULL_NAME, item) and self.gazetteer.lookup(item) is None
+                        and not PERSON_STOP_WORDS.intersection(item.casefold().split())):
+                    entities.add("People", item)
+        for pattern in (HONORIFIC, PERSON_CONTEXT, PERSON_SUBJECT):
+            for match in pattern.finditer(text):
+                if self.gazetteer.lookup(match.group(1)) is None:
+                    entities.add("People", match.group(1))
+        for match in ORG_SUFFIX.finditer(text):
+            entities.add("Organizations", next(group for group in match.groups() if group))
+        for match in TOPIC_LABELS.finditer(text):
+            for item in match.group(1).split(","):
+                entities.add("Topics", item)
+        for kind in TYPES:
+            if entities.get(kind):
+                METRICS.inc("agent_entity_local_total", len(entities.get(kind)), type=kind.lower())
+        return entities
+
+    def learn(self, entities: Entities) -> int:
+        """Add the model's people, places and organizations to the gazetteer file; returns how many were new."""
+        new = []
+        with self._lock:
+            for kind in ("People", "Places", "Organizations"):
+                for name in entities.get(kind):
+                    words = name.split()
+                    if (len(words) <= MAX_NAME_WORDS and name[0].isupper() and "\t" not in name
+                            and self.gazetteer.add(kind, name)):
+                        new.append(f"{kind}\t{name}\n")
+            if new and self.gazetteer_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.gazetteer_path)), exist_ok=True)
+                with open(self.gazetteer_path, "a", encoding="utf-8") as f:
+                    f.write("".join(new))
+        return len(new)
@@ -0,0 +1,133 @@
+"""
+Train the local category model (category_model.py) from batch_categorize.py's results.
+
+Every result line of ``<notes dir>.categories.jsonl`` is a note labelled by
+gemini-2.5-flash. Training is incremental: the model remembers how far into
+the results file it has read, so a new run only learns the lines appended
+since (by later batch runs) and saves the result as a new model version.
+
+Before a chunk of new results is learned, the current model predicts it, so
+every run reports how well the model agreed with gemini-2.5-flash on notes it
+had not seen yet. The agreement is stored with the saved version.
+
+Usage:
+    cd note_categorization_agent
+    python batch_categorize.py ../notes
+    python train_category_model.py ../notes
+    python train_category_model.py ../notes --rebuild    # start from an empty model
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables from parent directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+load_dotenv(dotenv_path=env_path)
+
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch_categorize import sidecar_path
+from category_model import NOTE_CHARS, CategoryModel, summarize_agreement
+
+# Results learned (and evaluated beforehand) at a time
+CHUNK_SIZE = 1000
+
+
+def new_results(path: str, offset: int):
+    """Complete result lines after byte ``offset`` and the offset after the last of them."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    # A line without its newline is still being written by a batch run
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, offset + end
+
+
+def _examples(notes_dir: str, records: list) -> list:
+    """(text, primary, tags) of the recorded notes that still exist."""
+    examples = []
+    for record in records:
+        try:
+            with open(os.path.join(notes_dir, record["name"]), "r", encoding="utf-8", errors="replace") as f:
+                text = f.read(NOTE_CHARS)
+        except (OSError, KeyError):
+            continue
+        if record.get("primary"):
+            examples.append((text, record["primary"], record.get("tags") or []))
+    return examples
+
+
+def train(notes_dir: str, results: str = None, model: CategoryModel = None, rebuild: bool = False) -> dict:
+    """
+    Learn the results not learned yet and save a new model version.
+
+    Args:
+        notes_dir: Directory with the notes
+        results: batch_categorize.py results file (defaults to ``<notes_dir>.categories.jsonl``)
+        model: Model to train (defaults to the newest saved version)
+        rebuild: Start from an empty model and learn every result again
+
+    Returns:
+        Notes learned and skipped, agreement on them before learning, and the saved version
+    """
+    results = os.path.abspath(results or sidecar_path(notes_dir))
+    if rebuild:
+        model = CategoryModel(model.directory if model else None)
+    model = model or CategoryModel.load()
+    start = time.perf_counter()
+    records, offset = new_results(results, model.sources.get(results, 0))
+    examples = _examples(notes_dir, records)
+    counts = np.zeros(4, dtype=np.int64)
+    for chunk in range(0, len(examples), CHUNK_SIZE):
+        batch = examples[chunk:chunk + CHUNK_SIZE]
+        if model.examples:
+            counts += model.compare([(text, primary) for text, primary, _ in batch])
+        model.learn_many(batch)
+    model.sources[results] = offset
+    if counts[0]:
+        model.evaluation = {**summarize_agreement(counts), "min_confidence": model.min_confidence}
+    path = model.save()
+    return {
+        "learned": len(examples),
+        "skipped": len(records) - len(examples),
+        "examples": model.examples,
+        "evaluation": model.evaluation if counts[0] else {},
+        "seconds": round(time.perf_counter() - start, 2),
+        "version": model.version,
+        "path": path,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("notes_dir", nargs="?",
+                        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "notes"))
+    parser.add_argument("--results", help="Results file (default: <notes_dir>.categories.jsonl)")
+    parser.add_argument("--rebuild", action="store_true", help="Start from an empty model")
+    args = parser.parse_args()
+
+    stats = train(args.notes_dir, args.results, rebuild=args.rebuild)
+    print(f"Learned {stats['learned']} notes ({stats['skipped']} missing) in {stats['seconds']}s; "
+          f"the model now knows {stats['examples']} notes.")
+    if stats["evaluation"]:
+        evaluation = stats["evaluation"]
+        print(f"Agreement with gemini-2.5-flash before learning them: {evaluation['agreement']:.1%} overall, "
+              f"{evaluation['agreement_when_answered'] or 0:.1%} on the {evaluation['answered_locally']:.1%} "
+              f"the model would answer itself.")
+    print(f"Saved version {stats['version']}: {stats['path']}")
+
+
+if __name__ == "__main__":
+    main()
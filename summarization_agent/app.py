@@ -1,6 +1,6 @@
 import os
+import sys
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -9,6 +9,13 @@ from langchain_core.messages import HumanMessage
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.tool_concurrency import bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, instrument
+
 # Get API keys from environment
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
@@ -32,7 +39,7 @@ def summarize_text(text: str, summary_type: str = "bullet") -> str:
     """
     try:
         # Initialize a separate model instance for summarization
-        summary_model = ChatGoogleGenerativeAI(
+        summary_model = create_chat_model(
             model="gemini-2.5-flash",
             temperature=0.3  # Lower temperature for more consistent summaries
         )
@@ -78,7 +85,7 @@ def summarize_text(text: str, summary_type: str = "bullet") -> str:
         return f"Error creating summary: {str(e)}"
 
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
@@ -90,9 +97,22 @@ tools = [summarize_text]
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True
+    middleware=[
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "summarization_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("Summarization Agent is ready!")
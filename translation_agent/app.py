@@ -1,6 +1,7 @@
 import os
+import re
+import sys
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -9,6 +10,16 @@ from langchain_core.messages import HumanMessage
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.cascade import SMALL_MODEL, Candidate, CascadeStage, ModelCascade, model_stage, parse_json_answer
+from agent_common.fast_path import FAST_PATH_ENABLED, FastPathRoute, FastPathRouter, fast_path_middleware
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.tool_concurrency import bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, instrument
+from language_detection import detect_language_locally
+
 # Get API keys from environment
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
@@ -32,7 +43,7 @@ def translate_text(text: str, target_language: str = "English") -> str:
     """
     try:
         # Initialize translation model
-        translation_model = ChatGoogleGenerativeAI(
+        translation_model = create_chat_model(
             model="gemini-2.5-flash",
             temperature=0.3  # Lower temperature for more accurate translations
         )
@@ -54,6 +65,41 @@ def translate_text(text: str, target_language: str = "English") -> str:
     except Exception as e:
         return f"Error translating text: {str(e)}"
 
+# Minimum confidence for accepting the local detector's answer without any model call
+LOCAL_DETECTION_CONFIDENCE = float(os.getenv("LOCAL_DETECTION_CONFIDENCE", "0.6"))
+
+def _detect_locally(text):
+    language, confidence = detect_language_locally(text)
+    return Candidate(language, confidence) if language else None
+
+def _is_language_name(value, text):
+    return isinstance(value, str) and 0 < len(value) <= 40 and re.fullmatch(r"[A-Za-z][A-Za-z ()-]*", value) is not None
+
+def _small_detection_prompt(text):
+    return f"""Identify the language of the following text.
+        Respond with JSON only: {{"language": "<language name in English>", "confidence": <0 to 1>}}
+        
+        Text:
+        {text}"""
+
+def _detection_prompt(text):
+    return f"""Identify the language of the following text. 
+        Respond with only the language name (e.g., "English", "Spanish", "French").
+        
+        Text:
+        {text}
+        
+        Language:"""
+
+# Local detector first, then the small model, and gemini-2.5-flash only when both are unsure
+language_cascade = ModelCascade("detect_language", [
+    CascadeStage("local", _detect_locally, min_confidence=LOCAL_DETECTION_CONFIDENCE),
+    model_stage(SMALL_MODEL, create_chat_model(model=SMALL_MODEL, temperature=0.1),
+                _small_detection_prompt, lambda reply: parse_json_answer(reply, "language")),
+    model_stage("gemini-2.5-flash", create_chat_model(model="gemini-2.5-flash", temperature=0.1),
+                _detection_prompt, lambda reply: Candidate(reply)),
+], validate=_is_language_name)
+
 @tool
 def detect_language(text: str) -> str:
     """
@@ -66,29 +112,34 @@ def detect_language(text: str) -> str:
         Detected language name
     """
     try:
-        detection_model = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.1
-        )
-        
-        prompt = f"""Identify the language of the following text. 
-        Respond with only the language name (e.g., "English", "Spanish", "French").
-        
-        Text:
-        {text}
-        
-        Language:"""
-        
-        response = detection_model.invoke(prompt)
-        language = response.content if hasattr(response, 'content') else str(response)
-        
+        language = language_cascade(text)
         return f"Detected language: {language.strip()}"
     
     except Exception as e:
         return f"Error detecting language: {str(e)}"
 
+def _answer_detect_language(match):
+    """Fast-path handler: call detect_language directly (it tries the local detector first)."""
+    text = match.group("text").strip().strip('"\'')
+    result = detect_language.invoke({"text": text})
+    return None if result.startswith("Error") else result
+
+# Language detection requests answered without the planner model (enable with AGENT_FAST_PATH=true)
+fast_path_router = FastPathRouter("translation_agent", [
+    FastPathRoute(
+        "detect_language",
+        r"(?:what|which)\s+language\s+is\s+(?:this|that|the\s+following)(?:\s+text)?\s*[:?-]\s*(?P<text>.+)",
+        _answer_detect_language,
+    ),
+    FastPathRoute(
+        "detect_language",
+        r"(?:detect|identify)\s+(?:the\s+)?language\s+(?:of\s+)?(?:this|the\s+following)?(?:\s+text)?\s*[:-]\s*(?P<text>.+)",
+        _answer_detect_language,
+    ),
+])
+
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
@@ -100,9 +151,22 @@ tools = [translate_text, detect_language]
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True
+    middleware=fast_path_middleware(fast_path_router) + [
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "translation_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("Translation Agent is ready!")
@@ -131,3 +195,6 @@ if __name__ == "__main__":
     else:
         print(f"\nResult: {result}")
 
+    if FAST_PATH_ENABLED:
+        print(f"\nFast path: {fast_path_router.stats()}")
+
@@ -0,0 +1,145 @@
+"""
+Local language identification without a model call.
+
+Non-Latin scripts are identified from Unicode ranges; Latin-script text is
+scored against small stop-word profiles. ``detect_language_locally`` returns
+the language and a confidence in [0, 1] so callers can fall back to Gemini
+when the text is short or ambiguous.
+
+Arabic, Cyrillic and Devanagari are written in many languages. For these the
+language is told apart by its own letters or words (Persian گ, Bulgarian ъ,
+Marathi ळ, ...); text without any such marker gets a confidence of
+SHARED_SCRIPT_CONFIDENCE, below the translation agent's default threshold, so
+it goes to the model.
+"""
+
+import re
+import unicodedata
+
+# Unicode script (first word of the character name) -> language
+SCRIPT_LANGUAGES = {
+    "DEVANAGARI": ("Hindi", 0.85),
+    "BENGALI": ("Bengali", 0.9),
+    "GURMUKHI": ("Punjabi", 0.95),
+    "GUJARATI": ("Gujarati", 0.95),
+    "TAMIL": ("Tamil", 0.95),
+    "TELUGU": ("Telugu", 0.95),
+    "KANNADA": ("Kannada", 0.95),
+    "MALAYALAM": ("Malayalam", 0.95),
+    "ORIYA": ("Odia", 0.95),
+    "THAI": ("Thai", 0.95),
+    "HANGUL": ("Korean", 0.95),
+    "HEBREW": ("Hebrew", 0.9),
+    "GREEK": ("Greek", 0.95),
+    "ARMENIAN": ("Armenian", 0.95),
+    "GEORGIAN": ("Georgian", 0.95),
+}
+
+# Scripts shared by several languages: (language, marker pattern, confidence), first match wins,
+# then the most common language of the script with SHARED_SCRIPT_CONFIDENCE
+SHARED_SCRIPT_CONFIDENCE = 0.5
+SHARED_SCRIPTS = {
+    "ARABIC": ([
+        ("Urdu", "[ٹڈڑںےۓ]", 0.85),
+        ("Persian", "[پچژگکی]", 0.8),
+        ("Arabic", "[ةى]|\\bال", 0.75),
+    ], "Arabic"),
+    "CYRILLIC": ([
+        ("Belarusian", "[ў]", 0.85),
+        ("Ukrainian", "[іїєґ]", 0.85),
+        ("Kazakh", "[әғқңөұүһ]", 0.85),
+        ("Macedonian", "[ѓќѕ]", 0.85),
+        ("Serbian", "[ђћ]", 0.85),
+        # ј, љ, њ, џ are both Serbian and Macedonian
+        (None, "[јљњџ]", 0.0),
+        ("Russian", "[ыэё]", 0.75),
+        ("Bulgarian", "ъ", 0.75),
+    ], "Russian"),
+    "DEVANAGARI": ([
+        ("Marathi", "ळ|(?<!\\S)आहे(?![^\\s।,?!])", 0.8),
+        ("Nepali", "(?<!\\S)(?:छ|छन्|छु|हुन्छ|मलाई|तपाईं|गर्छ|पर्छ)(?![^\\s।,?!])", 0.75),
+        ("Hindi", "(?<!\\S)(?:है|हैं|था|थी|का|की|के|में|नहीं)(?![^\\s।,?!])", 0.85),
+    ], "Hindi"),
+}
+SHARED_SCRIPT_MARKERS = {
+    script: ([(language, re.compile(pattern, re.IGNORECASE), confidence) for language, pattern, confidence in markers],
+             default)
+    for script, (markers, default) in SHARED_SCRIPTS.items()
+}
+
+STOPWORDS = {
+    "English": "the and is are was were to of in that it you for on with this have be not at your how what",
+    "Spanish": "el la los las de que y en es un una por con para no se lo como más pero sus le está",
+    "French": "le la les de des et est un une que qui dans pour pas sur au avec ce il je vous nous",
+    "German": "der die das und ist nicht ein eine zu den mit von sich auf für ich sie es dem wie",
+    "Italian": "il lo la gli le di che e è un una per non con sono si del della mi ti come",
+    "Portuguese": "o a os as de que e é um uma para não com do da em se mais por você",
+    "Dutch": "de het een en is van ik te dat die niet op zijn je met voor hij ze",
+    "Indonesian": "yang dan di ini itu dengan untuk tidak dari dalam akan saya ada ke kamu",
+    "Turkish": "ve bir bu da de için ile ne ama çok ben sen o değil mi var",
+    "Swedish": "och att det som en är på för med inte jag har till av den",
+}
+STOPWORD_SETS = {lang: set(words.split()) for lang, words in STOPWORDS.items()}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def _script_counts(text: str) -> dict:
+    counts = {}
+    for char in text:
+        if not char.isalpha():
+            continue
+        if "぀" <= char <= "ヿ":
+            script = "KANA"
+        elif "一" <= char <= "鿿" or "㐀" <= char <= "䶿":
+            script = "HAN"
+        else:
+            name = unicodedata.name(char, "")
+            script = name.split(" ", 1)[0] if name else "UNKNOWN"
+        counts[script] = counts.get(script, 0) + 1
+    return counts
+
+
+def detect_language_locally(text: str):
+    """
+    Guess the language of ``text``.
+
+    Returns:
+        Tuple of (language name or None, confidence between 0 and 1)
+    """
+    counts = _script_counts(text)
+    total = sum(counts.values())
+    if total == 0:
+        return None, 0.0
+
+    # Japanese mixes kana with Han characters; Han alone is Chinese
+    if counts.get("KANA"):
+        return "Japanese", 0.95
+    script, count = max(counts.items(), key=lambda item: item[1])
+    share = count / total
+    if script == "HAN":
+        return "Chinese", 0.9 * share
+    if script in SHARED_SCRIPT_MARKERS:
+        markers, default = SHARED_SCRIPT_MARKERS[script]
+        for language, pattern, confidence in markers:
+            if pattern.search(text):
+                return (language, confidence * share) if language else (None, 0.0)
+        return default, SHARED_SCRIPT_CONFIDENCE * share
+    if script in SCRIPT_LANGUAGES:
+        language, confidence = SCRIPT_LANGUAGES[script]
+        return language, confidence * share
+    if script != "LATIN":
+        return None, 0.0
+
+    words = [w.lower() for w in WORD_PATTERN.findall(text)]
+    if not words:
+        return None, 0.0
+    scores = {lang: sum(1 for w in words if w in stopwords) for lang, stopwords in STOPWORD_SETS.items()}
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, best_score), (_, second_score) = ranked[0], ranked[1]
+    if best_score == 0:
+        return None, 0.0
+    # Confidence grows with evidence (stop-word hits) and with the margin over the runner-up
+    evidence = min(1.0, best_score / 4)
+    margin = (best_score - second_score) / best_score
+    return best, round(evidence * margin * share, 3)
@@ -2,7 +2,6 @@ import os
 import sys
 import requests
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -11,9 +10,19 @@ from langchain_core.messages import HumanMessage
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.fast_path import FAST_PATH_ENABLED, FastPathRoute, FastPathRouter, fast_path_middleware
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.prefetch import PREFETCH_ENABLED, extract_places, prefetch_middleware
+from agent_common.tool_concurrency import ToolConcurrencyMiddleware, bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, instrument
+
 # Get API keys from environment
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5/weather")
 
 if not OPENWEATHER_API_KEY:
     raise ValueError("Please set OPENWEATHER_API_KEY in your .env file")
@@ -36,7 +45,7 @@ def get_weather(city_name: str) -> str:
     """
     try:
         # OpenWeather API endpoint
-        base_url = "http://api.openweathermap.org/data/2.5/weather"
+        base_url = OPENWEATHER_BASE_URL
         params = {
             "q": city_name,
             "appid": OPENWEATHER_API_KEY,
@@ -73,8 +82,30 @@ Weather in {city}, {country}:
     except Exception as e:
         return f"Unexpected error: {str(e)}"
 
+# Words that mean the query is not a plain "current weather in <city>" request
+NON_CITY_WORDS = {"yesterday", "tomorrow", "forecast", "week", "weekend", "last", "next", "and", "or", "vs"}
+
+def _answer_weather(match):
+    """Fast-path handler: call get_weather directly and return its output as the answer."""
+    city = match.group("city").strip(" .'-")
+    if not city or NON_CITY_WORDS & set(city.lower().split()):
+        return None
+    result = get_weather.invoke({"city_name": city})
+    # Let the model handle anything the tool could not answer
+    return None if result.startswith(("Error", "Unexpected error")) else result
+
+CITY = r"(?P<city>[a-z][a-z .'-]{0,40}?)"
+NOW = r"(?:\s+(?:today|right now|now))?\s*[?.!]*"
+
+# Simple weather questions answered without the model (enable with AGENT_FAST_PATH=true)
+fast_path_router = FastPathRouter("weather_agent", [
+    FastPathRoute("weather", rf"(?:what(?:'s| is)|how(?:'s| is))\s+the\s+weather\s+(?:like\s+)?(?:in|for|at)\s+{CITY}{NOW}", _answer_weather),
+    FastPathRoute("weather", rf"(?:get|show|tell me|check)\s+(?:the\s+)?(?:current\s+)?weather\s+(?:for|in|of|at)\s+{CITY}{NOW}", _answer_weather),
+    FastPathRoute("weather", rf"weather\s+(?:in|for|at)\s+{CITY}{NOW}", _answer_weather),
+])
+
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
@@ -82,13 +113,34 @@ chat = ChatGoogleGenerativeAI(
 # Define tools - using the @tool decorator automatically creates the tool
 tools = [get_weather]
 
+# Start get_weather for the places named in the request while the model plans (enable with AGENT_PREFETCH=true)
+weather_prefetch = prefetch_middleware(
+    {"get_weather": lambda text: [{"city_name": place} for place in extract_places(text)]},
+    tools,
+)
+
 # Create agent graph using the new LangChain 1.x API
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True  # debug=True enables verbose output
+    middleware=fast_path_middleware(fast_path_router) + weather_prefetch + [
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+        # Protect upstream services when the model asks for several calls at once
+        ToolConcurrencyMiddleware({"get_weather": 4}),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "weather_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("Weather Agent is ready!")
@@ -114,3 +166,9 @@ if __name__ == "__main__":
             print(f"\nResult: {last_message}")
     else:
         print(f"\nResult: {result}")
+
+    if FAST_PATH_ENABLED:
+        print(f"\nFast path: {fast_path_router.stats()}")
+
+    if PREFETCH_ENABLED:
+        print(f"\nPrefetch: {weather_prefetch[0].stats()}")
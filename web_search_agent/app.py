@@ -1,7 +1,7 @@
 import os
+import sys
 import requests
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain_core.messages import HumanMessage
@@ -10,9 +10,22 @@ from langchain_core.messages import HumanMessage
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
 load_dotenv(dotenv_path=env_path)
 
+# Shared helpers live in agent_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agent_common.memory import ConversationMemoryMiddleware, with_session_memory
+from agent_common.models import create_chat_model
+from agent_common.page_store import PageStore
+from agent_common.tool_concurrency import ToolConcurrencyMiddleware, bounded_tool_concurrency
+from agent_common.tracing import AGENT_DEBUG, instrument
+from deep_search import DEEP_SEARCH_PAGES, deep_search, format_passages, rank_passages
+from hedged_search import SEARCH_DEADLINE, SEARCH_HEDGE_DELAY, hedged_search
+from search_cache import SearchCache
+
 # Get API keys from environment
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")  # Optional: for better search results
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+DUCKDUCKGO_URL = os.getenv("DUCKDUCKGO_URL", "https://api.duckduckgo.com/")
 
 if not GOOGLE_API_KEY:
     raise ValueError("Please set GOOGLE_API_KEY in your .env file")
@@ -20,6 +33,12 @@ if not GOOGLE_API_KEY:
 # Set GOOGLE_API_KEY in environment for LangChain to use
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
+# Results of earlier searches, shared by all sessions (SEARCH_CACHE_TTL=0 disables it)
+search_cache = SearchCache()
+
+# Pages read by deep search, reused until PAGE_STORE_MAX_AGE (PAGE_STORE_PATH= disables it)
+page_store = PageStore()
+
 @tool
 def search_web(query: str, num_results: int = 5) -> str:
     """
@@ -36,101 +55,159 @@ def search_web(query: str, num_results: int = 5) -> str:
         # Limit results
         num_results = min(num_results, 10)
         
-        # Use Serper API if available, otherwise use DuckDuckGo
-        if SERPER_API_KEY:
-            return _search_with_serper(query, num_results)
-        else:
-            return _search_with_duckduckgo(query, num_results)
+        backend, results = _search(query, num_results)
+        return _format_results(query, results, backend)
     
     except Exception as e:
         return f"Error searching web: {str(e)}"
 
-def _search_with_serper(query: str, num_results: int) -> str:
-    """Search using Serper API (more accurate, requires API key)"""
+@tool
+def deep_search_web(query: str, num_pages: int = DEEP_SEARCH_PAGES) -> str:
+    """
+    Search the web and read the top result pages. Returns the passages from those pages that best answer the
+    query, with their URLs. Use this when titles and snippets are not enough to answer.
+    
+    Args:
+        query: The search query
+        num_pages: Number of result pages to read (default: 5, max: 10)
+    
+    Returns:
+        Formatted string with the most relevant passages and their source URLs
+    """
     try:
-        url = "https://google.serper.dev/search"
-        headers = {
-            "X-API-KEY": SERPER_API_KEY,
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "q": query,
-            "num": num_results
-        }
-        
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        if "organic" in data:
-            for item in data["organic"][:num_results]:
-                title = item.get("title", "No title")
-                snippet = item.get("snippet", "No description")
-                link = item.get("link", "")
-                results.append(f"Title: {title}\nSnippet: {snippet}\nURL: {link}\n")
-        
-        if results:
-            return f"Search results for '{query}':\n\n" + "\n".join(results)
-        else:
-            return f"No results found for '{query}'"
+        num_pages = min(num_pages, 10)
+        # Pages read for earlier queries may already cover this one
+        pages = page_store.answer(query, k=num_pages)
+        if pages:
+            return format_passages(query, rank_passages(query, pages))
+        _, results = _search(query, num_pages)
+        passages = deep_search(query, [result["url"] for result in results], store=page_store)
+        return format_passages(query, passages)
     
     except Exception as e:
-        return f"Error with Serper API: {str(e)}. Falling back to DuckDuckGo."
+        return f"Error searching web: {str(e)}"
+
+def _search(query: str, num_results: int):
+    """Cached, hedged search returning (backend name, structured results); raises SearchFailed."""
+    # Serper first when available, DuckDuckGo as the hedge and fallback
+    sources = "+".join(name for name, _ in SEARCH_BACKENDS)
+    cached = search_cache.lookup(sources, query, num_results)
+    if cached is not None:
+        backend, results = cached
+        # Entries cached before backends were recorded count as the preferred backend's
+        return backend or SEARCH_BACKENDS[0][0], results
+    backend, results = hedged_search(SEARCH_BACKENDS, query, num_results,
+                                     hedge_delay=SEARCH_HEDGE_DELAY, deadline=SEARCH_DEADLINE)
+    search_cache.put(sources, query, num_results, results, source=backend)
+    return backend, results
+
+def _serper_results(query: str, num_results: int, timeout: float = 10) -> list:
+    """Search using Serper API (more accurate, requires API key)"""
+    url = SERPER_URL
+    headers = {
+        "X-API-KEY": SERPER_API_KEY,
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "q": query,
+        "num": num_results
+    }
+    
+    response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    
+    results = []
+    for item in data.get("organic", [])[:num_results]:
+        results.append({
+            "kind": "organic",
+            "title": item.get("title", "No title"),
+            "snippet": item.get("snippet", "No description"),
+            "url": item.get("link", ""),
+        })
+    return results
 
-def _search_with_duckduckgo(query: str, num_results: int) -> str:
+def _duckduckgo_results(query: str, num_results: int, timeout: float = 10) -> list:
     """Search using DuckDuckGo (free, no API key required)"""
-    try:
-        # Simple DuckDuckGo search using their instant answer API
-        url = "https://api.duckduckgo.com/"
-        params = {
-            "q": query,
-            "format": "json",
-            "no_html": "1",
-            "skip_disambig": "1"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        
-        # Get abstract if available
-        if data.get("AbstractText"):
-            results.append(f"Summary: {data['AbstractText']}\nSource: {data.get('AbstractURL', 'N/A')}\n")
-        
-        # Get related topics
-        if data.get("RelatedTopics"):
-            for topic in data["RelatedTopics"][:num_results]:
-                if isinstance(topic, dict) and "Text" in topic:
-                    results.append(f"Related: {topic['Text']}\nURL: {topic.get('FirstURL', 'N/A')}\n")
-        
-        if results:
-            return f"Search results for '{query}':\n\n" + "\n".join(results)
-        else:
-            # Fallback: Use a simple web scraping approach or return message
-            return f"Search query: '{query}'\n\nNote: For better results, consider using Serper API. Add SERPER_API_KEY to your .env file.\nYou can get a free API key at https://serper.dev"
+    # Simple DuckDuckGo search using their instant answer API
+    url = DUCKDUCKGO_URL
+    params = {
+        "q": query,
+        "format": "json",
+        "no_html": "1",
+        "skip_disambig": "1"
+    }
     
-    except Exception as e:
-        return f"Error with DuckDuckGo search: {str(e)}"
+    response = requests.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    
+    results = []
+    
+    # Get abstract if available
+    if data.get("AbstractText"):
+        results.append({"kind": "summary", "snippet": data["AbstractText"], "url": data.get("AbstractURL", "N/A")})
+    
+    # Get related topics
+    for topic in (data.get("RelatedTopics") or [])[:num_results]:
+        if isinstance(topic, dict) and "Text" in topic:
+            results.append({"kind": "related", "snippet": topic["Text"], "url": topic.get("FirstURL", "N/A")})
+    return results
+
+def _format_results(query: str, results: list, backend: str) -> str:
+    """Render structured results the way the agent has always seen them."""
+    entries = []
+    for result in results:
+        if result["kind"] == "organic":
+            entries.append(f"Title: {result['title']}\nSnippet: {result['snippet']}\nURL: {result['url']}\n")
+        elif result["kind"] == "summary":
+            entries.append(f"Summary: {result['snippet']}\nSource: {result['url']}\n")
+        else:
+            entries.append(f"Related: {result['snippet']}\nURL: {result['url']}\n")
+
+    if entries:
+        return f"Search results for '{query}':\n\n" + "\n".join(entries)
+    if backend == "serper":
+        return f"No results found for '{query}'"
+    # Fallback: Use a simple web scraping approach or return message
+    return f"Search query: '{query}'\n\nNote: For better results, consider using Serper API. Add SERPER_API_KEY to your .env file.\nYou can get a free API key at https://serper.dev"
+
+# Search backends in order of preference
+SEARCH_BACKENDS = [("duckduckgo", _duckduckgo_results)]
+if SERPER_API_KEY:
+    SEARCH_BACKENDS.insert(0, ("serper", _serper_results))
 
 # Initialize Gemini model
-chat = ChatGoogleGenerativeAI(
+chat = create_chat_model(
     model="gemini-2.5-flash",
     temperature=0.7
 )
 
 # Define tools
-tools = [search_web]
+tools = [search_web, deep_search_web]
 
 # Create agent graph
 agent_graph = create_agent(
     model=chat,
     tools=tools,
-    debug=True
+    middleware=[
+        # Trim bulky tool outputs and summarize old turns so the prompt stays under budget
+        ConversationMemoryMiddleware(summary_model=chat),
+        # Protect upstream services when the model asks for several calls at once
+        ToolConcurrencyMiddleware({"search_web": 3, "deep_search_web": 2}),
+    ],
+    debug=AGENT_DEBUG  # set AGENT_DEBUG=false to disable verbose output
 )
 
+# Keep conversations per thread_id between invocations when AGENT_SESSION_MEMORY=true
+agent_graph = with_session_memory(agent_graph)
+
+# Run the tool calls of one model turn concurrently, at most AGENT_MAX_TOOL_CONCURRENCY at a time
+agent_graph = bounded_tool_concurrency(agent_graph)
+
+# Record spans and metrics for every graph node, model call and tool call
+agent_graph = instrument(agent_graph, "web_search_agent")
+
 if __name__ == "__main__":
     # Example usage
     print("Web Search Agent is ready!")
@@ -159,3 +236,5 @@ if __name__ == "__main__":
     else:
         print(f"\nResult: {result}")
 
+    print(f"\nSearch cache: {search_cache.stats()}")
+
@@ -0,0 +1,295 @@
+"""
+Deep search: read the pages behind search results, not just their snippets.
+
+The top result URLs are fetched concurrently over one pooled
+``requests.Session`` with a per-URL timeout and size cap. The readable text of
+each HTML page is extracted (scripts, styles, navigation, headers and footers
+are skipped), split into overlapping passages and ranked against the query
+with BM25. Only the best passages are returned, up to a token budget, so the
+tool result stays small no matter how long the pages are.
+
+Configuration (read from the environment / .env file):
+    DEEP_SEARCH_PAGES=5            Result URLs fetched per search
+    DEEP_SEARCH_PASSAGES=6         Passages returned at most
+    DEEP_SEARCH_TOKEN_BUDGET=1500  Estimated tokens of passages returned at most
+    DEEP_SEARCH_FETCH_TIMEOUT=5    Seconds per page fetch
+    DEEP_SEARCH_MAX_BYTES=2000000  Bytes read per page at most
+"""
+
+import codecs
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+
+from agent_common.bm25 import BM25
+from agent_common.tracing import METRICS
+
+DEEP_SEARCH_PAGES = int(os.getenv("DEEP_SEARCH_PAGES", "5"))
+DEEP_SEARCH_PASSAGES = int(os.getenv("DEEP_SEARCH_PASSAGES", "6"))
+DEEP_SEARCH_TOKEN_BUDGET = int(os.getenv("DEEP_SEARCH_TOKEN_BUDGET", "1500"))
+DEEP_SEARCH_FETCH_TIMEOUT = float(os.getenv("DEEP_SEARCH_FETCH_TIMEOUT", "5"))
+DEEP_SEARCH_MAX_BYTES = int(os.getenv("DEEP_SEARCH_MAX_BYTES", "2000000"))
+
+# Passage size in words, and words shared by consecutive passages
+PASSAGE_WORDS = 120
+PASSAGE_OVERLAP = 20
+# Same heuristic as count_tokens_approximately
+CHARS_PER_TOKEN = 4
+
+METRICS.describe("agent_deep_search_fetch_total", "Pages fetched by deep search, by outcome (ok, error, skipped)")
+METRICS.describe("agent_deep_search_fetch_seconds", "Latency of deep search page fetches")
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+# Bytes searched for a <meta> charset, and passed to the charset detector
+CHARSET_SNIFF_BYTES = 4096
+CHARSET_DETECT_BYTES = 65536
+
+SKIPPED_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "template"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6",
+              "br", "tr", "table", "blockquote", "pre"}
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the title and the visible text blocks of an HTML page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.blocks = []
+        self._current = []
+        self._skipping = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skipping:
+            self._skipping -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skipping:
+            self._current.append(data)
+
+    def _flush(self):
+        text = " ".join("".join(self._current).split())
+        if text:
+            self.blocks.append(text)
+        self._current = []
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_text(html: str):
+    """
+    Readable text of an HTML page.
+
+    Returns:
+        Tuple of (title, text with one block per line)
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return " ".join(parser.title.split()), "\n".join(parser.blocks)
+
+
+def split_passages(text: str, words: int = PASSAGE_WORDS, overlap: int = PASSAGE_OVERLAP) -> list:
+    """
+    Split text into passages of about ``words`` words.
+
+    Consecutive short blocks (lines) are packed into one passage; a block
+    longer than ``words`` is cut into windows that overlap by ``overlap`` words.
+    """
+    passages, current = [], []
+    for block in text.splitlines():
+        tokens = block.split()
+        if current and len(current) + len(tokens) > words:
+            passages.append(" ".join(current))
+            current = []
+        if len(tokens) <= words:
+            current += tokens
+            continue
+        step = max(1, words - overlap)
+        for start in range(0, len(tokens), step):
+            passages.append(" ".join(tokens[start:start + words]))
+            if start + words >= len(tokens):
+                break
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """One pooled session for every page fetch, so connections to the same host are reused."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            return _session
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=DEEP_SEARCH_PAGES * 2, pool_maxsize=DEEP_SEARCH_PAGES * 2)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = "Mozilla/5.0 (compatible; langchain-web-search-agent)"
+        _session = session
+        return _session
+
+
+def _known_encoding(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def page_encoding(response, content: bytes) -> str:
+    """
+    Encoding of an HTML page: the charset of the Content-Type header, else the page's ``<meta>`` charset,
+    else UTF-8 when the bytes decode as UTF-8, else what the charset detector guesses.
+
+    ``response.encoding`` is not used on its own: requests sets it to ISO-8859-1 for any ``text/html``
+    response without a charset, which turns UTF-8 pages into mojibake.
+    """
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        encoding = _known_encoding(response.encoding)
+        if encoding:
+            return encoding
+    match = META_CHARSET.search(content[:CHARSET_SNIFF_BYTES])
+    encoding = _known_encoding(match.group(1).decode("ascii", "ignore")) if match else None
+    if encoding:
+        return encoding
+    try:
+        # A page cut at max_bytes may end inside a character
+        content.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as error:
+        if error.start >= len(content) - 3 and error.reason == "unexpected end of data":
+            return "utf-8"
+    return _known_encoding(chardet.detect(content[:CHARSET_DETECT_BYTES]).get("encoding")) or "utf-8"
+
+
+def fetch_page(url: str, timeout: float = DEEP_SEARCH_FETCH_TIMEOUT, max_bytes: int = DEEP_SEARCH_MAX_BYTES):
+    """
+    Download one HTML page and extract its text.
+
+    Returns:
+        Tuple of (title, text), or None when the page cannot be used
+    """
+    start = time.perf_counter()
+    try:
+        with _get_session().get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            if "html" not in response.headers.get("Content-Type", "text/html"):
+                METRICS.inc("agent_deep_search_fetch_total", outcome="skipped")
+                return None
+            pieces, size = [], 0
+            for piece in response.iter_content(chunk_size=65536):
+                pieces.append(piece)
+                size += len(piece)
+                if size >= max_bytes:
+                    break
+            content = b"".join(pieces)[:max_bytes]
+            html = content.decode(page_encoding(response, content), errors="replace")
+    except requests.RequestException:
+        METRICS.inc("agent_deep_search_fetch_total", outcome="error")
+        return None
+    finally:
+        METRICS.observe("agent_deep_search_fetch_seconds", time.perf_counter() - start)
+    METRICS.inc("agent_deep_search_fetch_total", outcome="ok")
+    return extract_text(html)
+
+
+def rank_passages(query: str, pages: list, max_passages: int = DEEP_SEARCH_PASSAGES,
+                  token_budget: int = DEEP_SEARCH_TOKEN_BUDGET) -> list:
+    """
+    Best passages of the pages for the query, within the token budget.
+
+    Args:
+        query: The search query
+        pages: List of dicts with "url", "title" and "text"
+        max_passages: Passages returned at most
+        token_budget: Estimated tokens of all returned passages at most
+
+    Returns:
+        List of dicts with "url", "title", "text" and "score", best first
+    """
+    passages = [
+        {"url": page["url"], "title": page["title"], "text": text}
+        for page in pages
+        for text in split_passages(page["text"])
+    ]
+    if not passages:
+        return []
+    ranking = BM25([p["title"] + " " + p["text"] for p in passages])
+    chosen, used = [], 0
+    for index, score in ranking.top_k(query, len(passages)):
+        tokens = len(passages[index]["text"]) // CHARS_PER_TOKEN
+        if used + tokens > token_budget:
+            continue
+        chosen.append({**passages[index], "score": round(score, 3)})
+        used += tokens
+        if len(chosen) >= max_passages:
+            break
+    return chosen
+
+
+def deep_search(query: str, urls: list, store=None, max_passages: int = DEEP_SEARCH_PASSAGES,
+                token_budget: int = DEEP_SEARCH_TOKEN_BUDGET, timeout: float = DEEP_SEARCH_FETCH_TIMEOUT) -> list:
+    """
+    Fetch ``urls`` concurrently and return their best passages for ``query``.
+
+    With a ``PageStore``, fresh stored pages are used instead of fetching them
+    again, and newly fetched pages are added to the store.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url.startswith(("http://", "https://"))))
+    stored = {url: store.get(url) for url in urls} if store is not None else {}
+    missing = [url for url in urls if stored.get(url) is None]
+    fetched = {}
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix="deep-search") as pool:
+            fetched = dict(zip(missing, pool.map(lambda url: fetch_page(url, timeout=timeout), missing)))
+    pages = []
+    for url in urls:
+        if stored.get(url) is not None:
+            pages.append(stored[url])
+        elif fetched.get(url):
+            title, text = fetched[url]
+            if store is not None:
+                store.put(url, title, text)
+            pages.append({"url": url, "title": title, "text": text})
+    return rank_passages(query, pages, max_passages=max_passages, token_budget=token_budget)
+
+
+def format_passages(query: str, passages: list) -> str:
+    """Render ranked passages for the agent, best first."""
+    if not passages:
+        return f"No readable pages found for '{query}'"
+    entries = [
+        f"Source: {p['title'] or p['url']}\nURL: {p['url']}\nPassage: {p['text']}\n"
+        for p in passages
+    ]
+    return f"Most relevant passages for '{query}':\n\n" + "\n".join(entries)
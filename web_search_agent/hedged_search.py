@@ -0,0 +1,119 @@
+"""
+Hedged search across several backends with an overall deadline.
+
+The primary backend (Serper when SERPER_API_KEY is set) is called first. If
+it has not answered after ``SEARCH_HEDGE_DELAY`` seconds, or as soon as it
+fails or returns nothing, the next backend (DuckDuckGo) is started as well.
+The first non-empty result wins; backends still running are abandoned and
+their results ignored. Nothing is returned after ``SEARCH_DEADLINE`` seconds.
+
+A request that is already on the wire cannot be interrupted from another
+thread, so every backend call is given the time left until the deadline as
+its HTTP timeout; abandoned calls end on their own by then at the latest.
+
+    SEARCH_HEDGE_DELAY=0.8   Seconds before the next backend is started
+    SEARCH_DEADLINE=10       Seconds before the search gives up
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agent_common.tracing import METRICS
+
+SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "0.8"))
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "10"))
+
+METRICS.describe("agent_search_backend_total",
+                 "Search backend calls, by outcome (won, empty, error, abandoned, timeout)")
+
+
+class SearchFailed(Exception):
+    """No backend returned a usable answer before the deadline."""
+
+
+def hedged_search(backends: list, query: str, num_results: int, hedge_delay: float = SEARCH_HEDGE_DELAY,
+                  deadline: float = SEARCH_DEADLINE):
+    """
+    Run ``backends`` as a hedged race and return the first good answer.
+
+    Args:
+        backends: List of (name, function) in order of preference; each
+                  function takes (query, num_results, timeout) and returns a
+                  list of results, raising on failure
+        query: The search query
+        num_results: Number of results to ask each backend for
+        hedge_delay: Seconds to wait for a backend before starting the next one
+        deadline: Seconds after which the search gives up
+
+    Returns:
+        Tuple of (backend name, results). Results are empty only when every
+        backend answered with nothing.
+
+    Raises:
+        SearchFailed: Every backend failed or none answered within the deadline
+    """
+    start = time.monotonic()
+    give_up = start + deadline
+    pending = {}
+    errors, empty = [], []
+    next_index = 0
+    next_start = start
+
+    while True:
+        now = time.monotonic()
+        if now >= give_up:
+            break
+        # Start the next backend when the hedge delay is up or nothing else is still running
+        if next_index < len(backends) and (now >= next_start or not pending):
+            name, search = backends[next_index]
+            pending[_executor().submit(search, query, num_results, give_up - now)] = name
+            next_index += 1
+            next_start = now + hedge_delay
+            continue
+        if not pending:
+            break
+        until = give_up if next_index == len(backends) else min(next_start, give_up)
+        done, _ = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                METRICS.inc("agent_search_backend_total", backend=name, outcome="error")
+                continue
+            if not results:
+                empty.append(name)
+                METRICS.inc("agent_search_backend_total", backend=name, outcome="empty")
+                continue
+            METRICS.inc("agent_search_backend_total", backend=name, outcome="won")
+            _abandon(pending, "abandoned")
+            return name, results
+
+    if empty:
+        _abandon(pending, "abandoned")
+        return empty[0], []
+    _abandon(pending, "timeout")
+    if pending or not errors:
+        errors.append(f"no search backend answered within {deadline:g}s")
+    raise SearchFailed("; ".join(errors))
+
+
+def _abandon(pending: dict, outcome: str):
+    for future, name in pending.items():
+        future.cancel()
+        METRICS.inc("agent_search_backend_total", backend=name, outcome=outcome)
+
+
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _executor_instance
+    with _executor_lock:
+        if _executor_instance is None:
+            _executor_instance = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+        return _executor_instance
@@ -0,0 +1,187 @@
+"""
+Two-tier cache for web search results.
+
+Repeated or trivially different queries ("LangChain agents", "agents
+langchain ") map to the same key: the query is case-folded, stripped of
+punctuation and its words are sorted. Results are cached per backend with the
+number of results that was requested, so a later request for fewer results is
+served by slicing the larger cached set. Each entry also records which source
+(e.g. which of the hedged backends) produced it.
+
+Tiers:
+- an in-memory LRU (``SEARCH_CACHE_SIZE`` entries)
+- a SQLite file shared between runs (``SEARCH_CACHE_PATH``; empty = memory only)
+
+Entries expire after ``SEARCH_CACHE_TTL`` seconds (0 disables the cache).
+Searches that found nothing are not cached: an empty answer is often a
+transient backend failure and would otherwise hide results for the full TTL.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from agent_common.tracing import METRICS
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache",
+                            "search_cache.sqlite3")
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", DEFAULT_PATH)
+
+METRICS.describe("agent_search_cache_total", "search_web cache lookups, by tier (memory, disk) and outcome")
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation-, whitespace- and word-order-insensitive form of a query."""
+    return " ".join(sorted(WORD_PATTERN.findall(query.casefold())))
+
+
+def take(results: list, num_results: int) -> list:
+    """
+    The first ``num_results`` results of a larger set.
+
+    Summary entries (DuckDuckGo's abstract) are not counted, matching how the
+    backends apply ``num_results``.
+    """
+    taken, count = [], 0
+    for result in results:
+        if result.get("kind") == "summary":
+            taken.append(result)
+        elif count < num_results:
+            taken.append(result)
+            count += 1
+    return taken
+
+
+def _found(results: list) -> int:
+    """Results other than summary entries."""
+    return sum(1 for result in results if result.get("kind") != "summary")
+
+
+class SearchCache:
+    """
+    In-memory LRU in front of an optional SQLite store.
+
+    Args:
+        path: SQLite file for the disk tier, or None/"" for memory only
+        ttl: Seconds an entry stays valid; 0 disables caching
+        max_entries: Entries kept in memory
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._db = None
+        if path and ttl > 0:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, requested INTEGER, results TEXT, created REAL, source TEXT)"
+            )
+            # Cache files written before sources were recorded
+            if "source" not in [row[1] for row in self._db.execute("PRAGMA table_info(search_cache)")]:
+                self._db.execute("ALTER TABLE search_cache ADD COLUMN source TEXT")
+            self._db.commit()
+
+    @staticmethod
+    def _key(backend: str, query: str) -> str:
+        return f"{backend}:{normalize_query(query)}"
+
+    def _usable(self, entry, num_results) -> bool:
+        requested, results, created, _ = entry
+        if time.time() - created > self.ttl:
+            return False
+        found = _found(results)
+        if found == 0:
+            # Written before empty results were skipped
+            return False
+        # A larger earlier request covers this one; so does a result set the backend could not fill
+        return requested >= num_results or found < requested
+
+    def get(self, backend: str, query: str, num_results: int):
+        """Cached results for the query, sliced to ``num_results``, or None."""
+        entry = self.lookup(backend, query, num_results)
+        return None if entry is None else entry[1]
+
+    def lookup(self, backend: str, query: str, num_results: int):
+        """(source, results sliced to ``num_results``) of the cached entry for the query, or None."""
+        if self.ttl <= 0:
+            return None
+        key = self._key(backend, query)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._usable(entry, num_results):
+                self._memory.move_to_end(key)
+                self._record("memory_hits", "memory", "hit")
+                return entry[3], take(entry[1], num_results)
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT requested, results, created, source FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]), row[2], row[3])
+                    if self._usable(entry, num_results):
+                        self._remember(key, entry)
+                        self._record("disk_hits", "disk", "hit")
+                        return entry[3], take(entry[1], num_results)
+            self._record("misses", "all", "miss")
+            return None
+
+    def put(self, backend: str, query: str, num_results: int, results: list, source: str = None):
+        """Store the results of a backend call made for ``num_results`` results (``source``: who produced them)."""
+        if self.ttl <= 0 or _found(results) == 0:
+            return
+        key = self._key(backend, query)
+        entry = (num_results, results, time.time(), source)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, requested, results, created, source) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, num_results, json.dumps(results), entry[2], source),
+                )
+                self._db.execute("DELETE FROM search_cache WHERE created < ?", (time.time() - self.ttl,))
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _record(self, count, tier, outcome):
+        self.counts[count] += 1
+        METRICS.inc("agent_search_cache_total", tier=tier, outcome=outcome)
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Hits per tier, hit ratio and upstream calls saved."""
+        with self._lock:
+            counts = dict(self.counts)
+        hits = counts["memory_hits"] + counts["disk_hits"]
+        lookups = hits + counts["misses"]
+        return {
+            **counts,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "upstream_calls_saved": hits,
+        }